@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Log Parser Benchmark
+Generates a synthetic auto commit log and compares monitor parser throughput
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+from monitor import CommitMonitor
+
+
+MESSAGES = [
+    ("INFO", "Starting auto commit script in daily mode", 10),
+    ("INFO", "Created commit: Update documentation - minor update", 35),
+    ("INFO", "Backfilled commit for 2025-01-01 10:00:00: Add unit tests", 20),
+    ("INFO", "Skipping commit - not appropriate time", 10),
+    ("INFO", "[DRY RUN] Would commit: Refactor module structure", 5),
+    ("ERROR", "Git command failed: Command '['git', 'commit']' returned non-zero exit status 1.", 5),
+    ("INFO", "Script completed. Total commits made: 3", 15),
+]
+
+
+def generate_log(path: str, size_mb: int, seed: int = 0) -> int:
+    """Write a synthetic log of roughly size_mb megabytes and return its line count."""
+    rng = random.Random(seed)
+    population = [(level, message) for level, message, weight in MESSAGES for _ in range(weight)]
+    # Pre-render line tails so generation is dominated by I/O
+    tails = [
+        f" {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d},"
+        f"{rng.randint(0, 999):03d} - {level} - {message}\n"
+        for level, message in (rng.choice(population) for _ in range(4096))
+    ]
+
+    target = size_mb * 1024 * 1024
+    day = datetime(2015, 1, 1)
+    written = 0
+    lines = 0
+    with open(path, 'w') as f:
+        while written < target:
+            date = day.strftime("%Y-%m-%d")
+            block = "".join(date + tail for tail in rng.choices(tails, k=2000))
+            f.write(block)
+            written += len(block)
+            lines += 2000
+            day += timedelta(days=1)
+    return lines
+
+
+def run_parser(path: str, parser: str):
+    """Parse path once with the given engine and return (seconds, stats, daily commits)."""
+    monitor = CommitMonitor(path, use_checkpoint=False, parser=parser)
+    started = time.perf_counter()
+    monitor.parse_log()
+    elapsed = time.perf_counter() - started
+    daily = dict(monitor.daily_stats.items())
+    return elapsed, dict(monitor.stats), daily
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark monitor log parsers")
+    parser.add_argument("--size-mb", type=int, default=1024, help="Synthetic log size (default: 1024)")
+    parser.add_argument("--log-file", help="Reuse or keep the synthetic log at this path")
+    parser.add_argument("--skip-reference", action="store_true", help="Only time the fast parser")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    log_file = args.log_file or os.path.join(tempfile.mkdtemp(), "auto_commit.log")
+    if not os.path.exists(log_file):
+        started = time.perf_counter()
+        generate_log(log_file, args.size_mb)
+        print(f"Generated {log_file} in {time.perf_counter() - started:.1f}s")
+
+    with open(log_file, 'rb') as f:
+        total_lines = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 24), b""))
+    size_mb = os.path.getsize(log_file) / (1024 * 1024)
+    print(f"Log: {size_mb:.0f} MB, {total_lines} lines")
+
+    results = {"log_size_mb": round(size_mb, 1), "lines": total_lines, "parsers": {}}
+    engines = ["fast"] if args.skip_reference else ["fast", "reference"]
+    outputs = {}
+    for engine in engines:
+        elapsed, stats, daily = run_parser(log_file, engine)
+        outputs[engine] = (stats, daily)
+        results["parsers"][engine] = {
+            "seconds": round(elapsed, 3),
+            "lines_per_sec": round(total_lines / elapsed),
+            "mb_per_sec": round(size_mb / elapsed, 1),
+        }
+        print(f"{engine:>9}: {elapsed:8.2f}s  {total_lines / elapsed:12,.0f} lines/s  "
+              f"{size_mb / elapsed:8.1f} MB/s")
+
+    if "reference" in outputs:
+        results["identical"] = outputs["fast"] == outputs["reference"]
+        speedup = results["parsers"]["reference"]["seconds"] / results["parsers"]["fast"]["seconds"]
+        results["speedup"] = round(speedup, 1)
+        print(f"Speedup: {speedup:.1f}x, identical results: {results['identical']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if not args.log_file:
+        os.remove(log_file)
+    return 0 if results.get("identical", True) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
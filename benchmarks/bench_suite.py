@@ -0,0 +1,593 @@
+#!/usr/bin/env python3
+"""
+Commit Benchmark Suite
+Times commits, backfills, pushes and whole fleet runs against local repositories
+"""
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+sys.path.insert(0, str(ROOT))
+from github_api import AsyncGitHubAPIClient, GitHubAPIClient
+from github_auto_commit import GitHubAutoCommit
+from main import GitHubAutoCommitBot
+from push_queue import PushQueue
+from rate_limit import RateGovernor
+
+
+BACKENDS = ["subprocess", "fast-import", "pygit2"]
+BENCHMARKS = ["commit", "backfill", "push", "push-queue", "fleet", "api"]
+# Commits need an identity even on machines without a global git config
+GIT_IDENTITY = {
+    "GIT_AUTHOR_NAME": "Benchmark",
+    "GIT_AUTHOR_EMAIL": "benchmark@example.com",
+    "GIT_COMMITTER_NAME": "Benchmark",
+    "GIT_COMMITTER_EMAIL": "benchmark@example.com",
+}
+
+
+def git(*args: str, cwd: str = None) -> str:
+    return subprocess.run(['git', *args], cwd=cwd, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def latency_summary(samples: List[float]) -> Dict:
+    """Mean, median, p95 and max of samples in milliseconds."""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+class Workspace:
+    """Temporary directory of working repositories with bare "remotes"."""
+
+    def __init__(self, keep: bool = False):
+        self.root = tempfile.mkdtemp(prefix="auto_commit_bench_")
+        self.keep = keep
+        self._count = 0
+        # Defaults file for read_config, so it does not create one noisily
+        with open(os.path.join(self.root, "defaults.json"), 'w') as f:
+            f.write("{}")
+
+    def repository(self, name: str = None) -> str:
+        """Create a working repository with one commit on main, pushed to a fresh bare remote."""
+        self._count += 1
+        name = name or f"repo{self._count}"
+        remote = os.path.join(self.root, "remotes", f"{name}.git")
+        path = os.path.join(self.root, "work", name)
+        git('init', '--quiet', '--bare', '--initial-branch=main', remote)
+        git('init', '--quiet', '--initial-branch=main', path)
+        # pygit2 reads the identity from config only
+        git('config', 'user.name', GIT_IDENTITY["GIT_AUTHOR_NAME"], cwd=path)
+        git('config', 'user.email', GIT_IDENTITY["GIT_AUTHOR_EMAIL"], cwd=path)
+        with open(os.path.join(path, "README.md"), 'w') as f:
+            f.write(f"# {name}\n")
+        git('add', 'README.md', cwd=path)
+        git('commit', '--quiet', '-m', 'Initial commit', cwd=path)
+        git('remote', 'add', 'origin', remote, cwd=path)
+        git('push', '--quiet', '-u', 'origin', 'main', cwd=path)
+        return path
+
+    def bare_remote(self, name: str) -> str:
+        """Create a bare remote holding one commit on main, as a hosted repository would."""
+        path = self.repository(name)
+        return git('remote', 'get-url', 'origin', cwd=path)
+
+    def config(self, repo_path: str, backend: str = "subprocess") -> Dict:
+        """Auto commit config for repo_path that never skips or sleeps."""
+        config = GitHubAutoCommit.read_config(os.path.join(self.root, "defaults.json"))
+        config.update({
+            "repository_path": repo_path,
+            "daily_commit_range": [1, 1],
+            "enable_randomization": False,
+            "git_backend": backend,
+            "log_file": os.path.join(self.root, "auto_commit.log"),
+            "event_log": os.path.join(self.root, "auto_commit.events.jsonl"),
+            "metrics_textfile": os.path.join(self.root, "auto_commit.prom"),
+            "metrics_summary": os.path.join(self.root, "auto_commit.metrics.json"),
+        })
+        return config
+
+    def auto_commit(self, repo_path: str, backend: str = "subprocess") -> GitHubAutoCommit:
+        self._count += 1
+        return GitHubAutoCommit(config=self.config(repo_path, backend),
+                                logger_name=f"bench.{self._count}")
+
+    def cleanup(self):
+        if self.keep:
+            print(f"Kept workspace {self.root}")
+        else:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+
+def bench_commit(workspace: Workspace, backends: List[str], commits: int) -> Dict:
+    """create_commit latency on a small repository."""
+    results = {}
+    for backend in backends:
+        auto_commit = workspace.auto_commit(workspace.repository(), backend)
+        if auto_commit.config['git_backend'] != backend:
+            auto_commit.close()
+            continue
+        samples = []
+        # Untimed warm-up: lazy imports and the first index write
+        auto_commit.create_commit(auto_commit.get_random_commit_message())
+        for _ in range(commits):
+            started = time.perf_counter()
+            if not auto_commit.create_commit(auto_commit.get_random_commit_message()):
+                raise RuntimeError(f"create_commit failed with {backend} backend")
+            samples.append(time.perf_counter() - started)
+        auto_commit.close()
+        results[backend] = latency_summary(samples)
+    return results
+
+
+def bench_backfill(workspace: Workspace, backends: List[str], day_counts: List[int]) -> Dict:
+    """backfill_history throughput, each run on a fresh repository."""
+    results = {}
+    for backend in backends:
+        for days in day_counts:
+            auto_commit = workspace.auto_commit(workspace.repository(), backend)
+            if auto_commit.config['git_backend'] != backend:
+                auto_commit.close()
+                break
+            started = time.perf_counter()
+            commits = auto_commit.backfill_history(days)
+            elapsed = time.perf_counter() - started
+            auto_commit.close()
+            results[f"{backend}/{days}d"] = {
+                "commits": commits,
+                "seconds": round(elapsed, 3),
+                "commits_per_sec": round(commits / elapsed, 1) if elapsed else 0.0,
+            }
+    return results
+
+
+def bench_push(workspace: Workspace, pushes: int) -> Dict:
+    """push_changes cost for one new commit to a local bare remote."""
+    auto_commit = workspace.auto_commit(workspace.repository())
+    samples = []
+    for _ in range(pushes):
+        auto_commit.create_commit(auto_commit.get_random_commit_message())
+        started = time.perf_counter()
+        if not auto_commit.push_changes():
+            raise RuntimeError("push_changes failed")
+        samples.append(time.perf_counter() - started)
+    auto_commit.close()
+    return {"push": latency_summary(samples)}
+
+
+def bench_push_queue(workspace: Workspace, repo_count: int, latency: float, concurrency: int) -> Dict:
+    """One new commit in each of repo_count repositories, pushed one by one and through a PushQueue.
+
+    The remotes answer after latency seconds, standing in for the network
+    round trip a hosted remote adds to every push and ls-remote. The
+    up-to-date case queues the same repositories again with nothing new,
+    so every push is skipped after its ls-remote.
+    """
+    auto_commits = []
+    for index in range(repo_count):
+        path = workspace.repository(f"pushq{index}")
+        if latency:
+            git('config', 'remote.origin.receivepack', f"sleep {latency}; git-receive-pack", cwd=path)
+            git('config', 'remote.origin.uploadpack', f"sleep {latency}; git-upload-pack", cwd=path)
+        auto_commits.append(workspace.auto_commit(path))
+
+    def commit_all():
+        for auto_commit in auto_commits:
+            auto_commit.create_commit(auto_commit.get_random_commit_message())
+
+    def queue_all() -> Dict[str, Dict]:
+        queue = PushQueue(concurrency)
+        for index, auto_commit in enumerate(auto_commits):
+            queue.add(f"pushq{index}", auto_commit.backend)
+        return queue.push_all()
+
+    results = {}
+    commit_all()
+    started = time.perf_counter()
+    for auto_commit in auto_commits:
+        if not auto_commit.push_changes():
+            raise RuntimeError("push_changes failed")
+    results["serial"] = {"seconds": time.perf_counter() - started, "pushed": repo_count, "bytes": None}
+
+    for case in ("queued", "up-to-date"):
+        if case == "queued":
+            commit_all()
+        started = time.perf_counter()
+        pushes = queue_all()
+        elapsed = time.perf_counter() - started
+        if any(push["status"] == "failed" for push in pushes.values()):
+            raise RuntimeError("queued push failed")
+        results[case] = {"seconds": elapsed,
+                         "pushed": sum(1 for push in pushes.values() if push["status"] == "pushed"),
+                         "bytes": sum(push["bytes"] for push in pushes.values())}
+
+    for auto_commit in auto_commits:
+        auto_commit.close()
+    for summary in results.values():
+        summary["repos"] = repo_count
+        summary["repos_per_sec"] = round(repo_count / summary["seconds"], 2) if summary["seconds"] else 0.0
+        summary["seconds"] = round(summary["seconds"], 3)
+    return results
+
+
+class StubGitHubAPI:
+    """Threaded HTTP server answering /user and /user/repos with the workspace remotes.
+
+    Pages honour per_page/page, carry Link headers and ETags, and answer
+    If-None-Match with 304 like the real API. With rate_limit set, every
+    response carries X-RateLimit-* headers for a budget of rate_limit
+    requests per window seconds, and requests beyond it get a 403; with
+    secondary_every set, every Nth request gets a secondary-limit 403 with
+    Retry-After: 1.
+    """
+
+    def __init__(self, repositories: List[Dict], rate_limit: int = None, window: int = 60,
+                 secondary_every: int = 0):
+        stub = self
+        self.repositories = repositories
+        self.requests = 0
+        self.refused = 0
+        self.rate_limit = rate_limit
+        self.window = window
+        self.secondary_every = secondary_every
+        self._window_reset = 0
+        self._used = 0
+        self._lock = threading.Lock()
+
+        def budget() -> tuple:
+            """Count one request; returns (allowed, remaining, reset) of the current window."""
+            with stub._lock:
+                stub.requests += 1
+                now = time.time()
+                if now >= stub._window_reset:
+                    stub._window_reset = int(now) + stub.window
+                    stub._used = 0
+                stub._used += 1
+                secondary = stub.secondary_every and stub.requests % stub.secondary_every == 0
+                allowed = not secondary and (stub.rate_limit is None or stub._used <= stub.rate_limit)
+                if not allowed:
+                    stub.refused += 1
+                remaining = max(0, stub.rate_limit - stub._used) if stub.rate_limit is not None else None
+                return allowed, secondary, remaining, stub._window_reset
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def refuse(self, message: str, headers: Dict):
+                body = json.dumps({"message": message}).encode()
+                self.send_response(403)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                allowed, secondary, remaining, reset = budget()
+                limit_headers = {}
+                if stub.rate_limit is not None:
+                    limit_headers = {'X-RateLimit-Limit': str(stub.rate_limit),
+                                     'X-RateLimit-Remaining': str(remaining),
+                                     'X-RateLimit-Reset': str(reset)}
+                if secondary:
+                    self.refuse("You have exceeded a secondary rate limit", {'Retry-After': '1'})
+                    return
+                if not allowed:
+                    self.refuse("API rate limit exceeded", limit_headers)
+                    return
+
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                per_page = int(query.get('per_page', ['30'])[0])
+                page = int(query.get('page', ['1'])[0])
+                if url.path == "/user":
+                    body = json.dumps({"login": "bench"}).encode()
+                else:
+                    body = json.dumps(stub.repositories[(page - 1) * per_page:page * per_page]).encode()
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    for name, value in limit_headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                for name, value in limit_headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                last = max(1, -(-len(stub.repositories) // per_page))
+                if page < last:
+                    base = f"{stub.url}{url.path}"
+                    self.send_header('Link', f'<{base}?per_page={per_page}&page={page + 1}>; rel="next", '
+                                             f'<{base}?per_page={per_page}&page={last}>; rel="last"')
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def bench_fleet(workspace: Workspace, repo_count: int) -> Dict:
+    """End-to-end commit_to_all_repos against a stub API, for each fleet executor.
+
+    The cold run clones every repository; the warm run repeats it over the
+    existing clones (fetch, commit, push).
+    """
+    repositories = []
+    for index in range(repo_count):
+        name = f"fleet{index}"
+        repositories.append({
+            "name": name,
+            "full_name": f"bench/{name}",
+            "clone_url": workspace.bare_remote(name),
+            "private": False,
+            "default_branch": "main",
+            "pushed_at": "2025-01-01T00:00:00Z",
+            "updated_at": "2025-01-01T00:00:00Z",
+        })
+
+    api = StubGitHubAPI(repositories)
+    results = {}
+    try:
+        for executor in ("threads", "asyncio"):
+            run_dir = Path(workspace.root) / f"fleet-{executor}"
+            run_dir.mkdir()
+            config = workspace.config(".")
+            config.update({
+                "github_api_url": api.url,
+                "fleet_executor": executor,
+                "repo_cache_file": str(run_dir / "repo_cache.json"),
+                "ledger_file": str(run_dir / "run_ledger.sqlite3"),
+                "log_file": "auto_commit.log",
+            })
+            config_file = run_dir / "config.json"
+            config_file.write_text(json.dumps(config))
+
+            bot = GitHubAutoCommitBot()
+            bot.github_username = "bench"
+            bot.github_token = "bench-token"
+            bot.commit_config_file = config_file
+            bot.repos_dir = run_dir / "repos"
+            if not bot.validate_github_token():
+                raise RuntimeError("stub API refused the repository listing")
+
+            for run in ("cold", "warm"):
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    # The warm run repeats repositories the ledger already has done today
+                    bot.commit_to_all_repos(skip_completed=False)
+                elapsed = time.perf_counter() - started
+                results[f"{executor}/{run}"] = {
+                    "repos": repo_count,
+                    "seconds": round(elapsed, 3),
+                    "repos_per_sec": round(repo_count / elapsed, 2) if elapsed else 0.0,
+                }
+            if bot.api_client:
+                bot.api_client.close()
+    finally:
+        api.close()
+    results["api_requests"] = api.requests
+    return results
+
+
+def bench_api(pages: int, rate_limit: int, window: int) -> Dict:
+    """Paginated repository listing against the stub API, unlimited and rate limited.
+
+    The limited case allows rate_limit requests per window seconds, less
+    than the listing needs, plus an occasional secondary-limit refusal; the
+    governor has to pace the requests so the listing completes anyway.
+    """
+    per_page = 100
+    repositories = [{"name": f"api{index}", "full_name": f"bench/api{index}"}
+                    for index in range(pages * per_page)]
+    cases = {
+        "unlimited": {},
+        "limited": {"rate_limit": rate_limit, "window": window, "secondary_every": 7},
+    }
+    results = {}
+    for case, limits in cases.items():
+        for client_name in ("sync", "async"):
+            api = StubGitHubAPI(repositories, **limits)
+            governor = RateGovernor(rate=50, burst=10, max_wait=window * 10, max_retries=5,
+                                    backoff_base=0.5)
+            try:
+                started = time.perf_counter()
+                if client_name == "sync":
+                    client = GitHubAPIClient("bench-token", base_url=api.url, governor=governor)
+                    listed = client.list_repositories()
+                    client.close()
+                else:
+                    async def listing():
+                        client = AsyncGitHubAPIClient("bench-token", base_url=api.url, governor=governor)
+                        try:
+                            return await client.list_repositories()
+                        finally:
+                            await client.close()
+                    listed = asyncio.run(listing())
+                elapsed = time.perf_counter() - started
+            finally:
+                api.close()
+            if len(listed) != len(repositories):
+                raise RuntimeError(f"listed {len(listed)} of {len(repositories)} repositories")
+            results[f"{case}/{client_name}"] = {
+                "pages": pages,
+                "seconds": round(elapsed, 3),
+                "requests": api.requests,
+                "refused": api.refused,
+                "waited_seconds": round(governor.stats["waited"], 3),
+            }
+    return results
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    """Map "benchmark/case/metric" paths to numeric values."""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}/{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Describe every timing or rate that is more than threshold worse than the baseline.
+
+    Medians, p95s and durations are better lower, *_per_sec better higher;
+    counts and the noisier means and maxima are not compared.
+    """
+    current = flatten(results)
+    regressions = []
+    for path, before in sorted(flatten(baseline).items()):
+        after = current.get(path)
+        if after is None or not before:
+            continue
+        if path.endswith("_per_sec"):
+            change = (before - after) / before
+        elif path.endswith(("p50_ms", "p95_ms", "seconds")):
+            change = (after - before) / before
+        else:
+            continue
+        marker = "❌" if change > threshold else "  "
+        print(f"{marker} {path:<45} {before:>10g} -> {after:<10g} ({-change:+.0%})")
+        if change > threshold:
+            regressions.append(path)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark commits, backfills, pushes and fleet runs")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS,
+                        help="Benchmarks to run (default: all)")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS,
+                        help="Git backends to compare (unavailable ones are skipped)")
+    parser.add_argument("--commits", type=int, default=50, help="Commits timed per backend (default: 50)")
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 365, 1000],
+                        help="Backfill lengths in days (default: 30 365 1000)")
+    parser.add_argument("--pushes", type=int, default=20, help="Pushes timed (default: 20)")
+    parser.add_argument("--repos", type=int, default=10,
+                        help="Repositories in the fleet run and the push queue (default: 10)")
+    parser.add_argument("--push-latency", type=float, default=0.1,
+                        help="Seconds the push-queue remotes wait before answering (default: 0.1)")
+    parser.add_argument("--push-concurrency", type=int, default=8,
+                        help="Concurrent pushes of the push queue (default: 8)")
+    parser.add_argument("--pages", type=int, default=20, help="Pages in the API listing (default: 20)")
+    parser.add_argument("--rate-limit", type=int, default=8,
+                        help="Requests per window the rate-limited stub API allows (default: 8)")
+    parser.add_argument("--window", type=int, default=2,
+                        help="Rate limit window of the stub API in seconds (default: 2)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against results saved earlier with --output")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown reported as a regression (default: 0.2)")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary repositories")
+    args = parser.parse_args()
+
+    for name, value in GIT_IDENTITY.items():
+        os.environ.setdefault(name, value)
+
+    workspace = Workspace(keep=args.keep)
+    results = {}
+    try:
+        if "commit" in args.only:
+            results["commit"] = bench_commit(workspace, args.backends, args.commits)
+            for backend, summary in results["commit"].items():
+                print(f"commit   {backend:<12} p50 {summary['p50_ms']:8.2f}ms  p95 {summary['p95_ms']:8.2f}ms")
+        if "backfill" in args.only:
+            results["backfill"] = bench_backfill(workspace, args.backends, args.days)
+            for case, summary in results["backfill"].items():
+                print(f"backfill {case:<17} {summary['commits']:>6} commits {summary['seconds']:8.2f}s  "
+                      f"{summary['commits_per_sec']:10.1f} commits/s")
+        if "push" in args.only:
+            results["push"] = bench_push(workspace, args.pushes)
+            summary = results["push"]["push"]
+            print(f"push     p50 {summary['p50_ms']:8.2f}ms  p95 {summary['p95_ms']:8.2f}ms")
+        if "push-queue" in args.only:
+            results["push-queue"] = bench_push_queue(workspace, args.repos, args.push_latency,
+                                                     args.push_concurrency)
+            for case, summary in results["push-queue"].items():
+                sent = f"{summary['bytes']:>8} bytes" if summary["bytes"] is not None else ""
+                print(f"pushq    {case:<14} {summary['repos']:>4} repos {summary['seconds']:8.2f}s  "
+                      f"{summary['repos_per_sec']:8.2f} repos/s  {summary['pushed']:>4} pushed {sent}")
+        if "fleet" in args.only:
+            results["fleet"] = bench_fleet(workspace, args.repos)
+            for case, summary in results["fleet"].items():
+                if isinstance(summary, dict):
+                    print(f"fleet    {case:<14} {summary['repos']:>4} repos {summary['seconds']:8.2f}s  "
+                          f"{summary['repos_per_sec']:8.2f} repos/s")
+        if "api" in args.only:
+            results["api"] = bench_api(args.pages, args.rate_limit, args.window)
+            for case, summary in results["api"].items():
+                print(f"api      {case:<17} {summary['pages']:>4} pages {summary['seconds']:8.2f}s  "
+                      f"{summary['requests']:>4} requests {summary['refused']:>3} refused  "
+                      f"waited {summary['waited_seconds']:.2f}s")
+    finally:
+        workspace.cleanup()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "git": git('--version'),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        print(f"\nAgainst baseline from {baseline['meta']['timestamp']} (threshold {args.threshold:.0%}):")
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions")
+            return 1
+        print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
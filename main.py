@@ -4,14 +4,34 @@ GitHub Auto Commit Bot - Main Interface
 Interactive menu for GitHub automation with user authentication
 """
 
+import argparse
+import asyncio
 import os
 import sys
 import json
+import sqlite3
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-import requests
 from typing import List, Dict, Optional
 
+sys.path.insert(0, str(Path(__file__).parent / "scripts"))
+from activity import ActivityFiles
+from fleet import FleetOrchestrator, disk_usage
+from git_backend import GitBackendError, create_backend
+from github_auto_commit import GitHubAutoCommit
+from git_history import find_repositories
+from ledger import FleetRun, RunLedger
+from github_api import DEFAULT_API_URL, AsyncGitHubAPIClient, GitHubAPIClient, GitHubAPIError
+from maintenance import maintain_repositories, print_results
+from metrics import REGISTRY, profiled, span
+from push_queue import PushQueue, summarize_pushes
+from rate_limit import RateGovernor
+from repo_cache import RepoCache
+from repo_lock import RepoLock, RepoLockTimeout
+
 class GitHubAutoCommitBot:
     def __init__(self):
         self.github_username = ""
@@ -19,6 +39,14 @@ class GitHubAutoCommitBot:
         self.repositories = []
         self.config_file = "configs/github_config.json"
         self.script_dir = Path(__file__).parent
+        self.commit_config_file = self.script_dir / "configs" / "config.json"
+        self.repos_dir = Path("repos")
+        self.commit_config = None
+        self.api_client = None
+        self.repo_cache = None
+        self.ledger = None
+        self.skip_completed = True
+        self.force_refresh = False
         
     def clear_screen(self):
         """Clear the terminal screen."""
@@ -36,8 +64,7 @@ class GitHubAutoCommitBot:
         """Save GitHub credentials to config file."""
         config_data = {
             "github_username": self.github_username,
-            "github_token": self.github_token,
-            "last_used_repos": self.repositories
+            "github_token": self.github_token
         }
         
         # Create configs directory if it doesn't exist
@@ -57,42 +84,113 @@ class GitHubAutoCommitBot:
                     config_data = json.load(f)
                     self.github_username = config_data.get("github_username", "")
                     self.github_token = config_data.get("github_token", "")
-                    self.repositories = config_data.get("last_used_repos", [])
+                    # Older config files carried the repository list
+                    self.repositories = (self.get_repo_cache().repositories()
+                                         or config_data.get("last_used_repos", []))
                 return True
         except Exception as e:
             print(f"❌ Error loading credentials: {e}")
         return False
     
-    def validate_github_token(self) -> bool:
-        """Validate GitHub token by fetching user repos."""
+    def load_commit_config(self) -> Dict:
+        """Load the auto commit configuration once and share it across repositories."""
+        if self.commit_config is None:
+            self.commit_config = GitHubAutoCommit.read_config(str(self.commit_config_file))
+        return self.commit_config
+    
+    def create_git_backend(self, repo_path: str):
+        """Create the git backend selected by git_backend in the commit config."""
+        name = self.load_commit_config().get("git_backend", "subprocess")
         try:
-            headers = {
-                "Authorization": f"token {self.github_token}",
-                "Accept": "application/vnd.github.v3+json"
-            }
-            
-            response = requests.get(
-                f"https://api.github.com/user/repos",
-                headers=headers,
-                params={"per_page": 100}
+            return create_backend(name, repo_path)
+        except GitBackendError as e:
+            print(f"⚠️  {e}; using subprocess backend")
+            return create_backend("subprocess", repo_path)
+    
+    def get_api_client(self) -> GitHubAPIClient:
+        """Return the pooled API client for the current token, reusing its ETag cache.
+        
+        A new token gets a new rate governor, since GitHub budgets requests per token.
+        """
+        if self.api_client is None or self.api_client.token != self.github_token:
+            etag_cache = self.api_client.etag_cache if self.api_client else None
+            if self.api_client:
+                self.api_client.close()
+            config = self.load_commit_config()
+            self.api_client = GitHubAPIClient(
+                self.github_token,
+                base_url=config.get("github_api_url", DEFAULT_API_URL),
+                max_workers=int(config.get("max_workers", 4)),
+                etag_cache=etag_cache,
+                governor=RateGovernor.from_config(config)
             )
-            
-            if response.status_code == 200:
-                repos_data = response.json()
-                self.repositories = [
-                    {
-                        "name": repo["name"],
-                        "full_name": repo["full_name"],
-                        "clone_url": repo["clone_url"],
-                        "private": repo["private"]
-                    }
-                    for repo in repos_data
-                ]
-                return True
+        return self.api_client
+    
+    def get_repo_cache(self) -> RepoCache:
+        """Return the on-disk repository metadata cache, loading it on first use."""
+        if self.repo_cache is None:
+            config = self.load_commit_config()
+            self.repo_cache = RepoCache(
+                config.get("repo_cache_file", "configs/repo_cache.json"),
+                ttl=int(config.get("repo_cache_ttl", 3600)),
+                full_every=int(config.get("repo_cache_full_every", 24))
+            )
+            self.repo_cache.load()
+        return self.repo_cache
+    
+    def open_ledger(self) -> Optional[RunLedger]:
+        """Open the run ledger configured by ledger_file, or return None when it is disabled."""
+        try:
+            return RunLedger.from_config(self.load_commit_config(), str(self.script_dir))
+        except (sqlite3.Error, ValueError) as e:
+            print(f"⚠️  Run ledger unavailable, not recording this run: {e}")
+            return None
+    
+    def pending_repositories(self, skip_completed: bool = True) -> List[Dict]:
+        """The repositories to run: those without a successful run in the ledger's current window."""
+        if not (skip_completed and self.ledger):
+            return list(self.repositories)
+        completed = self.ledger.completed()
+        pending = [repo for repo in self.repositories if repo['name'] not in completed]
+        skipped = len(self.repositories) - len(pending)
+        if skipped:
+            print(f"⏭  Skipping {skipped} repositories already completed in {self.ledger.window_key()}")
+        return pending
+    
+    def begin_fleet_run(self, executor: str, repos: List[Dict]) -> Optional[FleetRun]:
+        """Record the start of a fleet run in the ledger, if there is one."""
+        if not self.ledger:
+            return None
+        return self.ledger.begin(executor, len(repos), skipped=len(self.repositories) - len(repos))
+    
+    def validate_github_token(self, force_refresh: bool = False) -> bool:
+        """Validate GitHub token and load user repos through the metadata cache.
+        
+        The token is always checked with a /user request (revalidated by
+        ETag); a fresh cache filled with the same token then spares the
+        repository listing. force_refresh, or --refresh-repos for the first
+        validation, lists every repository again, dropping deleted ones.
+        """
+        try:
+            client = self.get_api_client()
+            client.get_user()
+            cache = self.get_repo_cache()
+            mode = cache.refresh(client, self.github_username, force=force_refresh or self.force_refresh)
+            if mode != "cache":
+                cache.save()
+            if mode == "full":
+                self.force_refresh = False
+            self.repositories = cache.repositories()
+            if mode == "cache":
+                print(f"📦 Loaded {len(self.repositories)} repositories from cache")
+            return True
+        except GitHubAPIError as e:
+            if e.reset_at:
+                resets = time.strftime("%H:%M:%S", time.localtime(e.reset_at))
+                print(f"⏳ GitHub API rate limit reached; it resets at {resets}")
             else:
-                print(f"❌ GitHub API error: {response.status_code}")
-                return False
-                
+                print(f"❌ GitHub API error: {e.status_code}")
+            return False
         except Exception as e:
             print(f"❌ Error validating token: {e}")
             return False
@@ -147,81 +245,401 @@ class GitHubAutoCommitBot:
         print(f"\nTotal: {len(self.repositories)} repositories")
     
     def clone_repository(self, repo_full_name: str, repo_clone_url: str) -> str:
-        """Clone a repository to local directory."""
+        """Clone a repository to local directory, or refresh an existing clone.
+        
+        New clones honour clone_filter, clone_depth and clone_sparse from the
+        commit config; existing clones are fetched and fast-forwarded.
+        """
         repo_name = repo_full_name.split('/')[-1]
-        local_path = Path(f"repos/{repo_name}")
+        local_path = self.repos_dir / repo_name
+        config = self.load_commit_config()
+        depth = config.get("clone_depth")
         
         # Create repos directory if it doesn't exist
         local_path.parent.mkdir(exist_ok=True)
         
         if local_path.exists():
-            print(f"📁 Repository '{repo_name}' already exists locally")
+            try:
+                print(f"🔄 Updating existing clone of {repo_name}...")
+                if not self.create_git_backend(str(local_path)).update(depth=depth):
+                    print(f"⚠️  {repo_name} has diverged from its remote; leaving it as is")
+            except subprocess.CalledProcessError as e:
+                print(f"⚠️  Failed to fetch {repo_name}, using local copy: {e}")
             return str(local_path)
         
         try:
             print(f"📥 Cloning {repo_name}...")
-            subprocess.run([
-                "git", "clone", repo_clone_url, str(local_path)
-            ], check=True, capture_output=True)
+            sparse_paths = None
+            if config.get("clone_sparse"):
+                # Cover the rotated activity shards, not just the configured names
+                sparse_paths = ActivityFiles.from_config(config).sparse_patterns(config["files_to_modify"])
+            self.create_git_backend(str(local_path)).clone(
+                repo_clone_url,
+                blob_filter=config.get("clone_filter"),
+                depth=depth,
+                sparse_paths=sparse_paths
+            )
             print(f"✅ Successfully cloned {repo_name}")
             return str(local_path)
         except subprocess.CalledProcessError as e:
             print(f"❌ Failed to clone {repo_name}: {e}")
             return ""
     
-    def commit_to_repository(self, repo_path: str, repo_name: str) -> bool:
-        """Make auto commit to a specific repository."""
+    def repo_lock(self, repo: Dict) -> Optional[RepoLock]:
+        """Advisory lock of repo's clone under repos_dir (None when repo_lock is off)."""
+        self.repos_dir.mkdir(exist_ok=True)
+        return RepoLock.from_config(str(self.repos_dir / repo['full_name'].split('/')[-1]),
+                                    self.load_commit_config())
+    
+    @staticmethod
+    def disk_usage(path: str) -> int:
+        """Total size in bytes of the files below path."""
+        return disk_usage(path)
+    
+    def commit_to_repository(self, repo_path: str, repo_name: str, push: bool = True) -> Dict:
+        """Make auto commit to a specific repository.
+        
+        Returns a result dict with success, commits, pushed and error.
+        push=False leaves pushing to the caller.
+        """
+        if self.load_commit_config().get("commit_execution", "in-process") == "subprocess":
+            result = self.run_commit_subprocess(repo_path, push)
+        else:
+            result = self.run_commit_in_process(repo_path, repo_name, push)
+        
+        if result["success"]:
+            print(f"✅ Successfully committed to {repo_name}")
+        else:
+            print(f"❌ Failed to commit to {repo_name}: {result['error']}")
+        return result
+    
+    def run_commit_in_process(self, repo_path: str, repo_name: str, push: bool = True,
+                              stop_event: Optional[threading.Event] = None) -> Dict:
+        """Run GitHubAutoCommit for one repository inside this process.
+        
+        Setting stop_event ends the daily routine before its next commit.
+        """
+        config = dict(self.load_commit_config())
+        config["repository_path"] = repo_path
+        config["repo_name"] = repo_name
+        if not os.path.isabs(config["log_file"]):
+            config["log_file"] = os.path.join(repo_path, config["log_file"])
+        
+        auto_commit = None
         try:
-            # Change to repository directory
-            original_dir = os.getcwd()
-            os.chdir(repo_path)
-            
-            # Run the auto commit script
+            auto_commit = GitHubAutoCommit(
+                str(self.commit_config_file),
+                config=config,
+                logger_name=f"auto_commit.{repo_name}"
+            )
+            if stop_event is not None:
+                auto_commit.stop_event = stop_event
+            return auto_commit.execute(mode="daily", push=push)
+        except Exception as e:
+            return {"success": False, "commits": 0, "pushed": False, "error": str(e)}
+        finally:
+            if auto_commit:
+                auto_commit.close()
+    
+    def run_commit_subprocess(self, repo_path: str, push: bool = True) -> Dict:
+        """Run the auto commit script in a separate interpreter for isolation."""
+        result = {"success": False, "commits": 0, "pushed": False, "error": None}
+        try:
+            # Run the auto commit script inside the repository directory
             script_path = self.script_dir / "scripts" / "github_auto_commit.py"
-            result = subprocess.run([
-                sys.executable, str(script_path), 
-                "--mode", "daily",
-                "--config", str(self.script_dir / "configs" / "config.json")
-            ], capture_output=True, text=True)
+            with span("commit_subprocess"):
+                process = subprocess.run([
+                    sys.executable, str(script_path), 
+                    "--mode", "daily",
+                    "--config", str(self.commit_config_file),
+                    "--no-lock"  # the caller holds the repository lock
+                ] + ([] if push else ["--no-push"]), cwd=repo_path, capture_output=True, text=True)
             
-            if result.returncode == 0:
-                print(f"✅ Successfully committed to {repo_name}")
-                return True
+            if process.returncode == 0:
+                result["success"] = True
+                for line in process.stdout.splitlines():
+                    if line.startswith("Successfully made "):
+                        result["commits"] = int(line.split()[2])
             else:
-                print(f"❌ Failed to commit to {repo_name}: {result.stderr}")
-                return False
-                
+                result["error"] = process.stderr.strip() or process.stdout.strip()
         except Exception as e:
-            print(f"❌ Error committing to {repo_name}: {e}")
-            return False
-        finally:
-            # Return to original directory
-            os.chdir(original_dir)
+            result["error"] = str(e)
+        return result
     
-    def commit_to_all_repos(self):
-        """Commit to all repositories."""
-        print("\n🔄 Committing to ALL repositories...")
-        print("-" * 40)
+    def process_repository(self, repo: Dict, push_queue: Optional[PushQueue] = None) -> Dict:
+        """Clone (if needed) and commit to one repository, timing each step.
         
-        success_count = 0
-        total_count = len(self.repositories)
+        With push_queue the new commits are queued there instead of pushed.
+        """
+        result = {"name": repo['name'], "success": False, "commits": 0, "pushed": False,
+                  "clone_time": 0.0, "commit_time": 0.0, "disk_usage": 0, "error": None,
+                  "lock_wait": 0.0}
         
-        for repo in self.repositories:
-            print(f"\nProcessing: {repo['name']}")
-            
-            # Clone repository if needed
+        started = time.perf_counter()
+        lock = self.repo_lock(repo)
+        try:
+            if lock:
+                result["lock_wait"] = lock.acquire()
+            clone_started = time.perf_counter()
             repo_path = self.clone_repository(repo['full_name'], repo['clone_url'])
-            if not repo_path:
-                continue
+            result["clone_time"] = time.perf_counter() - clone_started
             
-            # Make commit
-            if self.commit_to_repository(repo_path, repo['name']):
-                success_count += 1
+            if repo_path:
+                result["disk_usage"] = self.disk_usage(repo_path)
+                commit_started = time.perf_counter()
+                commit_result = self.commit_to_repository(repo_path, repo['name'], push=push_queue is None)
+                result["success"] = commit_result["success"]
+                result["commits"] = commit_result["commits"]
+                result["pushed"] = commit_result["pushed"]
+                result["error"] = commit_result["error"]
+                result["commit_time"] = time.perf_counter() - commit_started
+                if (push_queue is not None and result["success"] and result["commits"] > 0
+                        and not self.load_commit_config().get("dry_run")):
+                    push_queue.add(repo['name'], self.create_git_backend(repo_path), lock)
+                    result["push_queued"] = True
+            else:
+                result["error"] = "clone failed"
+        except RepoLockTimeout as e:
+            result["lock_wait"] = e.waited
+            result["lock_busy"] = True
+            result["error"] = str(e)
+            print(f"⏭  Skipping {repo['name']}: {e}")
+        finally:
+            if lock:
+                lock.release()
         
-        print(f"\n📊 Summary: {success_count}/{total_count} repositories updated successfully")
+        result["total_time"] = time.perf_counter() - started
+        return result
+    
+    def resume_push(self, repo: Dict, push_queue: PushQueue) -> Optional[Dict]:
+        """Queue the push of commits an interrupted run made in repo's clone, without committing again.
+        
+        Returns None when the clone is gone, so the repository is run afresh.
+        """
+        repo_path = self.repos_dir / repo['full_name'].split('/')[-1]
+        if not (repo_path / ".git").exists():
+            return None
+        print(f"📤 {repo['name']} has unpushed commits from an earlier run; pushing them instead")
+        push_queue.add(repo['name'], self.create_git_backend(str(repo_path)), self.repo_lock(repo))
+        return {"name": repo['name'], "success": True, "commits": 0, "pushed": False,
+                "clone_time": 0.0, "commit_time": 0.0, "total_time": 0.0,
+                "disk_usage": self.disk_usage(str(repo_path)), "error": None,
+                "lock_wait": 0.0, "push_queued": True}
+    
+    def commit_to_all_repos(self, skip_completed: bool = True):
+        """Commit to all repositories with the executor chosen by fleet_executor.
+        
+        Every repository run is recorded in the run ledger; with
+        skip_completed, repositories that already completed in the ledger's
+        window are left out, so a rerun after a crash or failures only
+        retries what did not finish. Dry runs are not recorded, so they
+        never make a real run skip anything.
+        """
+        REGISTRY.reset()
+        if self.load_commit_config().get("dry_run"):
+            print("🧪 Dry run: not recording it in the run ledger")
+            self.ledger = None
+        else:
+            self.ledger = self.open_ledger()
+        try:
+            if self.load_commit_config().get("fleet_executor", "threads") == "asyncio":
+                self.commit_to_all_repos_async(skip_completed)
+            else:
+                self.commit_to_all_repos_threaded(skip_completed)
+        finally:
+            if self.ledger:
+                self.ledger.close()
+                self.ledger = None
+        self.report_metrics()
+    
+    def commit_to_all_repos_threaded(self, skip_completed: bool = True):
+        """Commit to all repositories from a pool of max_workers threads.
+        
+        Pushes are queued while the pool commits and sent together at the
+        end, push_concurrency at a time. Each repository is recorded in the
+        ledger as committed once its commit stage returns, so commits of a
+        run interrupted before its pushes are pushed, not made again, by
+        the next run.
+        """
+        config = self.load_commit_config()
+        max_workers = max(1, int(config.get("max_workers", 4)))
+        
+        print(f"\n🔄 Committing to ALL repositories ({max_workers} workers)...")
+        print("-" * 40)
+        
+        repos = self.pending_repositories(skip_completed)
+        unpushed = self.ledger.unpushed() if skip_completed and self.ledger else set()
+        fleet_run = self.begin_fleet_run("threads", repos)
+        push_queue = PushQueue.from_config(config)
+        results = []
+        repo_runs = {}
+        started = time.perf_counter()
+        
+        def run(repo: Dict) -> Dict:
+            if repo['name'] in unpushed:
+                result = self.resume_push(repo, push_queue)
+                if result:
+                    return result
+            try:
+                return self.process_repository(repo, push_queue)
+            except Exception as e:
+                print(f"❌ Error processing {repo['name']}: {e}")
+                return {"name": repo['name'], "success": False, "commits": 0, "pushed": False,
+                        "clone_time": 0.0, "commit_time": 0.0, "total_time": 0.0,
+                        "disk_usage": 0, "error": str(e)}
+        
+        def process(repo: Dict) -> Dict:
+            if not fleet_run:
+                return run(repo)
+            repo_run = repo_runs[repo['name']] = fleet_run.start(repo['name'])
+            result = run(repo)
+            if result.get("push_queued"):
+                fleet_run.committed(repo_run, result)
+            else:
+                fleet_run.finish(repo_run, result)
+            return result
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(process, repo) for repo in repos]
+            for future in as_completed(futures):
+                results.append(future.result())
+        
+        if push_queue:
+            print(f"\n📤 Pushing {len(push_queue)} repositories ({push_queue.concurrency} at a time)...")
+            pushes = push_queue.push_all()
+            for result in results:
+                push = pushes.get(result["name"])
+                if not push:
+                    continue
+                result["push_time"] = push["latency"]
+                result["push_status"] = push["status"]
+                result["push_bytes"] = push["bytes"]
+                result["lock_wait"] += push["lock_wait"]
+                result["total_time"] += push["lock_wait"] + push["latency"]
+                result["pushed"] = push["status"] in ("pushed", "up-to-date")
+                if result["pushed"]:
+                    result["pushed_sha"] = push["sha"]
+                elif push["error"]:
+                    result["success"] = False
+                    result["error"] = push["error"]
+                    print(f"❌ Failed to push {result['name']}: {push['error']}")
+        
+        if fleet_run:
+            for result in results:
+                if result.get("push_queued"):
+                    fleet_run.finish(repo_runs[result["name"]], result)
+            fleet_run.end(results)
+        self.print_fleet_results(results, time.perf_counter() - started)
+    
+    def create_fleet(self) -> FleetOrchestrator:
+        """Build the asyncio orchestrator for the configured commit_execution."""
+        config = self.load_commit_config()
+        if config.get("commit_execution", "in-process") == "subprocess":
+            script_path = self.script_dir / "scripts" / "github_auto_commit.py"
+            return FleetOrchestrator(config, self.repos_dir, commit_command=[
+                sys.executable, str(script_path), "--mode", "daily", "--no-push",
+                "--config", str(self.commit_config_file),
+                "--no-lock"  # the orchestrator holds the repository lock
+            ])
+        return FleetOrchestrator(
+            config, self.repos_dir,
+            commit_runner=lambda path, name, stop_event: self.run_commit_in_process(
+                path, name, push=False, stop_event=stop_event)
+        )
+    
+    async def run_fleet(self, orchestrator: FleetOrchestrator, skip_completed: bool = True) -> List[Dict]:
+        """Refresh the repository list through the async API client, then run the fleet."""
+        config = self.load_commit_config()
+        api_client = AsyncGitHubAPIClient(
+            self.github_token,
+            base_url=config.get("github_api_url", DEFAULT_API_URL),
+            max_workers=int(config.get("max_workers", 4)),
+            etag_cache=self.get_api_client().etag_cache,
+            governor=self.get_api_client().governor
+        )
+        try:
+            cache = self.get_repo_cache()
+            if await cache.refresh_async(api_client, self.github_username) != "cache":
+                cache.save()
+            self.repositories = cache.repositories() or self.repositories
+        except (GitHubAPIError, OSError) as e:
+            print(f"⚠️  Could not refresh repositories, using the loaded list: {e}")
+        finally:
+            await api_client.close()
+        
+        repos = self.pending_repositories(skip_completed)
+        orchestrator.recorder = self.begin_fleet_run("asyncio", repos)
+        if skip_completed and self.ledger:
+            orchestrator.unpushed = self.ledger.unpushed()
+        try:
+            return await orchestrator.run(repos)
+        finally:
+            if orchestrator.recorder:
+                orchestrator.recorder.end(orchestrator.results)
+    
+    def commit_to_all_repos_async(self, skip_completed: bool = True):
+        """Commit to all repositories through the asyncio clone/commit/push pipeline."""
+        print("\n🔄 Committing to ALL repositories (asyncio pipeline)...")
+        print("-" * 40)
+        
+        orchestrator = self.create_fleet()
+        started = time.perf_counter()
+        try:
+            asyncio.run(self.run_fleet(orchestrator, skip_completed))
+        except KeyboardInterrupt:
+            print("\n⏹  Fleet run cancelled; unfinished repositories are marked as failed")
+        
+        self.print_fleet_results(orchestrator.results, time.perf_counter() - started)
+        
+        print("\n🚦 Stage metrics:")
+        print(f"{'Stage':<8} {'Slots':>5} {'Done':>5} {'Max queue':>9} {'Avg wait':>9} {'p50':>8} {'p95':>8} {'Max':>8}")
+        for stage in orchestrator.stage_report():
+            print(f"{stage['stage']:<8} {stage['concurrency']:>5} {stage['count']:>5} {stage['max_queue']:>9} "
+                  f"{stage['avg_wait']:>8.2f}s {stage['p50']:>7.2f}s {stage['p95']:>7.2f}s {stage['max']:>7.2f}s")
+    
+    def print_fleet_results(self, results: List[Dict], elapsed: float):
+        """Print the per-repository timing table and the summary line."""
+        total_count = len(results)
+        success_count = sum(1 for result in results if result["success"])
+        
+        print("\n⏱  Per-repository timings:")
+        print(f"{'Repository':<30} {'Commits':>7} {'Clone':>8} {'Commit':>8} {'Push':>8} {'Total':>8} {'Disk':>9}  Status")
+        for result in sorted(results, key=lambda r: r["name"]):
+            status = "✅" if result["success"] else "❌"
+            disk_mb = result['disk_usage'] / (1024 * 1024)
+            print(f"{result['name'][:30]:<30} {result['commits']:>7} {result['clone_time']:>7.2f}s "
+                  f"{result['commit_time']:>7.2f}s {result.get('push_time', 0.0):>7.2f}s "
+                  f"{result['total_time']:>7.2f}s {disk_mb:>7.1f}MB  {status}")
+        
+        waits = [result["lock_wait"] for result in results if "lock_wait" in result]
+        if waits:
+            busy = sum(1 for result in results if result.get("lock_busy"))
+            print(f"\n🔒 Lock waits: {sum(waits):.1f}s in total, max {max(waits):.1f}s; "
+                  f"{busy} repositories skipped as busy")
+        
+        pushes = summarize_pushes(results)
+        if pushes["pushed"] or pushes["up_to_date"] or pushes["failed"]:
+            print(f"\n📤 Pushes: {pushes['pushed']} pushed ({pushes['bytes'] / 1024:.1f} KB, "
+                  f"p50 {pushes['p50']:.2f}s, max {pushes['max']:.2f}s), "
+                  f"{pushes['up_to_date']} already up to date, {pushes['failed']} failed")
+        print(f"\n📊 Summary: {success_count}/{total_count} repositories updated successfully "
+              f"({total_count - success_count} failed) in {elapsed:.1f}s")
+    
+    def report_metrics(self):
+        """Print the per-phase timings of the last run and export them as configured."""
+        print("\n🔬 Phase timings:")
+        for row in REGISTRY.format_summary():
+            print(row)
+        
+        config = self.load_commit_config()
+        try:
+            REGISTRY.export(config.get("metrics_textfile"), config.get("metrics_summary"))
+        except OSError as e:
+            print(f"⚠️  Could not export metrics: {e}")
     
     def commit_to_selected_repo(self):
         """Commit to a selected repository."""
+        REGISTRY.reset()
         self.list_repositories()
         
         try:
@@ -230,20 +648,29 @@ class GitHubAutoCommitBot:
                 selected_repo = self.repositories[choice]
                 print(f"\n🎯 Selected: {selected_repo['name']}")
                 
-                # Clone repository if needed
-                repo_path = self.clone_repository(
-                    selected_repo['full_name'], 
-                    selected_repo['clone_url']
-                )
-                
-                if repo_path:
-                    # Make commit
-                    if self.commit_to_repository(repo_path, selected_repo['name']):
-                        print("✅ Operation completed successfully!")
+                lock = self.repo_lock(selected_repo)
+                try:
+                    if lock and lock.acquire() >= 1:
+                        print(f"🔒 Waited {lock.waited:.1f}s for another run to finish with {selected_repo['name']}")
+                    
+                    # Clone repository if needed
+                    repo_path = self.clone_repository(
+                        selected_repo['full_name'], 
+                        selected_repo['clone_url']
+                    )
+                    
+                    if repo_path:
+                        # Make commit
+                        if self.commit_to_repository(repo_path, selected_repo['name'])["success"]:
+                            print("✅ Operation completed successfully!")
+                        else:
+                            print("❌ Commit operation failed")
+                        self.report_metrics()
                     else:
-                        print("❌ Commit operation failed")
-                else:
-                    print("❌ Failed to access repository")
+                        print("❌ Failed to access repository")
+                finally:
+                    if lock:
+                        lock.release()
             else:
                 print("❌ Invalid selection")
         except ValueError:
@@ -262,11 +689,12 @@ class GitHubAutoCommitBot:
             print("3. Commit to Specific Repository")
             print("4. Commit to ALL Repositories")
             print("5. View Saved Configuration")
-            print("6. Exit")
+            print("6. Maintain Local Repositories")
+            print("7. Exit")
             print()
             
             try:
-                choice = input("Select option (1-6): ").strip()
+                choice = input("Select option (1-7): ").strip()
                 
                 if choice == "1":
                     self.get_user_input()
@@ -284,18 +712,20 @@ class GitHubAutoCommitBot:
                     if self.github_token and self.repositories:
                         confirm = input("⚠️  This will commit to ALL repositories. Continue? (y/n): ")
                         if confirm.lower() == 'y':
-                            self.commit_to_all_repos()
+                            self.commit_to_all_repos(self.skip_completed)
                     else:
                         print("❌ Please authenticate and list repositories first")
                 elif choice == "5":
                     self.show_config()
                 elif choice == "6":
+                    self.maintain_local_repos()
+                elif choice == "7":
                     print("👋 Goodbye!")
                     break
                 else:
                     print("❌ Invalid option. Please try again.")
                 
-                if choice != "6":
+                if choice != "7":
                     input("\nPress Enter to continue...")
                     
             except KeyboardInterrupt:
@@ -305,6 +735,24 @@ class GitHubAutoCommitBot:
                 print(f"❌ Error: {e}")
                 input("Press Enter to continue...")
     
+    def maintain_local_repos(self):
+        """Repack and write commit-graphs for every clone under repos/."""
+        repo_paths = find_repositories(str(self.repos_dir))
+        if not repo_paths:
+            print(f"❌ No cloned repositories in {self.repos_dir}/")
+            return
+        
+        force = input("Maintain repositories below the loose-object threshold too? (y/n): ").lower() == 'y'
+        print(f"\n🧹 Maintaining {len(repo_paths)} repositories...")
+        print("-" * 40)
+        started = time.perf_counter()
+        results = maintain_repositories(repo_paths, self.load_commit_config(), force=force)
+        print_results(results)
+        
+        maintained = sum(1 for result in results if result.get("ran"))
+        print(f"\n📊 Summary: {maintained}/{len(results)} repositories maintained "
+              f"in {time.perf_counter() - started:.1f}s")
+    
     def show_config(self):
         """Display current configuration."""
         print("\n⚙️ Current Configuration:")
@@ -316,8 +764,29 @@ class GitHubAutoCommitBot:
 
 def main():
     """Main entry point."""
+    parser = argparse.ArgumentParser(description="GitHub Auto Commit Bot")
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Run under cProfile, dump the stats to FILE and print the hottest functions"
+    )
+    parser.add_argument(
+        "--rerun",
+        action="store_true",
+        help="Commit to ALL repositories, including those the run ledger shows completed in this window"
+    )
+    parser.add_argument(
+        "--refresh-repos",
+        action="store_true",
+        help="List every repository from GitHub again instead of updating the cached list"
+    )
+    args = parser.parse_args()
+    
     bot = GitHubAutoCommitBot()
-    bot.show_menu()
+    bot.skip_completed = not args.rerun
+    bot.force_refresh = args.refresh_repos
+    with profiled(args.profile):
+        bot.show_menu()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Activity Files
+Where commit activity lines go, with rotation that keeps every file small
+"""
+
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+
+ROTATIONS = ("ring", "monthly", "none")
+SEQUENCE = re.compile(rb"#(\d+)\s*$")
+
+
+class ActivityFiles:
+    """Writes the line each commit adds to one of the files_to_modify.
+
+    Appending to the same files forever makes every commit store a larger
+    blob, so history grows quadratically. Two rotations keep blobs bounded
+    while each commit still changes its file:
+
+    - "monthly": entries go to a per-month shard named after the
+      configured file (activity_log.txt -> activity_log/2025/01.txt),
+      dated by the commit, so no file outgrows one month of commits.
+      Nesting by year keeps every tree object git rewrites per commit
+      small too.
+    - "ring": the configured file keeps only its last ring_lines entries;
+      each carries a running #N so the content always changes.
+
+    "none" (the default) appends to the configured file as before; ring
+    rotation cuts an existing file down to its last ring_lines entries on
+    its next commit, so it is only used when configured.
+    """
+
+    def __init__(self, rotation: str = "none", ring_lines: int = 100):
+        if rotation not in ROTATIONS:
+            raise ValueError(f"Unknown activity rotation: {rotation}")
+        self.rotation = rotation
+        self.ring_lines = max(1, ring_lines)
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "ActivityFiles":
+        return cls(config.get('activity_rotation', "none"),
+                   int(config.get('activity_ring_lines', 100)))
+
+    def path_for(self, file_path: str, date: Optional[datetime] = None) -> str:
+        """Repository-relative path that receives the entry of a commit dated date."""
+        if self.rotation != "monthly":
+            return file_path
+        _, suffix = os.path.splitext(file_path)
+        return f"{self._shard_dir(file_path)}/{(date or datetime.now()):%Y/%m}{suffix}"
+
+    @staticmethod
+    def _shard_dir(file_path: str) -> str:
+        stem, suffix = os.path.splitext(file_path)
+        # A suffix-less name is likely an existing file; do not shadow it with a directory
+        return stem if suffix else f"{file_path}.d"
+
+    def entry(self, date: Optional[datetime] = None, sequence: Optional[int] = None) -> bytes:
+        """The line appended for one commit."""
+        timestamp = (date or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+        suffix = f" #{sequence}" if sequence is not None else ""
+        return f"[{timestamp}] Automated activity entry{suffix}\n".encode()
+
+    def updated(self, content: bytes, date: Optional[datetime] = None) -> bytes:
+        """File content after adding one commit's entry to content."""
+        if self.rotation != "ring":
+            return content + self.entry(date)
+
+        lines = content.splitlines(keepends=True)
+        match = SEQUENCE.search(lines[-1]) if lines else None
+        sequence = int(match.group(1)) + 1 if match else 1
+        kept = lines[max(0, len(lines) - self.ring_lines + 1):] if self.ring_lines > 1 else []
+        return b"".join(kept) + self.entry(date, sequence)
+
+    def write(self, full_path: str, date: Optional[datetime] = None):
+        """Add one commit's entry to the file at full_path, creating it if needed."""
+        directory = os.path.dirname(full_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.rotation != "ring":
+            with open(full_path, 'ab') as f:
+                f.write(self.entry(date))
+            return
+
+        content = b""
+        if os.path.exists(full_path):
+            with open(full_path, 'rb') as f:
+                content = f.read()
+        with open(full_path, 'wb') as f:
+            f.write(self.updated(content, date))
+
+    def sparse_patterns(self, files: List[str]) -> List[str]:
+        """Sparse-checkout paths covering files and every shard rotation may create."""
+        if self.rotation != "monthly":
+            return list(files)
+        patterns = []
+        for file_path in files:
+            patterns += [file_path, f"{self._shard_dir(file_path)}/"]
+        return patterns
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Backfill State
+Per-day checkpoints of a running backfill, so an interrupted one can resume
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+from commit_plan import CommitPlan
+
+BACKFILL_STATE_FILE = "auto_commit_backfill.json"
+BACKFILL_PLAN_FILE = "auto_commit_backfill_plan.json"
+
+
+class BackfillState:
+    """Progress of one repository's backfill, kept in its git directory.
+
+    The plan is saved once when the backfill starts; the small state file
+    is rewritten at every checkpoint with the number of plan entries
+    committed, the day they reach and the sha they led to. Both files are
+    removed when the backfill completes.
+    """
+
+    def __init__(self, auto_commit):
+        self.auto_commit = auto_commit
+        self.path = auto_commit.state_file(BACKFILL_STATE_FILE)
+        self.plan_path = auto_commit.state_file(BACKFILL_PLAN_FILE)
+        self.plan: Optional[CommitPlan] = None
+        self.done = 0
+        self.day = ""
+        self.sha = ""
+        self.started = ""
+
+    def load(self) -> bool:
+        """Load the state and plan of an unfinished backfill; returns False when there is none."""
+        try:
+            if self.path and os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    state = json.load(f)
+                self.plan = CommitPlan.load(self.plan_path)
+                self.done = int(state['done'])
+                self.day = state.get('day', "")
+                self.sha = state['sha']
+                self.started = state.get('started', "")
+                return True
+        except (OSError, ValueError, KeyError) as e:
+            self.auto_commit.logger.warning(f"Ignoring unreadable backfill state {self.path}: {e}")
+        return False
+
+    def start(self, plan: CommitPlan, sha: str):
+        """Record the start of a new backfill of plan on top of sha."""
+        self.plan = plan
+        self.done = 0
+        self.day = ""
+        self.sha = sha
+        self.started = datetime.now().isoformat(timespec="seconds")
+        if self.path:
+            plan.save(self.plan_path)
+            self.save()
+
+    def checkpoint(self, done: int, sha: str):
+        """Record that the first done plan entries are committed, ending at sha."""
+        self.done = done
+        self.sha = sha
+        if done:
+            self.day = datetime.fromtimestamp(self.plan.timestamps[done - 1]).date().isoformat()
+        self.save()
+
+    def save(self):
+        """Write the state atomically."""
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'done': self.done, 'total': len(self.plan), 'day': self.day,
+                       'sha': self.sha, 'started': self.started}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Forget the backfill (it completed or is being replaced)."""
+        for path in (self.path, self.plan_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def resume_point(self) -> int:
+        """Number of plan entries already in HEAD, counting commits made after the last checkpoint.
+
+        Raises ValueError when HEAD no longer continues the checkpointed
+        history with the plan's own commits.
+        """
+        commits = self.auto_commit.backend.commits_since(self.sha)
+        if commits is None:
+            raise ValueError(f"checkpoint {self.sha[:12]} is no longer part of the current branch")
+
+        done = self.done
+        plan = self.plan
+        for timestamp, subject in commits:
+            if (done >= len(plan) or timestamp != plan.timestamps[done]
+                    or subject != plan.messages[plan.message_ids[done]]):
+                raise ValueError(f"HEAD has commits after checkpoint {self.sha[:12]} "
+                                 f"that are not part of the backfill")
+            done += 1
+        return done
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Commit Plan
+The commits of a backfill decided up front, separate from executing them
+"""
+
+import json
+import os
+import random
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Optional dependency, imported by the first generate(); planned-mode cron
+# runs load this module and mostly have nothing to generate
+numpy = None
+
+
+def _load_numpy():
+    """Import numpy on first use; returns None when it is not installed."""
+    global numpy
+    if numpy is None:
+        try:
+            import numpy as module
+        except ImportError:
+            return None
+        numpy = module
+    return numpy
+
+
+class CommitPlan:
+    """Dates, messages and target files of a series of commits, oldest first.
+
+    Commits are stored column-wise: a timestamp array plus indices into the
+    plan's message and file lists, so a multi-year plan is a few compact
+    arrays that any git backend can execute and that serialize to a small
+    JSON file. Plans hold no repository state and can be reused across
+    repositories.
+    """
+
+    VERSION = 1
+
+    def __init__(self, messages: Sequence[str], files: Sequence[str]):
+        self.messages = list(messages)
+        self.files = list(files)
+        self.timestamps = array('q')
+        self.message_ids = array('I')
+        self.file_ids = array('I')
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @classmethod
+    def generate(cls, days: int, daily_commit_range: Sequence[int], messages: Sequence[str],
+                 files: Sequence[str], end: Optional[datetime] = None,
+                 seed: Optional[int] = None) -> "CommitPlan":
+        """Plan daily_commit_range commits (inclusive bounds) on each of the last days days.
+
+        Every commit of a day is dated at end's time of day, as the backfill
+        always has been. With NumPy installed the random draws are made as
+        whole arrays.
+        """
+        plan = cls(messages, files)
+        if days <= 0 or not plan.messages or not plan.files:
+            return plan
+
+        min_commits, max_commits = daily_commit_range
+        end_ts = int((end or datetime.now()).timestamp())
+        # Oldest day first; timedelta keeps the time of day across DST changes
+        end_date = datetime.fromtimestamp(end_ts)
+        day_starts = [int((end_date - timedelta(days=offset)).timestamp())
+                      for offset in range(days - 1, -1, -1)]
+
+        if _load_numpy() is not None:
+            rng = numpy.random.default_rng(seed)
+            counts = rng.integers(min_commits, max_commits + 1, size=days)
+            timestamps = numpy.repeat(numpy.asarray(day_starts, dtype=numpy.int64), counts)
+            total = int(timestamps.size)
+            plan.timestamps.frombytes(timestamps.astype('<i8').tobytes())
+            plan.message_ids.frombytes(
+                rng.integers(0, len(plan.messages), size=total).astype(numpy.uint32).tobytes())
+            plan.file_ids.frombytes(
+                rng.integers(0, len(plan.files), size=total).astype(numpy.uint32).tobytes())
+            return plan
+
+        rng = random.Random(seed)
+        for day_start in day_starts:
+            plan.timestamps.extend([day_start] * rng.randint(min_commits, max_commits))
+        total = len(plan.timestamps)
+        plan.message_ids = array('I', rng.choices(range(len(plan.messages)), k=total))
+        plan.file_ids = array('I', rng.choices(range(len(plan.files)), k=total))
+        return plan
+
+    def tail(self, start: int) -> "CommitPlan":
+        """The plan without its first start commits."""
+        plan = CommitPlan(self.messages, self.files)
+        plan.timestamps = self.timestamps[start:]
+        plan.message_ids = self.message_ids[start:]
+        plan.file_ids = self.file_ids[start:]
+        return plan
+
+    def entries(self) -> Iterator[Tuple[datetime, str, str]]:
+        """Yield (commit date, message, file) for every planned commit, oldest first."""
+        messages, files = self.messages, self.files
+        for timestamp, message_id, file_id in zip(self.timestamps, self.message_ids, self.file_ids):
+            yield datetime.fromtimestamp(timestamp), messages[message_id], files[file_id]
+
+    def summary(self) -> Dict:
+        """Commit count, date range and per-file counts of the plan."""
+        if not self.timestamps:
+            return {"commits": 0, "days": 0, "first": None, "last": None, "files": {}}
+        days = len({datetime.fromtimestamp(ts).date() for ts in self.timestamps})
+        return {
+            "commits": len(self),
+            "days": days,
+            "first": datetime.fromtimestamp(self.timestamps[0]).isoformat(timespec="seconds"),
+            "last": datetime.fromtimestamp(self.timestamps[-1]).isoformat(timespec="seconds"),
+            "files": {self.files[file_id]: count for file_id, count in Counter(self.file_ids).items()},
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": self.VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "messages": self.messages,
+            "files": self.files,
+            "timestamps": self.timestamps.tolist(),
+            "message_ids": self.message_ids.tolist(),
+            "file_ids": self.file_ids.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "CommitPlan":
+        """Rebuild a plan from to_dict() output; raises ValueError when it is inconsistent."""
+        if data.get("version") != cls.VERSION:
+            raise ValueError(f"unsupported commit plan version {data.get('version')!r}")
+        plan = cls(data["messages"], data["files"])
+        plan.timestamps = array('q', data["timestamps"])
+        plan.message_ids = array('I', data["message_ids"])
+        plan.file_ids = array('I', data["file_ids"])
+
+        if not len(plan.timestamps) == len(plan.message_ids) == len(plan.file_ids):
+            raise ValueError("commit plan columns differ in length")
+        if plan.timestamps and (max(plan.message_ids) >= len(plan.messages)
+                                or max(plan.file_ids) >= len(plan.files)):
+            raise ValueError("commit plan refers to unknown messages or files")
+        return plan
+
+    def save(self, path: str):
+        """Write the plan atomically as JSON."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CommitPlan":
+        """Read a plan written by save()."""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        try:
+            return cls.from_dict(data)
+        except (KeyError, TypeError, OverflowError) as e:
+            raise ValueError(f"malformed commit plan {path}: {e}") from e
+
+
+def message_choices(messages: Sequence[str], variations: Sequence[str]) -> List[str]:
+    """Every message/variation combination; a uniform pick matches two independent picks."""
+    return [f"{message}{variation}" for message in messages for variation in variations]
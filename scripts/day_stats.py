@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Day-Indexed Statistics
+Compact per-day counters backed by arrays indexed by date ordinal
+"""
+
+import os
+import struct
+import sys
+from array import array
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Optional dependency, only needed by max_streak()
+numpy = None
+
+
+def _load_numpy():
+    """Import numpy on first use; returns None when it is not installed."""
+    global numpy
+    if numpy is None:
+        try:
+            import numpy as module
+        except ImportError:
+            return None
+        numpy = module
+    return numpy
+
+
+@lru_cache(maxsize=None)
+def date_ordinal(date_str: str) -> int:
+    """Proleptic Gregorian ordinal of a YYYY-MM-DD string, parsed once per distinct day."""
+    return date.fromisoformat(date_str).toordinal()
+
+
+class DayStats:
+    """Per-day counters for any number of fields ("commits", "errors", ...).
+
+    Every field is an unsigned 32-bit array sharing one origin (the ordinal
+    of the first stored day), so a date lookup is a subtraction and analyses
+    run over contiguous memory. Weekday totals are strided slices, and when
+    NumPy is installed streaks are found on a zero-copy view of the buffer.
+    """
+
+    MAGIC = b"DAYSTAT1"
+    HEADER = struct.Struct("<8sBiII")  # magic, itemsize, origin, days, fields
+    TYPECODE = "I"
+
+    def __init__(self):
+        self.origin = 0
+        self.days = 0
+        self.fields: Dict[str, array] = {}
+
+    def __bool__(self) -> bool:
+        return any(any(counts) for counts in self.fields.values())
+
+    def _zeros(self, days: int) -> array:
+        return array(self.TYPECODE, bytes(days * array(self.TYPECODE).itemsize))
+
+    def _index(self, ordinal: int) -> int:
+        """Return the array index of ordinal, growing every field to cover it."""
+        if not self.days:
+            self.origin = ordinal
+            self.days = 1
+            for name in self.fields:
+                self.fields[name] = self._zeros(1)
+            return 0
+
+        if ordinal < self.origin:
+            # Grow to the left at least geometrically; newest-first sources prepend every day
+            grow = max(self.origin - ordinal, self.days)
+            for name, counts in self.fields.items():
+                grown = self._zeros(grow)
+                grown.extend(counts)
+                self.fields[name] = grown
+            self.origin -= grow
+            self.days += grow
+        elif ordinal >= self.origin + self.days:
+            grow = ordinal - self.origin - self.days + 1
+            for counts in self.fields.values():
+                counts.extend(self._zeros(grow))
+            self.days += grow
+        return ordinal - self.origin
+
+    def _field(self, field: str) -> array:
+        if field not in self.fields:
+            self.fields[field] = self._zeros(self.days)
+        return self.fields[field]
+
+    def add(self, date_str: str, count: int = 1, field: str = "commits") -> bool:
+        """Add count to field on date_str; returns False for an invalid date."""
+        try:
+            ordinal = date_ordinal(date_str)
+        except ValueError:
+            return False
+        self._field(field)
+        index = self._index(ordinal)
+        self.fields[field][index] += count
+        return True
+
+    def get(self, date_str: str, field: str = "commits") -> int:
+        """Count of field on date_str (0 when not recorded)."""
+        counts = self.fields.get(field)
+        index = date_ordinal(date_str) - self.origin
+        if counts is None or not 0 <= index < self.days:
+            return 0
+        return counts[index]
+
+    def items(self, field: str = "commits") -> Iterator[Tuple[str, int]]:
+        """Yield (YYYY-MM-DD, count) for every day with a non-zero count, oldest first."""
+        counts = self.fields.get(field, ())
+        for index, count in enumerate(counts):
+            if count:
+                yield date.fromordinal(self.origin + index).isoformat(), count
+
+    def active_counts(self, field: str = "commits") -> List[int]:
+        """Non-zero daily counts, oldest first."""
+        return [count for count in self.fields.get(field, ()) if count]
+
+    def total(self, field: str = "commits") -> int:
+        """Sum of field over every day."""
+        return sum(self.fields.get(field, ()))
+
+    def max_streak(self, field: str = "commits") -> int:
+        """Longest run of consecutive days with a non-zero count."""
+        counts = self.fields.get(field)
+        if not counts:
+            return 0
+
+        if _load_numpy() is not None:
+            active = numpy.flatnonzero(numpy.frombuffer(counts, dtype=numpy.uint32))
+            if not active.size:
+                return 0
+            # Indices where a run ends, bracketed by the array edges
+            ends = numpy.flatnonzero(numpy.diff(active) != 1)
+            bounds = numpy.concatenate(([-1], ends, [active.size - 1]))
+            return int(numpy.diff(bounds).max())
+
+        best = current = 0
+        for count in counts:
+            current = current + 1 if count else 0
+            if current > best:
+                best = current
+        return best
+
+    def weekend_ratio(self, field: str = "commits") -> float:
+        """Share of the field's total that falls on Saturdays and Sundays."""
+        counts = self.fields.get(field)
+        total = sum(counts) if counts else 0
+        if not total:
+            return 0.0
+
+        # Every 7th element from the first Saturday/Sunday is a strided slice
+        first_weekday = date.fromordinal(self.origin).weekday()
+        weekend = 0
+        for weekday in (5, 6):
+            weekend += sum(counts[(weekday - first_weekday) % 7::7])
+        return weekend / total
+
+    def recent(self, days: int, today: Optional[date] = None,
+               field: str = "commits") -> List[Tuple[str, int]]:
+        """(YYYY-MM-DD, count) for active days from days - 1 days ago onwards, newest first."""
+        counts = self.fields.get(field)
+        if not counts:
+            return []
+        start = (today or date.today()).toordinal() - days + 1 - self.origin
+        start = max(start, 0)
+        return [
+            (date.fromordinal(self.origin + index).isoformat(), counts[index])
+            for index in range(self.days - 1, start - 1, -1)
+            if counts[index]
+        ]
+
+    def to_dict(self) -> Dict[str, Dict[str, int]]:
+        """Nested {date: {field: count}} mapping of the active days."""
+        result: Dict[str, Dict[str, int]] = {}
+        for field in self.fields:
+            for date_str, count in self.items(field):
+                result.setdefault(date_str, {})[field] = count
+        return result
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Dict[str, int]]) -> "DayStats":
+        """Build a store from a {date: {field: count}} mapping."""
+        stats = cls()
+        for date_str, counts in data.items():
+            for field, count in counts.items():
+                stats.add(date_str, count, field)
+        return stats
+
+    def save(self, path: str):
+        """Write the store atomically in its binary format.
+
+        A fixed header is followed, per field, by the length-prefixed UTF-8
+        name and the raw little-endian array; load() maps it straight back.
+        """
+        itemsize = array(self.TYPECODE).itemsize
+        chunks = [self.HEADER.pack(self.MAGIC, itemsize, self.origin, self.days, len(self.fields))]
+        for name, counts in self.fields.items():
+            if sys.byteorder != "little":
+                counts = array(self.TYPECODE, counts)
+                counts.byteswap()
+            encoded = name.encode()
+            chunks += [struct.pack("<H", len(encoded)), encoded, counts.tobytes()]
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(b"".join(chunks))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "DayStats":
+        """Read a store written by save(); raises ValueError on a malformed file."""
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        if len(data) < cls.HEADER.size:
+            raise ValueError("truncated day stats file")
+        magic, itemsize, origin, days, field_count = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or itemsize != array(cls.TYPECODE).itemsize:
+            raise ValueError("not a day stats file")
+
+        stats = cls()
+        stats.origin = origin
+        stats.days = days
+        pos = cls.HEADER.size
+        for _ in range(field_count):
+            if pos + 2 > len(data):
+                raise ValueError("truncated day stats file")
+            (name_length,) = struct.unpack_from("<H", data, pos)
+            pos += 2
+            name = data[pos:pos + name_length].decode()
+            pos += name_length
+            end = pos + days * itemsize
+            if end > len(data):
+                raise ValueError("truncated day stats file")
+            counts = array(cls.TYPECODE)
+            counts.frombytes(data[pos:end])
+            if sys.byteorder != "little":
+                counts.byteswap()
+            stats.fields[name] = counts
+            pos = end
+        return stats
+
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Structured Event Stream
+Compact JSONL records of commit, skip, error and push outcomes
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Optional
+
+
+class EventSink:
+    """Appends one compact JSON object per event to a JSONL file.
+
+    Every record carries ts (local ISO time), repo and event; duration
+    (seconds) and sha are added when known, plus any extra fields. Each
+    record is written with a single append so several processes can
+    share one file. A sink without a path discards events.
+    """
+
+    def __init__(self, path: Optional[str], repo: str = ""):
+        self.path = path
+        self.repo = repo
+        self._file = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def emit(self, event: str, duration: Optional[float] = None,
+             sha: Optional[str] = None, **fields):
+        """Record one event."""
+        if not self.path:
+            return
+
+        record = {
+            "ts": datetime.now().isoformat(timespec="milliseconds"),
+            "repo": self.repo,
+            "event": event,
+        }
+        if duration is not None:
+            record["duration"] = round(duration, 4)
+        if sha:
+            record["sha"] = sha
+        record.update(fields)
+        line = json.dumps(record, separators=(',', ':')) + "\n"
+
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class EventLoggerAdapter(logging.LoggerAdapter):
+    """Logger wrapper that also records every ERROR message as an "error" event."""
+
+    def __init__(self, logger: logging.Logger, sink: EventSink):
+        super().__init__(logger, {})
+        self.sink = sink
+
+    def log(self, level, msg, *args, **kwargs):
+        if level >= logging.ERROR and self.isEnabledFor(level):
+            self.sink.emit("error", message=str(msg) % args if args else str(msg))
+        super().log(level, msg, *args, **kwargs)
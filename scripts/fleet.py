@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Fleet Orchestrator
+asyncio pipeline cloning, committing and pushing across many repositories
+"""
+
+import asyncio
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from activity import ActivityFiles
+from git_backend import SubprocessBackend, clone_steps, fetch_args
+from metrics import REGISTRY, git_phase, span
+from push_queue import push_repository
+from repo_lock import RepoLock, RepoLockTimeout
+
+
+class StageMetrics:
+    """Queue depth and latency of one pipeline stage."""
+
+    def __init__(self, name: str, concurrency: int):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.waiting = 0
+        self.running = 0
+        self.max_waiting = 0
+        self.waits: List[float] = []
+        self.latencies: List[float] = []
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the stage's slots, recording queueing and run time."""
+        queued = time.perf_counter()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started = time.perf_counter()
+        self.waits.append(started - queued)
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self.latencies.append(time.perf_counter() - started)
+            self.semaphore.release()
+
+    def summary(self) -> Dict:
+        latencies = sorted(self.latencies)
+        return {
+            "stage": self.name,
+            "concurrency": self.concurrency,
+            "count": len(latencies),
+            "max_queue": self.max_waiting,
+            "avg_wait": statistics.fmean(self.waits) if self.waits else 0.0,
+            "p50": statistics.median(latencies) if latencies else 0.0,
+            "p95": latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+            "max": latencies[-1] if latencies else 0.0,
+        }
+
+
+class GitCommandError(Exception):
+    """Raised when an asynchronous git command exits with an error."""
+
+    def __init__(self, args: List[str], returncode: int, stderr: str):
+        super().__init__(f"git {' '.join(args[:2])} failed ({returncode}): {stderr.strip()}")
+        self.returncode = returncode
+
+
+async def run_git(args: List[str], cwd: str, check: bool = True) -> Tuple[int, str]:
+    """Run git without blocking the event loop and return (exit code, stdout).
+
+    A cancelled caller kills the process instead of leaving it running.
+    """
+    with span(git_phase(args)):
+        process = await asyncio.create_subprocess_exec(
+            'git', *args,
+            cwd=cwd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+
+    if check and process.returncode != 0:
+        raise GitCommandError(args, process.returncode, stderr.decode(errors='replace'))
+    return process.returncode, stdout.decode(errors='replace').strip()
+
+
+class FleetOrchestrator:
+    """Runs every repository through clone -> commit -> push stages.
+
+    Each stage has its own semaphore, so network-bound clones and pushes
+    overlap with disk-bound commits instead of one worker pool serialising
+    them. Commits run either through commit_runner(path, name, stop_event)
+    in a worker thread or, when commit_command is given, as a child process
+    per repository.
+    Results use the same dicts as GitHubAutoCommitBot.process_repository,
+    plus push_time. A recorder (ledger.FleetRun) set on the orchestrator
+    records each repository's run as it starts, commits and ends; the
+    repositories named in unpushed only have the commits an earlier run
+    left in their clones pushed. Each repository's lock is held from
+    before its clone until after its push.
+    """
+
+    def __init__(self, config: Dict, repos_dir: Path,
+                 commit_runner: Optional[Callable[[str, str, threading.Event], Dict]] = None,
+                 commit_command: Optional[List[str]] = None):
+        self.config = config
+        self.repos_dir = Path(repos_dir)
+        self.commit_runner = commit_runner
+        self.commit_command = commit_command
+        workers = int(config.get("max_workers", 4))
+        self.stages = {
+            "clone": StageMetrics("clone", int(config.get("clone_concurrency", workers * 2))),
+            "commit": StageMetrics("commit", int(config.get("commit_concurrency", workers))),
+            "push": StageMetrics("push", int(config.get("push_concurrency", workers * 2))),
+        }
+        self.recorder = None
+        self.unpushed: Set[str] = set()
+        self.stop_event = threading.Event()
+        self.results: List[Dict] = []
+        self._executor = None
+        self._push_executor = None
+
+    async def clone(self, repo: Dict) -> str:
+        """Clone a repository or refresh an existing clone; returns its path ("" on failure)."""
+        local_path = self.repos_dir / repo['full_name'].split('/')[-1]
+        depth = self.config.get("clone_depth")
+
+        if local_path.exists():
+            try:
+                await run_git(fetch_args(depth=depth), str(local_path))
+                code, _ = await run_git(['rev-parse', '--abbrev-ref', '--symbolic-full-name', '@{u}'],
+                                        str(local_path), check=False)
+                if code == 0:
+                    code, _ = await run_git(['merge', '--ff-only', '--quiet', '@{u}'],
+                                            str(local_path), check=False)
+                    if code != 0:
+                        print(f"⚠️  {repo['name']} has diverged from its remote; leaving it as is")
+            except GitCommandError as e:
+                print(f"⚠️  Failed to fetch {repo['name']}, using local copy: {e}")
+            return str(local_path)
+
+        sparse_paths = None
+        if self.config.get("clone_sparse"):
+            # Cover the rotated activity shards, not just the configured names
+            sparse_paths = ActivityFiles.from_config(self.config).sparse_patterns(self.config["files_to_modify"])
+        try:
+            for args, cwd in clone_steps(repo['clone_url'], str(local_path),
+                                         self.config.get("clone_filter"), depth, sparse_paths):
+                await run_git(args, cwd)
+            return str(local_path)
+        except GitCommandError as e:
+            print(f"❌ Failed to clone {repo['name']}: {e}")
+            return ""
+
+    async def commit(self, repo_path: str, repo_name: str) -> Dict:
+        """Make the daily commits without pushing."""
+        if self.commit_command:
+            with span("commit_subprocess"):
+                process = await asyncio.create_subprocess_exec(
+                    *self.commit_command,
+                    cwd=repo_path,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+                try:
+                    stdout, stderr = await process.communicate()
+                except asyncio.CancelledError:
+                    if process.returncode is None:
+                        process.kill()
+                        await process.wait()
+                    raise
+
+            result = {"success": process.returncode == 0, "commits": 0, "pushed": False, "error": None}
+            if process.returncode == 0:
+                for line in stdout.decode(errors='replace').splitlines():
+                    if line.startswith("Successfully made "):
+                        result["commits"] = int(line.split()[2])
+                    elif line.startswith("Skipped: "):
+                        # The child found the repository locked and did nothing
+                        result["success"] = False
+                        result["error"] = line[len("Skipped: "):]
+            else:
+                result["error"] = (stderr or stdout).decode(errors='replace').strip()
+            return result
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.commit_runner,
+                                          repo_path, repo_name, self.stop_event)
+
+    async def push(self, repo_path: str) -> Dict:
+        """Push the current branch to origin unless it already matches; see push_repository.
+
+        Runs in the push stage's own threads, so a push started before a
+        cancellation completes rather than leaving the remote half-updated.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._push_executor, push_repository,
+                                          SubprocessBackend(repo_path))
+
+    async def process_repository(self, repo: Dict) -> Dict:
+        """Run one repository through every stage, timing each."""
+        result = {"name": repo['name'], "success": False, "commits": 0, "pushed": False,
+                  "clone_time": 0.0, "commit_time": 0.0, "push_time": 0.0, "disk_usage": 0,
+                  "error": None, "lock_wait": 0.0}
+        repo_run = self.recorder.start(repo['name']) if self.recorder else None
+        started = time.perf_counter()
+        lock = RepoLock.from_config(str(self.repos_dir / repo['full_name'].split('/')[-1]), self.config)
+
+        try:
+            if lock:
+                result["lock_wait"] = await lock.acquire_async()
+            local_path = self.repos_dir / repo['full_name'].split('/')[-1]
+            loop = asyncio.get_running_loop()
+            if repo['name'] in self.unpushed and (local_path / ".git").exists():
+                print(f"📤 {repo['name']} has unpushed commits from an earlier run; pushing them instead")
+                repo_path = str(local_path)
+                result["disk_usage"] = await loop.run_in_executor(None, disk_usage, repo_path)
+                commit_result = {"success": True, "commits": 0, "error": None}
+                resumed = True
+            else:
+                clone_started = time.perf_counter()
+                async with self.stages["clone"].slot():
+                    repo_path = await self.clone(repo)
+                result["clone_time"] = time.perf_counter() - clone_started
+                if not repo_path:
+                    result["error"] = "clone failed"
+                    return result
+
+                result["disk_usage"] = await loop.run_in_executor(None, disk_usage, repo_path)
+
+                commit_started = time.perf_counter()
+                async with self.stages["commit"].slot():
+                    commit_result = await self.commit(repo_path, repo['name'])
+                result["commit_time"] = time.perf_counter() - commit_started
+                result["commits"] = commit_result["commits"]
+                result["error"] = commit_result["error"]
+                resumed = False
+
+            if (commit_result["success"] and (resumed or commit_result["commits"] > 0)
+                    and not self.config.get("dry_run")):
+                if self.recorder and not resumed:
+                    self.recorder.committed(repo_run, result)
+                push_started = time.perf_counter()
+                async with self.stages["push"].slot():
+                    push = await self.push(repo_path)
+                result["push_time"] = time.perf_counter() - push_started
+                result["push_status"] = push["status"]
+                result["push_bytes"] = push["bytes"]
+                result["pushed"] = push["status"] in ("pushed", "up-to-date")
+                if result["pushed"]:
+                    result["pushed_sha"] = push["sha"]
+                elif push["error"]:
+                    result["error"] = push["error"]
+            result["success"] = commit_result["success"] and result.get("push_status") != "failed"
+        except GitCommandError as e:
+            result["error"] = str(e)
+        except RepoLockTimeout as e:
+            result["lock_wait"] = e.waited
+            result["lock_busy"] = True
+            result["error"] = str(e)
+        except asyncio.CancelledError:
+            result["error"] = "cancelled"
+            raise
+        finally:
+            if lock:
+                lock.release()
+            result["total_time"] = time.perf_counter() - started
+            if self.recorder:
+                self.recorder.finish(repo_run, result)
+
+        if result.get("lock_busy"):
+            print(f"⏭  Skipping {repo['name']}: {result['error']}")
+        else:
+            status = "✅ Successfully committed to" if result["success"] else "❌ Failed to commit to"
+            print(f"{status} {repo['name']}" + (f": {result['error']}" if result["error"] else ""))
+        return result
+
+    async def run(self, repos: List[Dict]) -> List[Dict]:
+        """Process every repository concurrently and return their results.
+
+        On cancellation (Ctrl+C) running git processes are killed and the
+        cancellation propagates; self.results still holds every repository,
+        with unfinished ones marked as cancelled.
+        """
+        self.repos_dir.mkdir(exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=self.stages["commit"].concurrency)
+        self._push_executor = ThreadPoolExecutor(max_workers=self.stages["push"].concurrency)
+        tasks = [asyncio.create_task(self.process_repository(repo)) for repo in repos]
+        try:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        except asyncio.CancelledError:
+            # Threads cannot be cancelled; tell in-process commits to wind down
+            self.stop_event.set()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._push_executor.shutdown(wait=False, cancel_futures=True)
+            self.results = self._collect(repos, tasks)
+            REGISTRY.set_gauge("push_bytes_sent", sum(result.get("push_bytes", 0) for result in self.results))
+        return self.results
+
+    @staticmethod
+    def _collect(repos: List[Dict], tasks: List[asyncio.Task]) -> List[Dict]:
+        results = []
+        for repo, task in zip(repos, tasks):
+            if task.cancelled() or task.exception():
+                error = "cancelled" if task.cancelled() else str(task.exception())
+                results.append({"name": repo['name'], "success": False, "commits": 0, "pushed": False,
+                                "clone_time": 0.0, "commit_time": 0.0, "push_time": 0.0,
+                                "total_time": 0.0, "disk_usage": 0, "error": error})
+            else:
+                results.append(task.result())
+        return results
+
+    def stage_report(self) -> List[Dict]:
+        """Per-stage queue depth and latency summaries."""
+        return [stage.summary() for stage in self.stages.values()]
+
+
+def disk_usage(path: str) -> int:
+    """Total size in bytes of the files below path."""
+    total = 0
+    with span("disk_usage"):
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    pass
+    return total
@@ -0,0 +1,549 @@
+#!/usr/bin/env python3
+"""
+Git Backends
+Interchangeable engines for the git operations used by the auto commit script
+"""
+
+import logging
+import os
+import re
+import subprocess
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from metrics import REGISTRY, git_phase, span
+
+# Optional dependency, imported by the first Pygit2Backend; it is slow to
+# import and short invocations that never use it should not pay for it
+pygit2 = None
+
+
+def _load_pygit2():
+    """Import pygit2 on first use; returns None when it is not installed."""
+    global pygit2
+    if pygit2 is None:
+        try:
+            import pygit2 as module
+        except ImportError:
+            return None
+        pygit2 = module
+    return pygit2
+
+
+# (commit date, commit message, file path, full new file content)
+SeriesEntry = Tuple[datetime, str, str, bytes]
+# Called with (commits made so far, sha they led to) once those commits are durable
+CheckpointCallback = Callable[[int, str], None]
+
+
+PACK_SIZE = re.compile(r"Writing objects: 100% \(\d+/\d+\), ([\d.]+) (bytes|KiB|MiB|GiB)")
+SIZE_UNITS = {"bytes": 1, "KiB": 1024, "MiB": 1024 ** 2, "GiB": 1024 ** 3}
+
+
+def pushed_bytes(progress: str) -> int:
+    """Pack bytes sent according to git push --progress output (0 when nothing was written)."""
+    match = PACK_SIZE.search(progress)
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)]) if match else 0
+
+
+class GitBackendError(Exception):
+    """Raised when a backend cannot be created or used."""
+
+
+def _raw_date(date: datetime) -> Tuple[int, str]:
+    """Return (epoch seconds, "+HHMM") for a naive local or aware datetime.
+
+    This is the instant git derives from a local "YYYY-MM-DD HH:MM:SS" date.
+    """
+    local_date = date.replace(microsecond=0).astimezone()
+    return int(local_date.timestamp()), local_date.strftime('%z')
+
+
+def _day_breaks(entries: Iterable[SeriesEntry], interval: float) -> Iterator[Tuple[SeriesEntry, bool]]:
+    """Yield (entry, checkpoint_due): due on the first entry of a new day once interval seconds have passed."""
+    day = None
+    last_due = time.perf_counter()
+    for entry in entries:
+        due = False
+        if day is not None and entry[0].date() != day and time.perf_counter() - last_due >= interval:
+            due = True
+            last_due = time.perf_counter()
+        day = entry[0].date()
+        yield entry, due
+
+
+def clone_steps(url: str, repo_path: str, blob_filter: Optional[str] = None,
+                depth: Optional[int] = None,
+                sparse_paths: Optional[List[str]] = None) -> List[Tuple[List[str], str]]:
+    """Return the (git arguments, working directory) commands that make a clone.
+
+    Shared by the blocking backend and the asyncio fleet so both clone alike.
+    """
+    repo_path = os.path.abspath(repo_path)
+    args = ['clone', '--quiet']
+    if blob_filter:
+        args.append(f'--filter={blob_filter}')
+    if depth:
+        args += ['--depth', str(depth)]
+    if sparse_paths:
+        # Check out only after the sparse patterns are in place
+        args.append('--no-checkout')
+
+    steps = [(args + [url, repo_path], os.path.dirname(repo_path))]
+    if sparse_paths:
+        patterns = ['/' + path.lstrip('/') for path in sparse_paths]
+        steps.append((['sparse-checkout', 'set', '--no-cone'] + patterns, repo_path))
+        steps.append((['checkout', '--quiet'], repo_path))
+    return steps
+
+
+def fetch_args(remote: str = "origin", depth: Optional[int] = None) -> List[str]:
+    """git arguments that refresh an existing clone from remote."""
+    args = ['fetch', '--quiet', '--prune', remote]
+    if depth:
+        args += ['--depth', str(depth)]
+    return args
+
+
+class GitBackend:
+    """Interface shared by every git engine."""
+
+    name = "base"
+
+    def __init__(self, repo_path: str, logger: Optional[logging.Logger] = None):
+        self.repo_path = repo_path
+        self.logger = logger or logging.getLogger(__name__)
+
+    def is_repository(self) -> bool:
+        """Check if repo_path is inside a git repository."""
+        raise NotImplementedError
+
+    def init_repository(self, branch: str = "main") -> None:
+        """Create an empty repository whose HEAD points at branch."""
+        raise NotImplementedError
+
+    def commit_paths(self, paths: List[str], message: str,
+                     date: Optional[datetime] = None) -> None:
+        """Stage paths from the working tree and commit them."""
+        raise NotImplementedError
+
+    def commit_series(self, entries: Iterable[SeriesEntry],
+                      on_commit: Optional[Callable[[datetime, str], None]] = None,
+                      on_checkpoint: Optional[CheckpointCallback] = None,
+                      checkpoint_interval: float = 10.0) -> int:
+        """Commit a series of single-file changes and return how many were made.
+
+        After the series the working tree holds the final content of every
+        touched file and the index matches HEAD for those paths. A failure
+        keeps only leading entries: the commits made before it, or with
+        fast-import the commits up to the last checkpoint, with the touched
+        files matching HEAD again. on_checkpoint is called at the end and before
+        the first commit of a new day once checkpoint_interval seconds have
+        passed since the last call.
+        """
+        raise NotImplementedError
+
+    def commits_since(self, sha: str) -> Optional[List[Tuple[int, str]]]:
+        """(commit time, subject) of the commits from sha (exclusive) to HEAD, oldest first.
+
+        None when sha is not an ancestor of HEAD.
+        """
+        raise NotImplementedError
+
+    def restore_paths(self, paths: List[str]) -> None:
+        """Reset paths in the index and working tree to their content at HEAD."""
+        raise NotImplementedError
+
+    def head_sha(self) -> str:
+        """Return the sha HEAD points at ("" for an unborn branch)."""
+        raise NotImplementedError
+
+    def git_dir(self) -> str:
+        """Return the absolute path of the repository's git directory ("" if none)."""
+        raise NotImplementedError
+
+    def has_remote(self) -> bool:
+        """Check if any remote is configured."""
+        raise NotImplementedError
+
+    def current_branch(self) -> str:
+        """Return the name of the checked-out branch ("" when HEAD is detached)."""
+        raise NotImplementedError
+
+    def tracking_sha(self, remote: str, branch: str) -> str:
+        """Return the sha of the local remote-tracking ref of branch ("" when there is none)."""
+        raise NotImplementedError
+
+    def remote_sha(self, remote: str, branch: str) -> str:
+        """Return the sha branch points at on remote ("" when the remote has no such branch)."""
+        raise NotImplementedError
+
+    def push(self, remote: str = "origin", branch: str = "main") -> int:
+        """Push branch to remote; returns the bytes of pack data sent."""
+        raise NotImplementedError
+
+    def clone(self, url: str, blob_filter: Optional[str] = None, depth: Optional[int] = None,
+              sparse_paths: Optional[List[str]] = None) -> None:
+        """Clone url into repo_path.
+
+        blob_filter makes a partial clone (e.g. "blob:none"), depth a shallow
+        one, and sparse_paths limits the checkout to those files.
+        """
+        raise NotImplementedError
+
+    def update(self, remote: str = "origin", depth: Optional[int] = None) -> bool:
+        """Fetch from remote and fast-forward the current branch.
+
+        Returns False when the branch has diverged and was left as it is.
+        """
+        raise NotImplementedError
+
+
+class SubprocessBackend(GitBackend):
+    """Runs every operation through the git command line."""
+
+    name = "subprocess"
+
+    def _run(self, args: List[str], env: Optional[Dict[str, str]] = None,
+             cwd: Optional[str] = None, **kwargs) -> subprocess.CompletedProcess:
+        """Run a git command in the repository, raising on failure."""
+        with span(git_phase(args)):
+            return subprocess.run(
+                ['git'] + args,
+                cwd=cwd or self.repo_path,
+                env=env,
+                check=True,
+                **kwargs
+            )
+
+    def _output(self, args: List[str]) -> str:
+        """Run a read-only git command and return its stripped stdout ("" on failure)."""
+        with span(git_phase(args)):
+            result = subprocess.run(
+                ['git'] + args,
+                capture_output=True,
+                text=True,
+                cwd=self.repo_path
+            )
+        return result.stdout.strip() if result.returncode == 0 else ""
+
+    def is_repository(self) -> bool:
+        try:
+            with span("git_rev_parse"):
+                result = subprocess.run(
+                    ['git', 'rev-parse', '--git-dir'],
+                    capture_output=True,
+                    text=True,
+                    cwd=self.repo_path
+                )
+            return result.returncode == 0
+        except Exception:
+            return False
+
+    def init_repository(self, branch: str = "main") -> None:
+        self._run(['init'])
+        self._run(['checkout', '-b', branch])
+
+    def commit_paths(self, paths: List[str], message: str,
+                     date: Optional[datetime] = None) -> None:
+        env = None
+        if date is not None:
+            date_str = date.strftime("%Y-%m-%d %H:%M:%S")
+            env = os.environ.copy()
+            env['GIT_AUTHOR_DATE'] = date_str
+            env['GIT_COMMITTER_DATE'] = date_str
+
+        self._run(['add'] + paths)
+        self._run(['commit', '-m', message], env=env)
+
+    def _write_file(self, path: str, content: bytes) -> None:
+        """Write content to a file in the working tree."""
+        full_path = os.path.join(self.repo_path, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as f:
+            f.write(content)
+
+    def commit_series(self, entries: Iterable[SeriesEntry],
+                      on_commit: Optional[Callable[[datetime, str], None]] = None,
+                      on_checkpoint: Optional[CheckpointCallback] = None,
+                      checkpoint_interval: float = 10.0) -> int:
+        commits_made = 0
+
+        for (date, message, path, content), checkpoint_due in _day_breaks(entries, checkpoint_interval):
+            if checkpoint_due and on_checkpoint:
+                on_checkpoint(commits_made, self.head_sha())
+            try:
+                self._write_file(path, content)
+                self.commit_paths([path], message, date)
+            except Exception as e:
+                # Stop here so a resumed run retries this commit instead of leaving a gap
+                self.logger.error(f"Failed to commit {path} for {date:%Y-%m-%d %H:%M:%S}: {e}")
+                break
+            commits_made += 1
+            if on_commit:
+                on_commit(date, message)
+
+        if on_checkpoint:
+            on_checkpoint(commits_made, self.head_sha())
+        return commits_made
+
+    def commits_since(self, sha: str) -> Optional[List[Tuple[int, str]]]:
+        with span("git_merge_base"):
+            result = subprocess.run(['git', 'merge-base', '--is-ancestor', sha, 'HEAD'],
+                                    capture_output=True, cwd=self.repo_path)
+        if result.returncode != 0:
+            return None
+        output = self._output(['log', '--reverse', '--format=%at %s', f'{sha}..HEAD'])
+        commits = []
+        for line in output.splitlines():
+            timestamp, _, subject = line.partition(' ')
+            commits.append((int(timestamp), subject))
+        return commits
+
+    def restore_paths(self, paths: List[str]) -> None:
+        if paths:
+            self._run(['checkout', '-q', 'HEAD', '--'] + paths)
+
+    def head_sha(self) -> str:
+        return self._output(['rev-parse', '--verify', '-q', 'HEAD'])
+
+    def git_dir(self) -> str:
+        return self._output(['rev-parse', '--absolute-git-dir'])
+
+    def has_remote(self) -> bool:
+        return bool(self._output(['remote']))
+
+    def current_branch(self) -> str:
+        return self._output(['symbolic-ref', '--short', '-q', 'HEAD'])
+
+    def tracking_sha(self, remote: str, branch: str) -> str:
+        return self._output(['rev-parse', '-q', '--verify', f"refs/remotes/{remote}/{branch}"])
+
+    def remote_sha(self, remote: str, branch: str) -> str:
+        output = self._run(['ls-remote', remote, f"refs/heads/{branch}"],
+                           capture_output=True, text=True).stdout
+        return output.split()[0] if output.strip() else ""
+
+    def push(self, remote: str = "origin", branch: str = "main") -> int:
+        # --progress reports the pack size even though stderr is not a terminal
+        result = self._run(['push', '--progress', remote, f"HEAD:refs/heads/{branch}"],
+                           capture_output=True, text=True)
+        return pushed_bytes(result.stderr)
+
+    def clone(self, url: str, blob_filter: Optional[str] = None, depth: Optional[int] = None,
+              sparse_paths: Optional[List[str]] = None) -> None:
+        for args, cwd in clone_steps(url, self.repo_path, blob_filter, depth, sparse_paths):
+            self._run(args, cwd=cwd, capture_output=True)
+
+    def update(self, remote: str = "origin", depth: Optional[int] = None) -> bool:
+        self._run(fetch_args(remote, depth), capture_output=True)
+
+        if not self._output(['rev-parse', '--abbrev-ref', '--symbolic-full-name', '@{u}']):
+            return True
+        with span("git_merge"):
+            result = subprocess.run(
+                ['git', 'merge', '--ff-only', '--quiet', '@{u}'],
+                capture_output=True,
+                cwd=self.repo_path
+            )
+        return result.returncode == 0
+
+
+class FastImportBackend(SubprocessBackend):
+    """Streams commit series into a single `git fast-import` process.
+
+    Single commits and network operations are inherited from the
+    subprocess backend; a one-off commit gains nothing from a stream.
+    """
+
+    name = "fast-import"
+
+    def commit_series(self, entries: Iterable[SeriesEntry],
+                      on_commit: Optional[Callable[[datetime, str], None]] = None,
+                      on_checkpoint: Optional[CheckpointCallback] = None,
+                      checkpoint_interval: float = 10.0) -> int:
+        """Stream the series; the branch only moves at checkpoints and at the end."""
+        branch_ref = self._output(['symbolic-ref', '-q', 'HEAD']) or 'refs/heads/main'
+        parent = self.head_sha()
+        # "Name <email> <time> <tz>" -> "Name <email>"
+        author = self._output(['var', 'GIT_AUTHOR_IDENT']).rsplit(' ', 2)[0]
+        committer = self._output(['var', 'GIT_COMMITTER_IDENT']).rsplit(' ', 2)[0]
+        if not author or not committer:
+            raise GitBackendError("git identity is not configured")
+
+        final_contents = {}
+        commits_made = 0
+        self._release_kept_packs()
+
+        # The whole stream, including producing the entries, is timed as one phase
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            ['git', 'fast-import', '--quiet', '--date-format=raw'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=self.repo_path
+        )
+        try:
+            for (date, message, path, content), checkpoint_due in _day_breaks(entries, checkpoint_interval):
+                if checkpoint_due and on_checkpoint and commits_made:
+                    # fast-import answers the progress line once the checkpoint has updated the ref
+                    process.stdin.write(b"checkpoint\nprogress checkpoint\n")
+                    process.stdin.flush()
+                    if process.stdout.readline() != b"progress checkpoint\n":
+                        raise GitBackendError("git fast-import did not confirm the checkpoint")
+                    on_checkpoint(commits_made, self._output(['rev-parse', '--verify', '-q', branch_ref]))
+
+                timestamp, offset = _raw_date(date)
+                raw_date = f"{timestamp} {offset}"
+                message_bytes = f"{message}\n".encode()
+
+                chunks = [
+                    f"commit {branch_ref}\n".encode(),
+                    f"author {author} {raw_date}\n".encode(),
+                    f"committer {committer} {raw_date}\n".encode(),
+                    f"data {len(message_bytes)}\n".encode(), message_bytes,
+                ]
+                if parent and commits_made == 0:
+                    chunks.append(f"from {parent}\n".encode())
+                chunks += [
+                    f"M 100644 inline {path}\n".encode(),
+                    f"data {len(content)}\n".encode(), content, b"\n",
+                ]
+                process.stdin.write(b"".join(chunks))
+
+                final_contents[path] = content
+                commits_made += 1
+                if on_commit:
+                    on_commit(date, message)
+
+            process.stdin.close()
+            if process.wait() != 0:
+                raise subprocess.CalledProcessError(process.returncode, 'git fast-import')
+        except BaseException:
+            process.kill()
+            process.wait()
+            self._release_kept_packs()
+            if self.head_sha() != parent:
+                self._sync_to_head(list(final_contents))
+            raise
+        finally:
+            process.stdout.close()
+            REGISTRY.observe("git_fast_import", time.perf_counter() - started)
+
+        # Bring the working tree and index up to date with the new HEAD
+        for path, content in final_contents.items():
+            self._write_file(path, content)
+        if final_contents:
+            self._run(['reset', '-q', '--'] + list(final_contents))
+
+        if on_checkpoint:
+            on_checkpoint(commits_made, self.head_sha())
+        return commits_made
+
+
+    def _sync_to_head(self, paths: List[str]) -> None:
+        """Check paths out from HEAD after a checkpoint moved the branch under the working tree.
+
+        Without this the checkpointed files show as modified (their
+        pre-series content), and a new backfill would build on that stale
+        content and revert the checkpointed entries.
+        """
+        tracked = self._output(['ls-tree', '-r', '--name-only', 'HEAD', '--'] + paths).splitlines()
+        try:
+            self.restore_paths(tracked)
+        except subprocess.CalledProcessError as e:
+            self.logger.error(f"Could not update {len(tracked)} files to the checkpointed HEAD: {e}")
+
+    def _release_kept_packs(self) -> None:
+        """Remove the .keep markers a killed fast-import leaves on its checkpointed packs.
+
+        fast-import keeps those packs out of repacks until it exits; a killed
+        one never removes the markers and repack would skip the packs for good.
+        """
+        pack_dir = os.path.join(self.git_dir(), 'objects', 'pack')
+        if not os.path.isdir(pack_dir):
+            return
+        for name in os.listdir(pack_dir):
+            if name.endswith('.keep'):
+                path = os.path.join(pack_dir, name)
+                with open(path, 'rb') as f:
+                    owner = f.read()
+                if owner.startswith(b'fast-import'):
+                    os.remove(path)
+
+
+class Pygit2Backend(SubprocessBackend):
+    """Runs local operations in-process through libgit2.
+
+    Push and clone stay on the git command line so configured credential
+    helpers and SSH agents keep working.
+    """
+
+    name = "pygit2"
+
+    def __init__(self, repo_path: str, logger: Optional[logging.Logger] = None):
+        if _load_pygit2() is None:
+            raise GitBackendError("pygit2 is not installed")
+        super().__init__(repo_path, logger)
+        self._repo = None
+
+    @property
+    def repo(self):
+        """The opened pygit2 repository."""
+        if self._repo is None:
+            self._repo = pygit2.Repository(self.repo_path)
+        return self._repo
+
+    def is_repository(self) -> bool:
+        try:
+            return pygit2.discover_repository(self.repo_path) is not None
+        except Exception:
+            return False
+
+    def init_repository(self, branch: str = "main") -> None:
+        self._repo = pygit2.init_repository(self.repo_path, initial_head=branch)
+
+    def commit_paths(self, paths: List[str], message: str,
+                     date: Optional[datetime] = None) -> None:
+        with span("pygit2_commit"):
+            self._commit_paths(paths, message, date)
+
+    def _commit_paths(self, paths: List[str], message: str, date: Optional[datetime]) -> None:
+        repo = self.repo
+        index = repo.index
+        index.read()
+        for path in paths:
+            index.add(path)
+        index.write()
+        tree = index.write_tree()
+
+        signature = repo.default_signature
+        if date is not None:
+            timestamp, offset = _raw_date(date)
+            sign = -1 if offset.startswith('-') else 1
+            minutes = sign * (int(offset[1:3]) * 60 + int(offset[3:5]))
+            signature = pygit2.Signature(signature.name, signature.email, timestamp, minutes)
+
+        parents = [] if repo.head_is_unborn else [repo.head.target]
+        # `git commit -m` terminates the message with a newline
+        repo.create_commit('HEAD', signature, signature, f"{message}\n", tree, parents)
+
+    def head_sha(self) -> str:
+        if self.repo.head_is_unborn:
+            return ""
+        return str(self.repo.head.target)
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (SubprocessBackend, FastImportBackend, Pygit2Backend)
+}
+
+
+def create_backend(name: str, repo_path: str,
+                   logger: Optional[logging.Logger] = None) -> GitBackend:
+    """Create the backend registered under name for repo_path."""
+    if name not in BACKENDS:
+        raise GitBackendError(f"Unknown git backend: {name}")
+    return BACKENDS[name](repo_path, logger)
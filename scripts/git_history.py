@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Git History Statistics
+Commits per day read straight from git history, cached by HEAD sha
+"""
+
+import json
+import os
+import subprocess
+from collections import Counter
+from itertools import chain
+from typing import Dict, List, Tuple
+
+
+def scan_history(repo_path: str, since: str = "") -> Tuple[Counter, str]:
+    """Count commits reachable from HEAD per author date in one streamed `git log`.
+
+    Commits reachable from since are left out. Returns (commits per
+    YYYY-MM-DD, sha of the newest commit seen, "" when there were none).
+    """
+    revision = f"{since}..HEAD" if since else "HEAD"
+    process = subprocess.Popen(
+        ['git', 'log', '--format=%H%x00%aI', revision],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        cwd=repo_path
+    )
+    commits_by_date = Counter()
+    head = ""
+
+    with process.stdout:
+        first = process.stdout.readline()
+        if first:
+            # The first line is HEAD; its sha length fixes the date offset
+            start = first.index(b"\0") + 1
+            head = first[:start - 1].decode()
+            commits_by_date.update(line[start:start + 10] for line in chain([first], process.stdout))
+    process.wait()
+
+    return Counter({date.decode(): count for date, count in commits_by_date.items()}), head
+
+
+def is_ancestor(repo_path: str, ancestor: str, descendant: str) -> bool:
+    """Check if ancestor is reachable from descendant."""
+    result = subprocess.run(
+        ['git', 'merge-base', '--is-ancestor', ancestor, descendant],
+        capture_output=True,
+        cwd=repo_path
+    )
+    return result.returncode == 0
+
+
+def find_repositories(repos_dir: str) -> List[str]:
+    """Return every git clone directly under repos_dir, by name."""
+    if not os.path.isdir(repos_dir):
+        return []
+    return [
+        os.path.join(repos_dir, name)
+        for name in sorted(os.listdir(repos_dir))
+        if os.path.exists(os.path.join(repos_dir, name, '.git'))
+    ]
+
+
+class HistoryCache:
+    """Per-repository commit counts keyed by the HEAD sha they were taken at.
+
+    An unchanged HEAD is answered from the cache. When the cached sha is an
+    ancestor of the new HEAD only the commits in between are walked;
+    otherwise (history rewritten, branch switched) the repository is
+    rescanned.
+    """
+
+    def __init__(self, path: str = "git_history.checkpoint.json"):
+        self.path = path
+        self.repos = {}
+
+    def load(self) -> bool:
+        """Load the cache file; returns False when it is missing or unreadable."""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    self.repos = json.load(f).get('repos', {})
+                return True
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable history cache {self.path}: {e}")
+        self.repos = {}
+        return False
+
+    def save(self):
+        """Write the cache atomically."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'repos': self.repos}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def collect(self, repo_path: str) -> Tuple[Dict[str, int], str]:
+        """Return (commits per date, how: "cache", "incremental" or "full") for repo_path."""
+        key = os.path.abspath(repo_path)
+        entry = self.repos.get(key)
+        head = subprocess.run(
+            ['git', 'rev-parse', '--verify', '-q', 'HEAD'],
+            capture_output=True,
+            text=True,
+            cwd=repo_path
+        ).stdout.strip()
+
+        if entry and entry['head'] == head:
+            return entry['daily'], "cache"
+
+        if entry and head and is_ancestor(repo_path, entry['head'], head):
+            new_commits, scanned_head = scan_history(repo_path, entry['head'])
+            daily = Counter(entry['daily'])
+            daily.update(new_commits)
+            mode = "incremental"
+        else:
+            daily, scanned_head = scan_history(repo_path) if head else (Counter(), "")
+            mode = "full"
+        # Key the counts by the sha the walk started from, in case HEAD moved meanwhile
+        head = scanned_head or head
+
+        self.repos[key] = {'head': head, 'daily': dict(daily)}
+        return self.repos[key]['daily'], mode
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+GitHub API Client
+Pooled, paginated GitHub REST client with ETag revalidation and rate-limit pacing
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import span
+from rate_limit import RateGovernor, RateLimitExceeded
+
+try:
+    import aiohttp
+except ImportError:  # Optional dependency
+    aiohttp = None
+
+
+DEFAULT_API_URL = "https://api.github.com"
+
+
+class GitHubAPIError(Exception):
+    """Raised when the GitHub API answers with an unexpected status.
+
+    reset_at is set (Unix time) when the request was refused or withheld
+    because of a rate limit.
+    """
+
+    def __init__(self, status_code: int, message: str = "", reset_at: Optional[float] = None):
+        super().__init__(f"GitHub API error: {status_code} {message}".strip())
+        self.status_code = status_code
+        self.reset_at = reset_at
+
+
+def _rate_limit_error(error: RateLimitExceeded) -> GitHubAPIError:
+    return GitHubAPIError(429, f"rate limit exceeded ({error})", reset_at=error.reset_at)
+
+
+def _revalidatable(entry: Optional[Dict]) -> Optional[Dict]:
+    """entry if it can answer a 304 (it has the ETag and the body), else None."""
+    if entry and entry.get("etag") and "data" in entry and "links" in entry:
+        return entry
+    return None
+
+
+# Asked for again when a 304 arrives for a request with nothing cached to revalidate
+UNCONDITIONAL = {"Cache-Control": "no-cache"}
+
+
+class GitHubAPIClient:
+    """Thin GitHub REST client sharing one pooled session.
+
+    Responses carrying an ETag are kept in etag_cache (url -> etag, data,
+    links) and revalidated with If-None-Match, so unchanged pages cost a
+    304 without a body. Pass in a dict to share or persist the cache.
+    Every request goes through governor, which paces requests by the
+    rate-limit headers and retries rate-limited ones; share one governor
+    between clients using the same token.
+    """
+
+    def __init__(self, token: str, base_url: str = DEFAULT_API_URL, max_workers: int = 4,
+                 etag_cache: Optional[Dict] = None, timeout: float = 30,
+                 governor: Optional[RateGovernor] = None):
+        self.token = token
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.etag_cache = etag_cache if etag_cache is not None else {}
+        self.governor = governor or RateGovernor()
+        self.stats = {"requests": 0, "not_modified": 0, "retries": 0}
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github.v3+json"
+        })
+
+    def _url(self, path: str, params: Optional[Dict] = None) -> str:
+        """Build the full request URL, which also serves as the cache key."""
+        url = path if path.startswith(("http://", "https://")) else f"{self.base_url}{path}"
+        return requests.Request('GET', url, params=params).prepare().url
+
+    def get(self, path: str, params: Optional[Dict] = None) -> Tuple[object, Dict]:
+        """GET a resource and return (decoded JSON, Link relations)."""
+        url = self._url(path, params)
+        with self._lock:
+            cached = _revalidatable(self.etag_cache.get(url))
+
+        headers = {"If-None-Match": cached["etag"]} if cached else {}
+        response, retry_delay = self._send(url, headers)
+        if response.status_code == 304 and not cached:
+            # Nothing to revalidate against (evicted, or another client's ETag): ask again in full
+            response, retry_delay = self._send(url, UNCONDITIONAL)
+
+        with self._lock:
+            if response.status_code == 304 and cached:
+                self.stats["not_modified"] += 1
+                return cached["data"], cached["links"]
+
+        if response.status_code != 200:
+            reset_at = self.governor.blocked_until if retry_delay is not None else None
+            raise GitHubAPIError(response.status_code, response.reason or "", reset_at)
+
+        data = response.json()
+        links = {rel: link["url"] for rel, link in response.links.items()}
+        etag = response.headers.get("ETag")
+        if etag:
+            with self._lock:
+                self.etag_cache[url] = {"etag": etag, "data": data, "links": links}
+        return data, links
+
+    def _send(self, url: str, headers: Dict) -> Tuple[requests.Response, Optional[float]]:
+        """GET url through the governor, retrying rate-limited answers; returns (response, retry delay)."""
+        for attempt in range(self.governor.max_retries + 1):
+            try:
+                self.governor.acquire()
+            except RateLimitExceeded as e:
+                raise _rate_limit_error(e) from e
+            with span("api_get"):
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            body = response.text if response.status_code in (403, 429) else ""
+            retry_delay = self.governor.update(response.status_code, response.headers, body)
+            with self._lock:
+                self.stats["requests"] += 1
+                if retry_delay is not None and attempt < self.governor.max_retries:
+                    self.stats["retries"] += 1
+                    continue
+            break
+        return response, retry_delay
+
+    def get_paginated(self, path: str, params: Optional[Dict] = None) -> List:
+        """GET every page of a list resource following Link pagination.
+
+        Once the first page reveals the last page number the remaining pages
+        are fetched concurrently; otherwise "next" links are followed in turn.
+        """
+        params = dict(params or {})
+        params.setdefault("per_page", 100)
+
+        items, links = self.get(path, params)
+        items = list(items)
+
+        last_page = self._page_number(links.get("last"))
+        if last_page:
+            def fetch(page: int) -> List:
+                return self.get(path, dict(params, page=page))[0]
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for page_items in executor.map(fetch, range(2, last_page + 1)):
+                    items.extend(page_items)
+            return items
+
+        next_url = links.get("next")
+        while next_url:
+            page_items, links = self.get(next_url)
+            items.extend(page_items)
+            next_url = links.get("next")
+        return items
+
+    @staticmethod
+    def _page_number(url: Optional[str]) -> int:
+        """Extract the page query parameter from a Link URL (0 if absent)."""
+        if not url:
+            return 0
+        pages = parse_qs(urlparse(url).query).get("page")
+        return int(pages[0]) if pages and pages[0].isdigit() else 0
+
+    def get_user(self) -> Dict:
+        """Return the authenticated user; a cheap check that the token is still valid."""
+        return self.get("/user")[0]
+
+    def list_repositories(self, params: Optional[Dict] = None) -> List[Dict]:
+        """Return every repository the authenticated user can access."""
+        return self.get_paginated("/user/repos", params)
+
+    def close(self):
+        """Close the pooled session."""
+        self.session.close()
+
+
+class AsyncGitHubAPIClient:
+    """asyncio counterpart of GitHubAPIClient.
+
+    Uses aiohttp when it is installed; otherwise each request runs the
+    blocking client in the default executor. Both share the ETag cache
+    format, so one dict can back either client, and take a RateGovernor.
+    """
+
+    def __init__(self, token: str, base_url: str = DEFAULT_API_URL, max_workers: int = 4,
+                 etag_cache: Optional[Dict] = None, timeout: float = 30,
+                 governor: Optional[RateGovernor] = None):
+        self.token = token
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.etag_cache = etag_cache if etag_cache is not None else {}
+        self.governor = governor or RateGovernor()
+        self.stats = {"requests": 0, "not_modified": 0, "retries": 0}
+        self._session = None
+        self._sync_client = None
+
+    def _client(self) -> GitHubAPIClient:
+        if self._sync_client is None:
+            self._sync_client = GitHubAPIClient(self.token, self.base_url, self.max_workers,
+                                                self.etag_cache, self.timeout, self.governor)
+            self._sync_client.stats = self.stats
+        return self._sync_client
+
+    async def get(self, path: str, params: Optional[Dict] = None) -> Tuple[object, Dict]:
+        """GET a resource and return (decoded JSON, Link relations)."""
+        if aiohttp is None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._client().get, path, params)
+
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                headers={
+                    "Authorization": f"token {self.token}",
+                    "Accept": "application/vnd.github.v3+json"
+                },
+                connector=aiohttp.TCPConnector(limit=self.max_workers),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+
+        url = self._client()._url(path, params)
+        cached = _revalidatable(self.etag_cache.get(url))
+        headers = {"If-None-Match": cached["etag"]} if cached else {}
+        unconditional_retried = False
+
+        attempt = 0
+        while True:
+            try:
+                await self.governor.acquire_async()
+            except RateLimitExceeded as e:
+                raise _rate_limit_error(e) from e
+            with span("api_get"):
+                async with self._session.get(url, headers=headers) as response:
+                    self.stats["requests"] += 1
+                    body = await response.text() if response.status in (403, 429) else ""
+                    retry_delay = self.governor.update(response.status, response.headers, body)
+                    if retry_delay is not None and attempt < self.governor.max_retries:
+                        self.stats["retries"] += 1
+                        attempt += 1
+                        continue
+                    if response.status == 304 and cached:
+                        self.stats["not_modified"] += 1
+                        return cached["data"], cached["links"]
+                    if response.status == 304 and not unconditional_retried:
+                        # Nothing to revalidate against: ask again in full, once
+                        headers, unconditional_retried = UNCONDITIONAL, True
+                        continue
+                    if response.status != 200:
+                        reset_at = self.governor.blocked_until if retry_delay is not None else None
+                        raise GitHubAPIError(response.status, response.reason or "", reset_at)
+
+                    data = await response.json()
+                    links = {str(rel): str(link["url"]) for rel, link in response.links.items()}
+                    etag = response.headers.get("ETag")
+                    if etag:
+                        self.etag_cache[url] = {"etag": etag, "data": data, "links": links}
+                    return data, links
+
+    async def get_paginated(self, path: str, params: Optional[Dict] = None) -> List:
+        """GET every page of a list resource, fetching known pages concurrently."""
+        params = dict(params or {})
+        params.setdefault("per_page", 100)
+
+        items, links = await self.get(path, params)
+        items = list(items)
+
+        last_page = GitHubAPIClient._page_number(links.get("last"))
+        if last_page:
+            pages = await asyncio.gather(*(
+                self.get(path, dict(params, page=page)) for page in range(2, last_page + 1)
+            ))
+            for page_items, _ in pages:
+                items.extend(page_items)
+            return items
+
+        next_url = links.get("next")
+        while next_url:
+            page_items, links = await self.get(next_url)
+            items.extend(page_items)
+            next_url = links.get("next")
+        return items
+
+    async def list_repositories(self, params: Optional[Dict] = None) -> List[Dict]:
+        """Return every repository the authenticated user can access."""
+        return await self.get_paginated("/user/repos", params)
+
+    async def close(self):
+        """Close the HTTP session(s)."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
@@ -10,23 +10,57 @@ import os
 import random
 import subprocess
 import sys
+import threading
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
+from itertools import islice
 from pathlib import Path
 import argparse
 import logging
+import signal
 from typing import List, Dict, Optional
 
+from activity import ActivityFiles
+from backfill_state import BackfillState
+from commit_plan import CommitPlan, message_choices
+from events import EventLoggerAdapter, EventSink
+from git_backend import GitBackend, GitBackendError, create_backend
+from maintenance import RepoMaintenance
+from metrics import REGISTRY, profiled, span
+from push_queue import push_repository
+from repo_lock import RepoLock, RepoLockTimeout
+from scheduler import LATE_TOLERANCE, CommitScheduler, RepoSchedule, plan_is_idle
+
 
 class GitHubAutoCommit:
-    def __init__(self, config_path: str = "config.json"):
-        """Initialize the auto commit manager."""
+    # Suffixes randomly added to commit messages
+    MESSAGE_VARIATIONS = ["", " - minor update", " - improvements", " - cleanup"]
+    
+    def __init__(self, config_path: str = "config.json", config: Optional[Dict] = None,
+                 logger_name: Optional[str] = None):
+        """Initialize the auto commit manager.
+        
+        An already parsed config can be passed in to skip reading config_path,
+        and logger_name gives the instance its own file logger instead of the
+        process-wide logging setup. Outcomes are also recorded as JSON lines
+        in the event_log file (disabled when empty).
+        """
         self.config_path = config_path
-        self.config = self.load_config()
-        self.setup_logging()
+        self.config = dict(config) if config is not None else self.load_config()
+        self._own_handlers = []
+        self.setup_logging(logger_name)
+        self.setup_events()
+        self._backend = None
+        # Set to cut the pauses between daily commits short
+        self.stop_event = threading.Event()
         
     def load_config(self) -> Dict:
         """Load configuration from JSON file."""
+        return self.read_config(self.config_path)
+    
+    @staticmethod
+    def read_config(config_path: str) -> Dict:
+        """Read a config file merged over the defaults, creating it if missing."""
         default_config = {
             "repository_path": ".",
             "commit_messages": [
@@ -53,28 +87,58 @@ class GitHubAutoCommit:
             "backfill_days": 365,
             "log_file": "auto_commit.log",
             "dry_run": False,
-            "enable_randomization": True
+            "enable_randomization": True,
+            "git_backend": "subprocess",
+            "activity_rotation": "none",
+            "activity_ring_lines": 100,
+            "maintenance": "auto",
+            "maintenance_loose_threshold": 1000,
+            "backfill_checkpoint_interval": 10,
+            "repo_lock": "auto",
+            "repo_lock_timeout": 600,
+            "repo_lock_stale": 3600,
+            "event_log": "auto_commit.events.jsonl",
+            "metrics_textfile": "auto_commit.prom",
+            "metrics_summary": "auto_commit.metrics.json"
         }
         
         try:
-            if os.path.exists(self.config_path):
-                with open(self.config_path, 'r') as f:
+            if os.path.exists(config_path):
+                with open(config_path, 'r') as f:
                     user_config = json.load(f)
                     default_config.update(user_config)
             else:
                 # Create default config file
-                with open(self.config_path, 'w') as f:
+                with open(config_path, 'w') as f:
                     json.dump(default_config, f, indent=2)
-                print(f"Created default config file: {self.config_path}")
+                print(f"Created default config file: {config_path}")
         except Exception as e:
             print(f"Error loading config: {e}")
-            return default_config
-            
+        
+        # Relative output files live next to the config, not in whatever
+        # directory the run happens to start in (a fleet child runs in its clone)
+        config_dir = os.path.dirname(os.path.abspath(config_path))
+        for key in ('event_log', 'metrics_textfile', 'metrics_summary'):
+            path = default_config.get(key)
+            if path and not os.path.isabs(path):
+                default_config[key] = os.path.join(config_dir, path)
         return default_config
     
-    def setup_logging(self):
+    def setup_logging(self, logger_name: Optional[str] = None):
         """Setup logging configuration."""
         log_format = '%(asctime)s - %(levelname)s - %(message)s'
+        
+        if logger_name:
+            # Dedicated logger writing only to this instance's log file
+            handler = logging.FileHandler(self.config['log_file'])
+            handler.setFormatter(logging.Formatter(log_format))
+            self.logger = logging.getLogger(logger_name)
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+            self.logger.addHandler(handler)
+            self._own_handlers.append(handler)
+            return
+        
         logging.basicConfig(
             level=logging.INFO,
             format=log_format,
@@ -85,18 +149,53 @@ class GitHubAutoCommit:
         )
         self.logger = logging.getLogger(__name__)
     
+    def setup_events(self):
+        """Setup the structured event sink and record errors logged from now on."""
+        repo = self.config.get('repo_name') or os.path.basename(
+            os.path.abspath(self.config['repository_path']))
+        self.events = EventSink(self.config.get('event_log'), repo=repo)
+        self.logger = EventLoggerAdapter(self.logger, self.events)
+    
+    @property
+    def backend(self) -> GitBackend:
+        """Git backend selected by the git_backend config key."""
+        name = self.config['git_backend']
+        repo_path = self.config['repository_path']
+        backend = self._backend
+        if backend is None or backend.name != name or backend.repo_path != repo_path:
+            try:
+                backend = create_backend(name, repo_path, self.logger)
+            except GitBackendError as e:
+                self.logger.warning(f"{e}; falling back to subprocess backend")
+                backend = create_backend("subprocess", repo_path, self.logger)
+                self.config['git_backend'] = backend.name
+            self._backend = backend
+        return backend
+    
+    def state_file(self, name: str) -> Optional[str]:
+        """Path of a private state file kept inside the repository's git directory."""
+        git_dir = os.path.join(self.config['repository_path'], '.git')
+        if not os.path.isdir(git_dir):
+            # Worktrees, submodules and the like: let git resolve it
+            git_dir = self.backend.git_dir()
+        return os.path.join(git_dir, name) if git_dir else None
+    
+    def repo_lock(self) -> Optional[RepoLock]:
+        """Advisory lock of the repository against overlapping runs.
+        
+        None when repo_lock is off, or when the lock file cannot be created
+        next to the repository (e.g. a read-only parent directory), in which
+        case the run goes ahead unlocked as before.
+        """
+        lock = RepoLock.from_config(self.config['repository_path'], self.config)
+        if lock and not lock.usable():
+            self.logger.warning(f"Cannot create repository lock {lock.path}; running without it")
+            return None
+        return lock
+    
     def is_git_repository(self) -> bool:
         """Check if current directory is a git repository."""
-        try:
-            result = subprocess.run(
-                ['git', 'rev-parse', '--git-dir'],
-                capture_output=True,
-                text=True,
-                cwd=self.config['repository_path']
-            )
-            return result.returncode == 0
-        except Exception:
-            return False
+        return self.backend.is_repository()
     
     def setup_git_repository(self) -> bool:
         """Initialize git repository if it doesn't exist."""
@@ -104,16 +203,14 @@ class GitHubAutoCommit:
             return True
             
         try:
-            subprocess.run(['git', 'init'], cwd=self.config['repository_path'], check=True)
-            subprocess.run(['git', 'checkout', '-b', 'main'], cwd=self.config['repository_path'], check=True)
+            self.backend.init_repository("main")
             
             # Create initial commit
             readme_content = "# Auto Commit Repository\n\nThis repository is maintained by auto-commit script.\n"
             with open(os.path.join(self.config['repository_path'], 'README.md'), 'w') as f:
                 f.write(readme_content)
                 
-            subprocess.run(['git', 'add', 'README.md'], cwd=self.config['repository_path'], check=True)
-            subprocess.run(['git', 'commit', '-m', 'Initial commit'], cwd=self.config['repository_path'], check=True)
+            self.backend.commit_paths(['README.md'], 'Initial commit')
             
             self.logger.info("Initialized new git repository")
             return True
@@ -127,26 +224,20 @@ class GitHubAutoCommit:
         message = random.choice(base_messages)
         
         # Add some variation
-        variations = ["", " - minor update", " - improvements", " - cleanup"]
-        variation = random.choice(variations)
+        variation = random.choice(self.MESSAGE_VARIATIONS)
         
         return f"{message}{variation}"
     
-    def make_small_change(self, file_path: str) -> bool:
-        """Make a small change to a file to create commit content."""
+    @property
+    def activity(self) -> ActivityFiles:
+        """Activity file layout selected by activity_rotation."""
+        return ActivityFiles.from_config(self.config)
+    
+    def make_small_change(self, file_path: str, date: Optional[datetime] = None) -> bool:
+        """Make a small change to a file (a path from activity.path_for) to create commit content."""
         try:
             full_path = os.path.join(self.config['repository_path'], file_path)
-            
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            change_entry = f"[{timestamp}] Automated activity entry\n"
-            
-            # Append to file or create new
-            with open(full_path, 'a') as f:
-                f.write(change_entry)
-                
+            self.activity.write(full_path, date)
             return True
         except Exception as e:
             self.logger.error(f"Failed to modify file {file_path}: {e}")
@@ -169,35 +260,32 @@ class GitHubAutoCommit:
             
         return True
     
-    def create_commit(self, message: str) -> bool:
-        """Create a single commit."""
+    def create_commit(self, message: str, date: Optional[datetime] = None, mode: str = "daily") -> bool:
+        """Create a single commit, dated now unless date is given; mode labels its event."""
         if self.config['dry_run']:
             self.logger.info(f"[DRY RUN] Would commit: {message}")
+            self.events.emit("dry_run", mode=mode, message=message)
             return True
             
+        started = time.perf_counter()
         try:
-            # Select random file to modify
-            file_to_modify = random.choice(self.config['files_to_modify'])
+            # Select random file to modify (its shard for this date, when rotating monthly)
+            file_to_modify = self.activity.path_for(random.choice(self.config['files_to_modify']), date)
             
             # Make small change
-            if not self.make_small_change(file_to_modify):
+            with span("make_small_change"):
+                changed = self.make_small_change(file_to_modify, date)
+            if not changed:
                 return False
             
-            # Stage changes
-            subprocess.run(
-                ['git', 'add', file_to_modify],
-                cwd=self.config['repository_path'],
-                check=True
-            )
-            
-            # Create commit
-            subprocess.run(
-                ['git', 'commit', '-m', message],
-                cwd=self.config['repository_path'],
-                check=True
-            )
+            # Stage and commit
+            self.backend.commit_paths([file_to_modify], message, date)
             
             self.logger.info(f"Created commit: {message}")
+            if self.events.enabled:
+                dated = {"commit_date": date.isoformat(timespec="seconds")} if date else {}
+                self.events.emit("commit", duration=time.perf_counter() - started,
+                                 sha=self.backend.head_sha(), mode=mode, message=message, **dated)
             return True
             
         except subprocess.CalledProcessError as e:
@@ -211,6 +299,7 @@ class GitHubAutoCommit:
         """Run daily commit routine."""
         if not self.should_commit_now():
             self.logger.info("Skipping commit - not appropriate time")
+            self.events.emit("skip", reason="outside commit window")
             return 0
             
         # Determine number of commits for today
@@ -220,6 +309,9 @@ class GitHubAutoCommit:
         commits_made = 0
         
         for i in range(num_commits):
+            if self.stop_event.is_set():
+                self.logger.info("Daily routine stopped early")
+                break
             message = self.get_random_commit_message()
             
             if self.create_commit(message):
@@ -229,171 +321,440 @@ class GitHubAutoCommit:
                 if i < num_commits - 1:  # Don't sleep after last commit
                     delay = random.randint(30, 300)  # 30 seconds to 5 minutes
                     if not self.config['dry_run']:
-                        time.sleep(delay)
+                        self.stop_event.wait(delay)
         
         self.logger.info(f"Daily routine completed. Made {commits_made} commits")
         return commits_made
     
-    def backfill_history(self, days: int = None) -> int:
-        """Backfill commit history for specified number of days."""
+    def run_planned(self) -> int:
+        """Make the commits of today's persisted plan that are due by now.
+        
+        The first run of a day plans it (see RepoSchedule.plan); later runs
+        only commit entries whose time has come, including any left over
+        from earlier days, dated at their planned time when run late.
+        """
+        schedule = RepoSchedule(self)
+        now = time.time()
+        loaded = schedule.load()
+        due = schedule.take_due(now)
+        if not loaded or schedule.day != datetime.now().date().isoformat():
+            # Leftovers of an earlier day are already in due
+            schedule.plan(datetime.now().date(), now)
+            due += schedule.take_due(now)
+        
+        commits_made = 0
+        for planned in due:
+            commit_date = datetime.fromtimestamp(planned) if now - planned > LATE_TOLERANCE else None
+            if self.create_commit(self.get_random_commit_message(), commit_date, mode="planned"):
+                commits_made += 1
+        
+        if schedule.pending:
+            next_due = datetime.fromtimestamp(schedule.pending[0]).strftime("%H:%M")
+            self.logger.info(f"Planned routine made {commits_made} commits; next due at {next_due}")
+        else:
+            self.logger.info(f"Planned routine made {commits_made} commits; nothing left for today")
+        return commits_made
+    
+    def build_backfill_plan(self, days: int = None) -> CommitPlan:
+        """Decide every commit of a backfill over the last days days, without touching git."""
         if days is None:
             days = self.config['backfill_days']
+        return CommitPlan.generate(
+            days,
+            self.config['daily_commit_range'],
+            message_choices(self.config['commit_messages'], self.MESSAGE_VARIATIONS),
+            self.config['files_to_modify']
+        )
+    
+    def _backfill_entries(self, plan: CommitPlan):
+        """Yield backend series entries, growing each file as make_small_change would."""
+        activity = self.activity
+        contents = {}
+        
+        for target_date, message, planned_file in plan.entries():
+            file_to_modify = activity.path_for(planned_file, target_date)
+            if file_to_modify not in contents:
+                full_path = os.path.join(self.config['repository_path'], file_to_modify)
+                if os.path.exists(full_path):
+                    with open(full_path, 'rb') as f:
+                        contents[file_to_modify] = f.read()
+                else:
+                    contents[file_to_modify] = b""
+            contents[file_to_modify] = activity.updated(contents[file_to_modify], target_date)
             
-        commits_made = 0
+            yield target_date, message, file_to_modify, contents[file_to_modify]
+    
+    def _planned_paths(self, plan: CommitPlan, count: int) -> List[str]:
+        """Repository paths written by the first count commits of plan."""
+        activity = self.activity
+        return sorted({activity.path_for(file_path, target_date)
+                       for target_date, _, file_path in islice(plan.entries(), count)})
+    
+    def backfill_history(self, days: int = None, plan: Optional[CommitPlan] = None,
+                         resume: bool = False) -> int:
+        """Backfill commit history for specified number of days, or execute a ready plan.
+        
+        Progress is checkpointed at day boundaries, at most every
+        backfill_checkpoint_interval seconds, in the repository's git
+        directory; resume=True continues the interrupted backfill recorded
+        there instead of starting a new one.
+        """
+        started = time.perf_counter()
+        state = BackfillState(self)
+        start = 0
+        if resume:
+            if not state.load():
+                self.logger.info("No interrupted backfill to resume")
+                return 0
+            try:
+                start = state.resume_point()
+            except ValueError as e:
+                self.logger.error(f"Cannot resume backfill: {e}")
+                return 0
+            plan = state.plan
+            reached = datetime.fromtimestamp(plan.timestamps[start - 1]).date() if start else "none"
+            self.logger.info(f"Resuming backfill started {state.started} at commit {start + 1} "
+                             f"of {len(plan)} (days done up to {reached})")
+        elif plan is None:
+            plan = self.build_backfill_plan(days)
+        remaining = plan.tail(start)
+        summary = remaining.summary()
+        days = summary['days']
         
-        self.logger.info(f"Starting backfill for {days} days")
+        self.logger.info(f"Starting backfill of {len(remaining)} commits over {days} days "
+                         f"({self.config['git_backend']} backend)")
         
-        for day_offset in range(days - 1, -1, -1):
-            target_date = datetime.now() - timedelta(days=day_offset)
+        if self.config['dry_run']:
+            commits_made = len(remaining)
+            self.logger.info(
+                f"[DRY RUN] Would backfill {commits_made} commits from {summary['first']} "
+                f"to {summary['last']} ({', '.join(f'{name}: {count}' for name, count in summary['files'].items())})"
+            )
+            self.events.emit("dry_run", mode="backfill", commits=commits_made, days=days,
+                             first=summary['first'], last=summary['last'])
+        else:
+            def log_commit(target_date, message):
+                date_str = target_date.strftime("%Y-%m-%d %H:%M:%S")
+                self.logger.info(f"Backfilled commit for {date_str}: {message}")
+                self.events.emit("commit", mode="backfill", commit_date=target_date.isoformat(timespec="seconds"),
+                                 message=message)
+            
+            def checkpoint(commits, sha):
+                state.checkpoint(start + commits, sha)
             
-            # Set GIT_AUTHOR_DATE and GIT_COMMITTER_DATE
-            date_str = target_date.strftime("%Y-%m-%d %H:%M:%S")
+            if resume:
+                # Those files may hold content of commits that never landed
+                self.backend.restore_paths(self._planned_paths(plan, start))
+            else:
+                if state.load():
+                    self.logger.warning(f"Discarding unfinished backfill started {state.started} "
+                                        f"({state.done} of {len(state.plan)} commits checkpointed)")
+                state.start(plan, self.backend.head_sha())
             
-            # Determine number of commits for this day
-            min_commits, max_commits = self.config['daily_commit_range']
-            num_commits = random.randint(min_commits, max_commits)
+            series = (self._backfill_entries(remaining), log_commit, checkpoint,
+                      float(self.config['backfill_checkpoint_interval']))
+            maintenance = RepoMaintenance(self.config['repository_path'], self.config, self.logger)
+            try:
+                if maintenance.mode == "never":
+                    self.backend.commit_series(*series)
+                else:
+                    # Repacked once below instead of by auto-gc halfway through
+                    with maintenance.bulk_writes():
+                        self.backend.commit_series(*series)
+            except Exception as e:
+                self.logger.error(f"Failed to backfill with {self.backend.name} backend: {e}")
+            except KeyboardInterrupt:
+                self.logger.warning(f"Backfill interrupted after {state.done} of {len(plan)} commits; "
+                                    f"run it with --resume to continue")
+                raise
+            commits_made = state.done - start
             
-            for _ in range(num_commits):
-                message = self.get_random_commit_message()
-                
-                if self.config['dry_run']:
-                    self.logger.info(f"[DRY RUN] Would backfill commit for {date_str}: {message}")
-                    commits_made += 1
-                    continue
-                
-                try:
-                    # Select random file
-                    file_to_modify = random.choice(self.config['files_to_modify'])
-                    
-                    # Make change
-                    if not self.make_small_change(file_to_modify):
-                        continue
-                    
-                    # Stage
-                    subprocess.run(
-                        ['git', 'add', file_to_modify],
-                        cwd=self.config['repository_path'],
-                        check=True
-                    )
-                    
-                    # Commit with specific date
-                    env = os.environ.copy()
-                    env['GIT_AUTHOR_DATE'] = date_str
-                    env['GIT_COMMITTER_DATE'] = date_str
-                    
-                    subprocess.run(
-                        ['git', 'commit', '-m', message],
-                        cwd=self.config['repository_path'],
-                        env=env,
-                        check=True
-                    )
-                    
-                    commits_made += 1
-                    self.logger.info(f"Backfilled commit for {date_str}: {message}")
-                    
-                except Exception as e:
-                    self.logger.error(f"Failed to backfill commit for {date_str}: {e}")
+            if state.done == len(plan):
+                state.clear()
+            else:
+                self.logger.warning(f"Backfill stopped after {state.done} of {len(plan)} commits; "
+                                    f"run it with --resume to continue")
         
-        self.logger.info(f"Backfill completed. Made {commits_made} commits")
+        elapsed = time.perf_counter() - started
+        rate = commits_made / elapsed if elapsed > 0 else 0.0
+        self.logger.info(
+            f"Backfill completed. Made {commits_made} commits "
+            f"in {elapsed:.2f}s ({rate:.1f} commits/sec)"
+        )
+        if self.events.enabled and not self.config['dry_run']:
+            self.events.emit("backfill", duration=elapsed, sha=self.backend.head_sha(),
+                             days=days, commits=commits_made, backend=self.backend.name,
+                             resumed_from=start)
+        if commits_made and not self.config['dry_run']:
+            self.run_maintenance()
         return commits_made
     
+    def run_maintenance(self, force: bool = False) -> Optional[Dict]:
+        """Repack the repository and write its commit-graph if the maintenance setting calls for it."""
+        try:
+            result = RepoMaintenance(self.config['repository_path'], self.config, self.logger).run(force)
+        except subprocess.CalledProcessError as e:
+            self.logger.error(f"Repository maintenance failed: {(e.stderr or '').strip() or e}")
+            return None
+        if result["ran"]:
+            before, after = result["before"], result["after"]
+            self.events.emit("maintenance", duration=result["duration"],
+                             loose_before=before.get('count', 0), loose_after=after.get('count', 0),
+                             packs_before=before.get('packs', 0), packs_after=after.get('packs', 0),
+                             size_kb_after=after.get('size', 0) + after.get('size-pack', 0),
+                             **result["timings"])
+        return result
+    
     def push_changes(self) -> bool:
-        """Push changes to remote repository."""
+        """Push the current branch to origin, unless origin already has it."""
         if self.config['dry_run']:
             self.logger.info("[DRY RUN] Would push changes to remote")
             return True
-            
-        try:
-            # Check if remote exists
-            result = subprocess.run(
-                ['git', 'remote'],
-                cwd=self.config['repository_path'],
-                capture_output=True,
-                text=True
-            )
-            
-            if result.stdout.strip():
-                subprocess.run(
-                    ['git', 'push', 'origin', 'main'],
-                    cwd=self.config['repository_path'],
-                    check=True
-                )
-                self.logger.info("Changes pushed to remote repository")
-                return True
-            else:
-                self.logger.warning("No remote repository configured")
-                return False
-                
-        except subprocess.CalledProcessError as e:
-            self.logger.error(f"Failed to push changes: {e}")
+        
+        result = push_repository(self.backend)
+        if result["status"] == "no-remote":
+            self.logger.warning("No remote repository configured")
+            return False
+        if result["status"] == "failed":
+            self.logger.error(f"Failed to push changes: {result['error']}")
+            self.events.emit("push", duration=result["latency"], success=False)
             return False
+        
+        if result["status"] == "up-to-date":
+            self.logger.info(f"Remote branch {result['branch']} is already up to date")
+        else:
+            self.logger.info(f"Changes pushed to remote branch {result['branch']} ({result['bytes']} bytes)")
+        if self.events.enabled:
+            self.events.emit("push", duration=result["latency"], sha=result["sha"],
+                             bytes=result["bytes"], success=True)
+        return True
     
-    def run(self, mode: str = "daily", backfill_days: int = None) -> int:
-        """Main execution method."""
+    def execute(self, mode: str = "daily", backfill_days: int = None, push: bool = True,
+                plan: Optional[CommitPlan] = None, resume: bool = False) -> Dict:
+        """Run the script and return a structured result.
+        
+        The result holds success, commits, pushed and error (None on success).
+        push=False leaves pushing to the caller; backfill mode executes plan
+        instead of generating one when given, or continues the interrupted
+        backfill with resume.
+        """
         self.logger.info(f"Starting auto commit script in {mode} mode")
+        result = {"success": False, "commits": 0, "pushed": False, "error": None}
         
         # Setup repository
         if not self.setup_git_repository():
-            return 0
+            result["error"] = "Failed to setup git repository"
+            return result
         
         commits_made = 0
         
         if mode == "daily":
             commits_made = self.run_daily_commits()
         elif mode == "backfill":
-            commits_made = self.backfill_history(backfill_days)
+            commits_made = self.backfill_history(backfill_days, plan, resume)
+        elif mode == "planned":
+            commits_made = self.run_planned()
         
-        if commits_made > 0:
-            self.push_changes()
+        if commits_made > 0 and push:
+            result["pushed"] = self.push_changes()
         
         self.logger.info(f"Script completed. Total commits made: {commits_made}")
-        return commits_made
+        result["success"] = True
+        result["commits"] = commits_made
+        return result
+    
+    def run(self, mode: str = "daily", backfill_days: int = None, push: bool = True,
+            plan: Optional[CommitPlan] = None, resume: bool = False) -> int:
+        """Main execution method."""
+        return self.execute(mode, backfill_days, push, plan, resume)["commits"]
+    
+    def export_metrics(self):
+        """Write the process's phase timings to the configured metrics files."""
+        try:
+            REGISTRY.export(self.config.get('metrics_textfile'), self.config.get('metrics_summary'))
+        except OSError as e:
+            self.logger.warning(f"Could not export metrics: {e}")
+    
+    def close(self):
+        """Release the log handlers and event file owned by this instance."""
+        for handler in self._own_handlers:
+            self.logger.logger.removeHandler(handler)
+            handler.close()
+        self._own_handlers = []
+        self.events.close()
+
+
+def run_daemon(config_paths: List[str], dry_run: bool = False, backend: Optional[str] = None) -> int:
+    """Serve the daily commits of every config from one scheduler process."""
+    auto_commits = []
+    for index, config_path in enumerate(config_paths):
+        # Several repositories each log to their own file
+        logger_name = f"auto_commit.{index}" if len(config_paths) > 1 else None
+        auto_commit = GitHubAutoCommit(config_path, logger_name=logger_name)
+        if dry_run:
+            auto_commit.config['dry_run'] = True
+        if backend:
+            auto_commit.config['git_backend'] = backend
+        auto_commits.append(auto_commit)
+    # Console output for the scheduler (a single instance has set this up already)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    scheduler = CommitScheduler(auto_commits)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: scheduler.stop())
+    
+    try:
+        scheduler.run()
+    finally:
+        if auto_commits:
+            auto_commits[0].export_metrics()
+        for auto_commit in auto_commits:
+            auto_commit.close()
+    print(f"Successfully made {scheduler.stats['commits']} commits")
+    return 0
+
+
+def planned_run_is_idle(config_path: str) -> bool:
+    """Check from the config file alone that a planned run would have nothing to do."""
+    try:
+        with open(config_path, 'r') as f:
+            repository_path = json.load(f).get('repository_path', '.')
+    except (OSError, ValueError):
+        return False
+    return plan_is_idle(repository_path)
 
 
 def main():
     parser = argparse.ArgumentParser(description="GitHub Auto Commit Script")
     parser.add_argument(
         "--mode",
-        choices=["daily", "backfill"],
+        choices=["daily", "backfill", "planned", "daemon"],
         default="daily",
-        help="Execution mode (default: daily)"
+        help="Execution mode (default: daily); planned commits only what today's "
+             "saved plan has due, for frequent cron runs; daemon keeps running and "
+             "fires each repository's commits at scheduled times"
     )
     parser.add_argument(
         "--days",
         type=int,
         help="Number of days to backfill (only for backfill mode)"
     )
+    parser.add_argument(
+        "--save-plan",
+        metavar="FILE",
+        help="Backfill mode: write the generated commit plan to FILE "
+             "(with --dry-run nothing else is done)"
+    )
+    parser.add_argument(
+        "--plan",
+        metavar="FILE",
+        help="Backfill mode: execute a commit plan saved with --save-plan"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Backfill mode: continue the interrupted backfill from its last checkpoint"
+    )
     parser.add_argument(
         "--config",
-        default="config.json",
-        help="Configuration file path (default: config.json)"
+        nargs="+",
+        default=["config.json"],
+        help="Configuration file path (default: config.json); daemon mode accepts several"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["subprocess", "fast-import", "pygit2"],
+        help="Git backend (overrides git_backend in config)"
+    )
+    parser.add_argument(
+        "--no-push",
+        action="store_true",
+        help="Commit only; leave pushing to the caller"
+    )
+    parser.add_argument(
+        "--no-lock",
+        action="store_true",
+        help="Do not take the repository lock (the caller already holds it)"
     )
     parser.add_argument(
         "--dry-run",
         action="store_true",
         help="Test mode - show what would happen without making changes"
     )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Run under cProfile, dump the stats to FILE and print the hottest functions"
+    )
     
     args = parser.parse_args()
     
+    if args.mode == "daemon":
+        with profiled(args.profile):
+            return run_daemon(args.config, args.dry_run, args.backend)
+    if len(args.config) > 1:
+        parser.error("several --config files are only supported in daemon mode")
+    if (args.plan or args.save_plan) and args.mode != "backfill":
+        parser.error("--plan and --save-plan are only supported in backfill mode")
+    if args.plan and args.days:
+        parser.error("--days cannot be combined with --plan")
+    if args.resume and (args.mode != "backfill" or args.plan or args.save_plan or args.days):
+        parser.error("--resume is only supported in backfill mode, without --plan, --save-plan or --days")
+    
+    if args.mode == "planned" and planned_run_is_idle(args.config[0]):
+        # Nothing due: skip logging, git and the backend entirely
+        print("Successfully made 0 commits")
+        return 0
+    
     # Create auto commit instance
-    auto_commit = GitHubAutoCommit(args.config)
+    auto_commit = GitHubAutoCommit(args.config[0])
     
     # Override dry run setting if specified
     if args.dry_run:
         auto_commit.config['dry_run'] = True
+    if args.backend:
+        auto_commit.config['git_backend'] = args.backend
     
     # Run the script
+    lock = None if args.no_lock else auto_commit.repo_lock()
     try:
-        commits_made = auto_commit.run(mode=args.mode, backfill_days=args.days)
+        if lock:
+            try:
+                waited = lock.acquire()
+            except OSError as e:
+                auto_commit.logger.warning(f"Cannot take repository lock {lock.path}, running without it: {e}")
+                lock, waited = None, 0.0
+            if waited >= 1:
+                auto_commit.logger.info(f"Waited {waited:.1f}s for the repository lock")
+        plan = None
+        if args.plan:
+            plan = CommitPlan.load(args.plan)
+        elif args.save_plan:
+            plan = auto_commit.build_backfill_plan(args.days)
+        if args.save_plan:
+            plan.save(args.save_plan)
+            print(f"Saved plan of {len(plan)} commits to {args.save_plan}")
+        
+        with profiled(args.profile):
+            commits_made = auto_commit.run(mode=args.mode, backfill_days=args.days,
+                                           push=not args.no_push, plan=plan, resume=args.resume)
         print(f"Successfully made {commits_made} commits")
         return 0
+    except RepoLockTimeout as e:
+        # Another run is working in this repository; leave it to that run
+        auto_commit.logger.warning(f"Skipping run: {e}")
+        print(f"Skipped: {e}")
+        return 0
     except KeyboardInterrupt:
         print("\nScript interrupted by user")
         return 1
     except Exception as e:
         print(f"Script failed with error: {e}")
         return 1
+    finally:
+        if lock:
+            lock.release()
+        auto_commit.export_metrics()
 
 
 if __name__ == "__main__":
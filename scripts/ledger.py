@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Run Ledger
+SQLite record of fleet runs and their per-repository outcomes
+"""
+
+import os
+import sqlite3
+import statistics
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+# Completed repositories are skipped until the window they completed in ends
+WINDOWS = {
+    "hour": "%Y-%m-%dT%H",
+    "day": "%Y-%m-%d",
+    "week": "%G-W%V",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fleet_runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    ended REAL,
+    executor TEXT,
+    window TEXT NOT NULL,
+    repos INTEGER NOT NULL DEFAULT 0,
+    succeeded INTEGER,
+    failed INTEGER,
+    skipped INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS repo_runs (
+    id INTEGER PRIMARY KEY,
+    fleet_run INTEGER REFERENCES fleet_runs(id),
+    repo TEXT NOT NULL,
+    window TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started REAL NOT NULL,
+    ended REAL,
+    commits INTEGER,
+    pushed_sha TEXT,
+    error TEXT,
+    clone_time REAL,
+    commit_time REAL,
+    push_time REAL,
+    total_time REAL
+);
+CREATE INDEX IF NOT EXISTS repo_runs_window ON repo_runs(window, status, repo);
+CREATE INDEX IF NOT EXISTS repo_runs_started ON repo_runs(started);
+"""
+
+PHASES = ("clone_time", "commit_time", "push_time", "total_time")
+
+
+class RunLedger:
+    """Per-repository run records shared by every fleet run on this machine.
+
+    Each repository run is a row that starts as "running", becomes
+    "committed" once its commits are made while their push is still
+    queued, and ends as "done", "failed" or "idle" (it succeeded without
+    committing or pushing anything, e.g. outside the active hours or on a
+    rest day, so a later run may still commit); a run that never ends
+    (crash, kill) stays where it got to. Repositories done in the current window
+    (day by default) can be skipped by later runs, so a crashed fleet run
+    resumes with the repositories that failed or never finished, and only
+    pushes those whose commits were made but never pushed. The database
+    is in WAL mode, so overlapping processes can record and report at once.
+    """
+
+    def __init__(self, path: str, window: str = "day"):
+        if window not in WINDOWS:
+            raise ValueError(f"Unknown ledger window: {window}")
+        self.path = path
+        self.window = window
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by the fleet's threads, serialised by the lock
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_config(cls, config: Dict, base_dir: str = ".") -> Optional["RunLedger"]:
+        """Ledger at ledger_file (relative to base_dir), or None when it is disabled."""
+        path = config.get("ledger_file", "configs/run_ledger.sqlite3")
+        if not path:
+            return None
+        if not os.path.isabs(path):
+            path = os.path.join(base_dir, path)
+        return cls(path, config.get("ledger_window", "day"))
+
+    def window_key(self, when: Optional[float] = None) -> str:
+        """Name of the window when (default now) falls in, e.g. "2025-01-31" for daily windows."""
+        return datetime.fromtimestamp(time.time() if when is None else when).strftime(WINDOWS[self.window])
+
+    def _execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def completed(self, window: Optional[str] = None) -> Set[str]:
+        """Repositories with a finished, successful run in window (default: the current one)."""
+        rows = self._execute("SELECT DISTINCT repo FROM repo_runs WHERE window = ? AND status = 'done'",
+                             (window or self.window_key(),)).fetchall()
+        return {row["repo"] for row in rows}
+
+    def unpushed(self, window: Optional[str] = None) -> Set[str]:
+        """Repositories whose commits in window (default: the current one) were made but never pushed.
+
+        That is a run that committed and then failed or was interrupted
+        before its push, with no later run in the window that pushed or
+        committed again.
+        """
+        rows = self._execute(
+            "SELECT DISTINCT repo FROM repo_runs AS run WHERE window = ? AND commits > 0 "
+            "AND pushed_sha IS NULL AND status IN ('committed', 'failed') AND NOT EXISTS ("
+            "SELECT 1 FROM repo_runs AS later WHERE later.repo = run.repo AND later.window = run.window "
+            "AND later.id > run.id AND (later.status = 'done' OR later.commits > 0))",
+            (window or self.window_key(),)).fetchall()
+        return {row["repo"] for row in rows}
+
+    def begin(self, executor: str, repos: int, skipped: int = 0) -> "FleetRun":
+        """Record the start of a fleet run over repos repositories."""
+        started = time.time()
+        cursor = self._execute(
+            "INSERT INTO fleet_runs (started, executor, window, repos, skipped) VALUES (?, ?, ?, ?, ?)",
+            (started, executor, self.window_key(started), repos, skipped))
+        return FleetRun(self, cursor.lastrowid, self.window_key(started))
+
+    def report(self, days: int = 7) -> Dict:
+        """Fleet-wide outcome counts, failure rate, phase latencies and failing repositories.
+
+        Covers repository runs started in the last days days.
+        """
+        since = time.time() - days * 86400
+        rows = self._execute("SELECT * FROM repo_runs WHERE started >= ? ORDER BY started",
+                             (since,)).fetchall()
+        fleet_runs = self._execute("SELECT COUNT(*) AS n, SUM(skipped) AS skipped FROM fleet_runs "
+                                   "WHERE started >= ?", (since,)).fetchone()
+
+        counts = {"done": 0, "failed": 0, "running": 0, "committed": 0, "idle": 0}
+        phases = {phase: [] for phase in PHASES}
+        failures: Dict[str, Dict] = {}
+        commits = 0
+        for row in rows:
+            counts[row["status"]] = counts.get(row["status"], 0) + 1
+            commits += row["commits"] or 0
+            if row["status"] == "done":
+                for phase in PHASES:
+                    if row[phase] is not None:
+                        phases[phase].append(row[phase])
+            elif row["status"] == "failed":
+                failure = failures.setdefault(row["repo"], {"repo": row["repo"], "failures": 0})
+                failure["failures"] += 1
+                failure["last_error"] = row["error"]
+
+        finished = counts["done"] + counts["failed"]
+        return {
+            "days": days,
+            "fleet_runs": fleet_runs["n"] or 0,
+            "skipped": fleet_runs["skipped"] or 0,
+            "repo_runs": len(rows),
+            "done": counts["done"],
+            "failed": counts["failed"],
+            "idle": counts["idle"],
+            "unfinished": counts["running"] + counts["committed"],
+            "failure_rate": counts["failed"] / finished if finished else 0.0,
+            "commits": commits,
+            "latency": {phase: _latency(values) for phase, values in phases.items()},
+            "failing_repos": sorted(failures.values(), key=lambda item: item["failures"], reverse=True),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class FleetRun:
+    """Handle recording the repositories of one fleet run into a RunLedger."""
+
+    def __init__(self, ledger: RunLedger, run_id: int, window: str):
+        self.ledger = ledger
+        self.id = run_id
+        self.window = window
+
+    def start(self, repo: str) -> int:
+        """Record that repo is being processed; returns the id finish() takes."""
+        cursor = self.ledger._execute(
+            "INSERT INTO repo_runs (fleet_run, repo, window, status, started) VALUES (?, ?, ?, 'running', ?)",
+            (self.id, repo, self.window, time.time()))
+        return cursor.lastrowid
+
+    def committed(self, repo_run: int, result: Dict):
+        """Record that repo_run made its commits and queued their push (finish() records the push)."""
+        self.ledger._execute(
+            "UPDATE repo_runs SET status = 'committed', commits = ?, error = ?, "
+            "clone_time = ?, commit_time = ? WHERE id = ?",
+            (result.get("commits", 0), result.get("error"), result.get("clone_time"),
+             result.get("commit_time"), repo_run))
+
+    def finish(self, repo_run: int, result: Dict):
+        """Record the outcome of a repository run from its fleet result dict."""
+        self.ledger._execute(
+            "UPDATE repo_runs SET status = ?, ended = ?, commits = ?, pushed_sha = ?, error = ?, "
+            "clone_time = ?, commit_time = ?, push_time = ?, total_time = ? WHERE id = ?",
+            (_status(result), time.time(), result.get("commits", 0),
+             result.get("pushed_sha"), result.get("error"),
+             *(result.get(phase) for phase in PHASES), repo_run))
+
+    def end(self, results: List[Dict]):
+        """Record the end of the fleet run with its success and failure counts."""
+        succeeded = sum(1 for result in results if result.get("success"))
+        self.ledger._execute("UPDATE fleet_runs SET ended = ?, succeeded = ?, failed = ? WHERE id = ?",
+                             (time.time(), succeeded, len(results) - succeeded, self.id))
+
+
+def _status(result: Dict) -> str:
+    if not result.get("success"):
+        return "failed"
+    return "done" if result.get("commits") or result.get("pushed") else "idle"
+
+
+def _latency(values: List[float]) -> Dict:
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": statistics.median(ordered),
+        "p95": ordered[int(0.95 * (len(ordered) - 1))],
+        "max": ordered[-1],
+    }
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Repository Maintenance
+Repack and commit-graph upkeep after bulk commit runs, with auto-gc held off during them
+"""
+
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from git_history import find_repositories
+from metrics import git_phase, span
+
+MODES = ("auto", "always", "never")
+# Repository-local git config key that overrides the maintenance config setting
+MODE_KEY = "autocommit.maintenance"
+
+
+class RepoMaintenance:
+    """Keeps one repository's object store compact.
+
+    A bulk run writes thousands of loose objects; left alone, git's
+    auto-gc repacks them in the middle of some later command. Instead
+    auto-gc is switched off for the duration of bulk writes and the
+    repository is repacked once afterwards, with a commit-graph so log
+    and reachability walks stay fast.
+    """
+
+    def __init__(self, repo_path: str, config: Optional[Dict] = None,
+                 logger: Optional[logging.Logger] = None):
+        config = config or {}
+        self.repo_path = repo_path
+        self.logger = logger or logging.getLogger(__name__)
+        self.loose_threshold = int(config.get('maintenance_loose_threshold', 1000))
+        self.pack_threshold = int(config.get('maintenance_pack_threshold', 20))
+        self.configured_mode = config.get('maintenance', "auto")
+
+    def _git(self, args: List[str], check: bool = True) -> subprocess.CompletedProcess:
+        with span(git_phase(args)):
+            return subprocess.run(['git'] + args, cwd=self.repo_path, check=check,
+                                  capture_output=True, text=True)
+
+    @property
+    def mode(self) -> str:
+        """Effective mode (auto, always or never); the repository's git config wins over the config file."""
+        local = self._git(['config', '--local', '--get', MODE_KEY], check=False).stdout.strip()
+        mode = local or self.configured_mode
+        return mode if mode in MODES else "auto"
+
+    def count_objects(self) -> Dict[str, int]:
+        """`git count-objects -v` as integers (count, size, in-pack, packs, size-pack, ...)."""
+        output = self._git(['count-objects', '-v']).stdout
+        counts = {}
+        for line in output.splitlines():
+            key, _, value = line.partition(':')
+            if value.strip().isdigit():
+                counts[key.strip()] = int(value)
+        return counts
+
+    def needed(self, counts: Optional[Dict[str, int]] = None) -> bool:
+        """Whether loose objects or packs have piled up past their thresholds."""
+        counts = counts or self.count_objects()
+        return (counts.get('count', 0) >= self.loose_threshold
+                or counts.get('packs', 0) >= self.pack_threshold)
+
+    @contextmanager
+    def bulk_writes(self):
+        """Hold off auto-gc and background maintenance while the block writes objects.
+
+        The repository's previous settings are restored afterwards.
+        """
+        keys = {'gc.auto': '0', 'maintenance.auto': 'false'}
+        previous = {}
+        for key, value in keys.items():
+            result = self._git(['config', '--local', '--get', key], check=False)
+            previous[key] = result.stdout.strip() if result.returncode == 0 else None
+            self._git(['config', '--local', key, value])
+        try:
+            yield
+        finally:
+            for key, value in previous.items():
+                if value is None:
+                    self._git(['config', '--local', '--unset', key], check=False)
+                else:
+                    self._git(['config', '--local', key, value], check=False)
+
+    def run(self, force: bool = False) -> Dict:
+        """Repack everything into one pack and write the commit-graph, when needed or forced.
+
+        Returns {"repo", "ran", "mode", "before", "after", "timings", "duration"}.
+        """
+        started = time.perf_counter()
+        mode = self.mode
+        before = self.count_objects()
+        result = {"repo": self.repo_path, "ran": False, "mode": mode, "before": before,
+                  "after": before, "timings": {}, "duration": 0.0}
+
+        if mode == "never" or not (force or mode == "always" or self.needed(before)):
+            result["duration"] = time.perf_counter() - started
+            return result
+
+        steps = [
+            ("repack", ['repack', '-a', '-d', '-q']),
+            ("prune_packed", ['prune-packed', '-q']),
+            ("commit_graph", ['commit-graph', 'write', '--reachable', '--no-progress']),
+        ]
+        for name, args in steps:
+            step_started = time.perf_counter()
+            self._git(args)
+            result["timings"][name] = round(time.perf_counter() - step_started, 3)
+
+        result["after"] = self.count_objects()
+        result["ran"] = True
+        result["duration"] = time.perf_counter() - started
+        self.logger.info(
+            f"Maintenance of {self.repo_path}: {before.get('count', 0)} loose objects / "
+            f"{before.get('packs', 0)} packs -> {result['after'].get('count', 0)} / "
+            f"{result['after'].get('packs', 0)} in {result['duration']:.2f}s"
+        )
+        return result
+
+
+def maintain_repositories(repo_paths: List[str], config: Optional[Dict] = None,
+                          force: bool = False) -> List[Dict]:
+    """Run maintenance over several repositories one after another, collecting results.
+
+    Repacking is CPU- and disk-bound, so running them side by side only
+    makes each slower.
+    """
+    results = []
+    for repo_path in repo_paths:
+        try:
+            results.append(RepoMaintenance(repo_path, config).run(force))
+        except subprocess.CalledProcessError as e:
+            error = (e.stderr or "").strip() or str(e)
+            results.append({"repo": repo_path, "ran": False, "error": error})
+    return results
+
+
+def print_results(results: List[Dict]):
+    """Print a per-repository before/after table."""
+    print(f"{'Repository':<30} {'Loose':>13} {'Packs':>9} {'Size KB':>17} {'Time':>8}")
+    for result in results:
+        name = os.path.basename(os.path.abspath(result["repo"]))[:30]
+        if "error" in result:
+            print(f"{name:<30} ❌ {result['error']}")
+            continue
+        before, after = result["before"], result["after"]
+        size_before = before.get('size', 0) + before.get('size-pack', 0)
+        size_after = after.get('size', 0) + after.get('size-pack', 0)
+        status = f"{result['duration']:>7.2f}s" if result["ran"] else f"skipped ({result['mode']})"
+        print(f"{name:<30} {before.get('count', 0):>6}->{after.get('count', 0):<6} "
+              f"{before.get('packs', 0):>4}->{after.get('packs', 0):<4} "
+              f"{size_before:>8}->{size_after:<8} {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Repack and write commit-graphs for auto commit repositories")
+    parser.add_argument("repos", nargs="*", default=["."],
+                        help="Repositories, or directories of clones (default: current directory)")
+    parser.add_argument("--force", action="store_true",
+                        help="Maintain even repositories below the thresholds")
+    args = parser.parse_args()
+
+    repo_paths = []
+    for path in args.repos:
+        repo_paths += [path] if os.path.exists(os.path.join(path, '.git')) else find_repositories(path)
+    if not repo_paths:
+        print("No git repositories found")
+        return 1
+
+    print_results(maintain_repositories(repo_paths, force=args.force))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Run Metrics
+Timing spans aggregated into per-phase histograms, exported for Prometheus and as JSON
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Upper bounds in seconds, from a cached API call to a large clone
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside its bucket, as histogram_quantile does."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "total": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": round(self.quantile(0.5), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "max": round(self.max, 6),
+        }
+
+
+class MetricsRegistry:
+    """Per-phase histograms shared by every thread of the process.
+
+    Phases are short names such as "git_commit", "api_get" or
+    "make_small_change"; a span() around a piece of work records its
+    duration under one. Gauges hold the latest value of a level, such as
+    the remaining API budget.
+    """
+
+    PREFIX = "auto_commit"
+
+    def __init__(self):
+        self.phases: Dict[str, Histogram] = {}
+        self.gauges: Dict[str, float] = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def observe(self, phase: str, seconds: float):
+        with self._lock:
+            histogram = self.phases.get(phase)
+            if histogram is None:
+                histogram = self.phases[phase] = Histogram()
+            histogram.observe(seconds)
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    @contextmanager
+    def span(self, phase: str):
+        """Time the with block, failed or not, under phase."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - started)
+
+    def reset(self):
+        with self._lock:
+            self.phases = {}
+            self.gauges = {}
+            self.started = time.time()
+
+    def summary(self) -> Dict:
+        """{"run_seconds", "phases": {phase: count, total, mean, p50, p95, max}, "gauges"}, slowest total first."""
+        with self._lock:
+            phases = {name: histogram.summary() for name, histogram in self.phases.items()}
+            gauges = dict(sorted(self.gauges.items()))
+        ordered = dict(sorted(phases.items(), key=lambda item: item[1]["total"], reverse=True))
+        return {"run_seconds": round(time.time() - self.started, 3), "phases": ordered, "gauges": gauges}
+
+    def prometheus_text(self) -> str:
+        """Every histogram in the Prometheus text exposition format."""
+        name = f"{self.PREFIX}_phase_duration_seconds"
+        lines = [
+            f"# HELP {name} Time spent per phase of the auto commit run.",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            for phase, histogram in sorted(self.phases.items()):
+                label = phase.replace('\\', '\\\\').replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{phase="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{phase="{label}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{phase="{label}"}} {histogram.sum:.6f}')
+                lines.append(f'{name}_count{{phase="{label}"}} {histogram.count}')
+            for gauge, value in sorted(self.gauges.items()):
+                lines += [f"# TYPE {self.PREFIX}_{gauge} gauge", f"{self.PREFIX}_{gauge} {value:g}"]
+        lines += [
+            f"# HELP {self.PREFIX}_last_run_timestamp_seconds Unix time the metrics were exported.",
+            f"# TYPE {self.PREFIX}_last_run_timestamp_seconds gauge",
+            f"{self.PREFIX}_last_run_timestamp_seconds {time.time():.3f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def export(self, textfile: Optional[str] = None, summary_file: Optional[str] = None):
+        """Write the Prometheus textfile and/or the JSON summary (atomically; empty paths are skipped)."""
+        if textfile:
+            _write_atomic(textfile, self.prometheus_text())
+        if summary_file:
+            _write_atomic(summary_file, json.dumps(self.summary(), indent=2) + "\n")
+
+    def format_summary(self) -> List[str]:
+        """Table rows of the per-phase summary for console output."""
+        rows = [f"{'Phase':<22} {'Count':>6} {'Total':>9} {'Mean':>9} {'p95':>9} {'Max':>9}"]
+        for phase, stats in self.summary()["phases"].items():
+            rows.append(f"{phase[:22]:<22} {stats['count']:>6} {stats['total']:>8.3f}s "
+                        f"{stats['mean'] * 1000:>7.1f}ms {stats['p95'] * 1000:>7.1f}ms "
+                        f"{stats['max'] * 1000:>7.1f}ms")
+        with self._lock:
+            gauges = sorted(self.gauges.items())
+        rows += [f"{gauge:<22} {value:>6g}" for gauge, value in gauges]
+        return rows
+
+
+def _write_atomic(path: str, text: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def git_phase(args: List[str]) -> str:
+    """Phase name of a git command line: "git_" plus its subcommand."""
+    return "git_" + (args[0].replace('-', '_') if args else "unknown")
+
+
+# Process-wide registry every module records into
+REGISTRY = MetricsRegistry()
+span = REGISTRY.span
+
+
+@contextmanager
+def profiled(path: Optional[str], top: int = 25):
+    """Run the with block under cProfile when path is set.
+
+    The raw stats are dumped to path (for snakeviz, pstats, ...) and the
+    top functions by cumulative time are printed.
+    """
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"Profile written to {path}; top {top} by cumulative time:")
+        pstats.Stats(profiler).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
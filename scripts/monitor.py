@@ -7,27 +7,198 @@ Monitoring and analysis tool for the auto commit system
 import json
 import os
 import re
-from datetime import datetime, timedelta
+import struct
+from datetime import datetime
 from collections import defaultdict
 import argparse
 
+from day_stats import DayStats
+from git_history import HistoryCache, find_repositories
+from ledger import RunLedger
+from log_parser import scan_log
+
 
 class CommitMonitor:
-    def __init__(self, log_file="auto_commit.log", config_file="config.json"):
+    READ_CHUNK_SIZE = 1024 * 1024
+    HEAD_FINGERPRINT_SIZE = 256
+    
+    def __init__(self, log_file="auto_commit.log", config_file="config.json",
+                 checkpoint_file=None, use_checkpoint=True, parser="fast", events_file=None,
+                 repo_paths=None, ledger_file=None):
         self.log_file = log_file
+        self.ledger_file = ledger_file
+        self.events_file = events_file
+        self.repo_paths = repo_paths
+        self.parser = parser
         self.config_file = config_file
+        if repo_paths:
+            self.checkpoint_file = checkpoint_file or "git_history.checkpoint.json"
+        else:
+            self.checkpoint_file = checkpoint_file or f"{events_file or log_file}.checkpoint.json"
+        self.use_checkpoint = use_checkpoint
         self.stats = defaultdict(int)
-        self.daily_stats = defaultdict(lambda: defaultdict(int))
+        self.daily_stats = DayStats()
+        self.repo_stats = defaultdict(lambda: defaultdict(int))
+    
+    @property
+    def source_file(self):
+        """The file statistics are read from: the event stream if given, else the log."""
+        return self.events_file or self.log_file
         
     def parse_log(self):
-        """Parse the log file and extract statistics."""
-        if not os.path.exists(self.log_file):
+        """Parse the log file (or event stream) and extract statistics.
+        
+        With checkpointing enabled only bytes appended since the previous
+        report are parsed; earlier results are restored from the checkpoint.
+        A changed inode, a shrunken file or a different first block means
+        the log was rotated or truncated, and the new file is read from the
+        start while the accumulated statistics are kept.
+        """
+        if not os.path.exists(self.source_file):
             print("No log file found")
             return
+        
+        file_stat = os.stat(self.source_file)
+        offset = 0
+        
+        with open(self.source_file, 'rb') as f:
+            head = f.read(self.HEAD_FINGERPRINT_SIZE).hex()
+            
+            if self.use_checkpoint:
+                checkpoint = self._load_checkpoint()
+                if checkpoint:
+                    self._restore_stats(checkpoint)
+                    saved_head = checkpoint['head']
+                    if (checkpoint['inode'] == file_stat.st_ino
+                            and checkpoint['offset'] <= file_stat.st_size
+                            and head[:len(saved_head)] == saved_head):
+                        offset = checkpoint['offset']
+                    else:
+                        print("Log rotated or truncated since last report; reading new log from start")
+            
+            if self.events_file:
+                f.seek(offset)
+                offset = self._parse_stream(f, offset, self._parse_event)
+            elif self.parser == "reference":
+                f.seek(offset)
+                offset = self._parse_stream(f, offset, self._parse_line)
+        
+        if not self.events_file and self.parser != "reference":
+            offset = self._scan(offset)
+        
+        if self.use_checkpoint:
+            self._save_checkpoint({
+                'offset': offset,
+                'inode': file_stat.st_ino,
+                'size': file_stat.st_size,
+                'head': head[:offset * 2],
+            })
+    
+    def parse_git_history(self):
+        """Build commit statistics from the git history of repo_paths.
+        
+        Each repository costs one streamed `git log` pass; with checkpointing
+        enabled later reports only walk commits added since the cached HEAD.
+        """
+        history = HistoryCache(self.checkpoint_file)
+        if self.use_checkpoint:
+            history.load()
+        
+        for repo_path in self.repo_paths:
+            if not os.path.isdir(repo_path):
+                print(f"Repository not found: {repo_path}")
+                continue
+            daily, mode = history.collect(repo_path)
+            commits = sum(daily.values())
+            print(f"📚 {os.path.basename(os.path.abspath(repo_path))}: {commits} commits ({mode})")
             
-        with open(self.log_file, 'r') as f:
-            for line in f:
-                self._parse_line(line.strip())
+            self.stats['total_commits'] += commits
+            self.repo_stats[os.path.basename(os.path.abspath(repo_path))]['commit'] += commits
+            for date, count in daily.items():
+                self.daily_stats.add(date, count)
+        
+        if self.use_checkpoint:
+            history.save()
+        print()
+    
+    def _scan(self, offset):
+        """Scan the log from offset with the streaming parser and return the new offset."""
+        stats, commits_by_date, offset = scan_log(self.log_file, offset)
+        for name, count in stats.items():
+            self.stats[name] += count
+        for date, count in commits_by_date.items():
+            self.daily_stats.add(date, count)
+        return offset
+    
+    def _parse_stream(self, f, offset, parse_line):
+        """Feed complete lines one by one to parse_line and return the new offset."""
+        pending = b""
+        while True:
+            chunk = f.read(self.READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            pending += chunk
+            end = pending.rfind(b"\n") + 1
+            if not end:
+                continue
+            for line in pending[:end].decode('utf-8', errors='replace').splitlines():
+                parse_line(line.strip())
+            offset += end
+            pending = pending[end:]
+        # A trailing partial line is picked up by the next report
+        return offset
+    
+    @property
+    def daily_stats_file(self):
+        """Binary DayStats file kept next to the checkpoint."""
+        return f"{os.path.splitext(self.checkpoint_file)[0]}.days"
+    
+    def _load_checkpoint(self):
+        """Load the saved parse position and statistics, if any."""
+        try:
+            if os.path.exists(self.checkpoint_file):
+                with open(self.checkpoint_file, 'r') as f:
+                    checkpoint = json.load(f)
+                if 'daily_stats' in checkpoint:
+                    # Older checkpoints kept the per-day counts inline
+                    checkpoint['days'] = DayStats.from_dict(checkpoint.pop('daily_stats'))
+                else:
+                    checkpoint['days'] = DayStats.load(self.daily_stats_file)
+                    if checkpoint['days'].total() != checkpoint.get('daily_total'):
+                        raise ValueError("daily statistics do not match the checkpoint")
+                return checkpoint
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Ignoring unreadable checkpoint {self.checkpoint_file}: {e}")
+        return None
+    
+    def _restore_stats(self, checkpoint):
+        """Restore aggregated statistics from a checkpoint."""
+        self.stats = defaultdict(int, checkpoint.get('stats', {}))
+        self.daily_stats = checkpoint['days']
+        self.repo_stats = defaultdict(lambda: defaultdict(int))
+        for repo, counts in checkpoint.get('repo_stats', {}).items():
+            self.repo_stats[repo].update(counts)
+    
+    def _save_checkpoint(self, position):
+        """Atomically persist the parse position together with the statistics."""
+        checkpoint = dict(position)
+        checkpoint['stats'] = dict(self.stats)
+        checkpoint['daily_total'] = self.daily_stats.total()
+        checkpoint['repo_stats'] = {repo: dict(counts) for repo, counts in self.repo_stats.items()}
+        
+        # Written first; daily_total lets a reader detect a checkpoint that did not follow
+        self.daily_stats.save(self.daily_stats_file)
+        
+        tmp_file = f"{self.checkpoint_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(checkpoint, f, separators=(',', ':'))
+        os.replace(tmp_file, self.checkpoint_file)
+    
+    def reset_checkpoint(self):
+        """Forget the saved parse position so the next report starts over."""
+        for path in (self.checkpoint_file, self.daily_stats_file):
+            if os.path.exists(path):
+                os.remove(path)
     
     def _parse_line(self, line):
         """Parse individual log line."""
@@ -42,7 +213,7 @@ class CommitMonitor:
         # Count different types of activities
         if "Created commit:" in line:
             self.stats['total_commits'] += 1
-            self.daily_stats[date]['commits'] += 1
+            self.daily_stats.add(date)
         elif "DRY RUN" in line:
             self.stats['dry_runs'] += 1
         elif "ERROR" in line:
@@ -50,6 +221,34 @@ class CommitMonitor:
         elif "SKIP" in line or "Skipping" in line:
             self.stats['skipped'] += 1
     
+    def _parse_event(self, line):
+        """Parse one JSON event written by events.EventSink."""
+        if not line:
+            return
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        
+        kind = event.get('event')
+        if kind == 'commit':
+            # Backfilled commits count on the day they are dated
+            date = (event.get('commit_date') or event['ts'])[:10]
+            self.stats['total_commits'] += 1
+            self.daily_stats.add(date)
+        elif kind == 'dry_run':
+            # A backfill dry run is one event covering all its planned commits
+            self.stats['dry_runs'] += event.get('commits', 1)
+        elif kind == 'error':
+            self.stats['errors'] += 1
+        elif kind == 'skip':
+            self.stats['skipped'] += 1
+        elif kind == 'push':
+            self.stats['pushes' if event.get('success') else 'push_failures'] += 1
+        else:
+            return
+        self.repo_stats[event.get('repo', '')][kind] += 1
+    
     def analyze_patterns(self):
         """Analyze commit patterns for naturalness."""
         print("📈 Commit Pattern Analysis")
@@ -60,7 +259,7 @@ class CommitMonitor:
             return
             
         # Calculate daily statistics
-        daily_counts = [stats['commits'] for stats in self.daily_stats.values() if stats['commits'] > 0]
+        daily_counts = self.daily_stats.active_counts()
         
         if not daily_counts:
             print("No successful commits recorded")
@@ -109,61 +308,25 @@ class CommitMonitor:
     
     def _count_consecutive_active_days(self):
         """Count maximum consecutive active days."""
-        dates = sorted(self.daily_stats.keys())
-        if not dates:
-            return 0
-            
-        max_streak = 1
-        current_streak = 1
-        
-        for i in range(1, len(dates)):
-            current_date = datetime.strptime(dates[i], "%Y-%m-%d")
-            prev_date = datetime.strptime(dates[i-1], "%Y-%m-%d")
-            
-            if (current_date - prev_date).days == 1:
-                current_streak += 1
-                max_streak = max(max_streak, current_streak)
-            else:
-                current_streak = 1
-                
-        return max_streak
+        return self.daily_stats.max_streak()
     
     def _check_weekend_activity(self):
         """Calculate weekend activity ratio."""
-        weekend_commits = 0
-        total_commits = 0
-        
-        for date_str, stats in self.daily_stats.items():
-            if stats['commits'] > 0:
-                date = datetime.strptime(date_str, "%Y-%m-%d")
-                # Saturday = 5, Sunday = 6
-                if date.weekday() >= 5:
-                    weekend_commits += stats['commits']
-                total_commits += stats['commits']
-        
-        return weekend_commits / total_commits if total_commits > 0 else 0
+        return self.daily_stats.weekend_ratio()
     
     def show_recent_activity(self, days=7):
         """Show recent commit activity."""
         print(f"\n📅 Recent Activity (Last {days} Days)")
         print("-" * 40)
         
-        cutoff_date = datetime.now() - timedelta(days=days)
-        recent_activity = {}
-        
-        for date_str, stats in self.daily_stats.items():
-            date = datetime.strptime(date_str, "%Y-%m-%d")
-            if date >= cutoff_date:
-                recent_activity[date_str] = stats
+        recent_activity = self.daily_stats.recent(days)
         
         if not recent_activity:
             print("No recent activity found")
             return
             
-        for date_str in sorted(recent_activity.keys(), reverse=True):
-            stats = recent_activity[date_str]
-            if stats['commits'] > 0:
-                print(f"{date_str}: {stats['commits']} commits")
+        for date_str, commits in recent_activity:
+            print(f"{date_str}: {commits} commits")
     
     def check_safety_metrics(self):
         """Check various safety metrics."""
@@ -183,19 +346,73 @@ class CommitMonitor:
         else:
             print("✅ Good error rate")
     
-    def generate_report(self):
+    def show_repository_breakdown(self):
+        """Show per-repository event counts (event streams only)."""
+        if len(self.repo_stats) < 2:
+            return
+        
+        print("\n📦 Repositories")
+        print("-" * 40)
+        print(f"{'Repository':<30} {'Commits':>8} {'Errors':>7} {'Skips':>6} {'Pushes':>7}")
+        for repo in sorted(self.repo_stats):
+            counts = self.repo_stats[repo]
+            print(f"{repo[:30]:<30} {counts['commit']:>8} {counts['error']:>7} "
+                  f"{counts['skip']:>6} {counts['push']:>7}")
+    
+    def show_ledger_report(self, days=7):
+        """Show fleet-wide outcomes and phase latencies from the run ledger."""
+        if not self.ledger_file:
+            return
+        
+        print(f"\n📒 Fleet Runs (Last {days} Days)")
+        print("-" * 40)
+        if not os.path.exists(self.ledger_file):
+            print(f"No run ledger at {self.ledger_file}")
+            return
+        
+        ledger = RunLedger(self.ledger_file)
+        try:
+            report = ledger.report(days)
+        finally:
+            ledger.close()
+        
+        print(f"Fleet runs: {report['fleet_runs']} ({report['skipped']} repositories skipped as done)")
+        print(f"Repository runs: {report['repo_runs']} ({report['done']} done, {report['failed']} failed, "
+              f"{report['idle']} idle, {report['unfinished']} unfinished)")
+        print(f"Failure rate: {report['failure_rate'] * 100:.1f}%")
+        print(f"Commits: {report['commits']}")
+        
+        print(f"{'Phase':<8} {'Count':>6} {'Mean':>8} {'p50':>8} {'p95':>8} {'Max':>8}")
+        for phase, latency in report["latency"].items():
+            print(f"{phase.replace('_time', ''):<8} {latency['count']:>6} {latency['mean']:>7.2f}s "
+                  f"{latency['p50']:>7.2f}s {latency['p95']:>7.2f}s {latency['max']:>7.2f}s")
+        
+        for failing in report["failing_repos"][:10]:
+            print(f"❌ {failing['repo'][:30]:<30} {failing['failures']:>3} failures, last: {failing['last_error']}")
+    
+    def generate_report(self, days=7):
         """Generate comprehensive monitoring report."""
-        self.parse_log()
+        if self.repo_paths:
+            self.parse_git_history()
+        else:
+            self.parse_log()
         
         print("🤖 GitHub Auto Commit Monitor Report")
         print("=" * 50)
         print(f"Report generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"Log file: {self.log_file}")
+        if self.repo_paths:
+            print(f"Git history: {len(self.repo_paths)} repositories")
+        elif self.events_file:
+            print(f"Event stream: {self.events_file}")
+        else:
+            print(f"Log file: {self.log_file}")
         print()
         
         self.analyze_patterns()
         self.check_safety_metrics()
-        self.show_recent_activity()
+        self.show_recent_activity(days)
+        self.show_repository_breakdown()
+        self.show_ledger_report(days)
 
 
 def main():
@@ -203,11 +420,46 @@ def main():
     parser.add_argument("--log-file", default="auto_commit.log", help="Log file path")
     parser.add_argument("--config-file", default="config.json", help="Config file path")
     parser.add_argument("--days", type=int, default=7, help="Days of recent activity to show")
+    parser.add_argument("--checkpoint-file", help="Checkpoint path (default: <log file>.checkpoint.json)")
+    parser.add_argument("--no-checkpoint", action="store_true", help="Parse the whole log without a checkpoint")
+    parser.add_argument("--reset-checkpoint", action="store_true", help="Discard the checkpoint and reparse the log")
+    parser.add_argument("--parser", choices=["fast", "reference"], default="fast",
+                        help="Log parser engine (default: fast)")
+    parser.add_argument("--events-file",
+                        help="Read the structured JSONL event stream instead of the text log")
+    parser.add_argument("--git-history", action="store_true",
+                        help="Count commits from git history of repository_path instead of the log")
+    parser.add_argument("--repo", action="append", dest="repos",
+                        help="Repository to read git history from (repeatable)")
+    parser.add_argument("--repos-dir", help="Read git history from every clone in this directory (e.g. repos)")
+    parser.add_argument("--ledger", metavar="FILE",
+                        help="Add fleet run outcomes and latencies from this run ledger (e.g. configs/run_ledger.sqlite3)")
     
     args = parser.parse_args()
     
-    monitor = CommitMonitor(args.log_file, args.config_file)
-    monitor.generate_report()
+    repo_paths = list(args.repos or [])
+    if args.repos_dir:
+        clones = find_repositories(args.repos_dir)
+        if not clones:
+            print(f"No git clones found in {args.repos_dir}")
+        repo_paths += clones
+    if args.git_history and not repo_paths:
+        repo_path = "."
+        if os.path.exists(args.config_file):
+            with open(args.config_file, 'r') as f:
+                repo_path = json.load(f).get('repository_path', '.')
+        repo_paths = [repo_path]
+    
+    monitor = CommitMonitor(args.log_file, args.config_file,
+                            checkpoint_file=args.checkpoint_file,
+                            use_checkpoint=not args.no_checkpoint,
+                            parser=args.parser,
+                            events_file=args.events_file,
+                            repo_paths=repo_paths,
+                            ledger_file=args.ledger)
+    if args.reset_checkpoint:
+        monitor.reset_checkpoint()
+    monitor.generate_report(args.days)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Push Queue
+Pushes deferred to the end of a fleet run and sent concurrently
+"""
+
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from git_backend import GitBackend
+from metrics import REGISTRY
+from repo_lock import RepoLock, RepoLockTimeout
+
+
+def push_repository(backend: GitBackend, remote: str = "origin") -> Dict:
+    """Push the checked-out branch to the branch of the same name on remote.
+
+    When the remote-tracking ref says the remote already has HEAD, that is
+    confirmed with one ls-remote instead of a push negotiation; otherwise
+    the push goes out directly, so new commits cost no extra round trip
+    (git updates the tracking ref on every successful push). Returns
+    {"status", "branch", "sha", "bytes", "latency", "error"}; status is
+    "pushed", "up-to-date", "no-remote" or "failed".
+    """
+    started = time.perf_counter()
+    result = {"status": "failed", "branch": "", "sha": "", "bytes": 0, "latency": 0.0, "error": None}
+    try:
+        if not backend.has_remote():
+            result["status"] = "no-remote"
+            return result
+        result["branch"] = backend.current_branch()
+        if not result["branch"]:
+            result["error"] = "HEAD is not on a branch"
+            return result
+        result["sha"] = backend.head_sha()
+        if (backend.tracking_sha(remote, result["branch"]) == result["sha"]
+                and backend.remote_sha(remote, result["branch"]) == result["sha"]):
+            result["status"] = "up-to-date"
+        else:
+            result["bytes"] = backend.push(remote, result["branch"])
+            result["status"] = "pushed"
+    except subprocess.CalledProcessError as e:
+        output = (e.stderr or "").strip()
+        # Keep the rejection itself, not the progress lines and hints around it
+        errors = [line.strip() for line in output.splitlines() if line.startswith(("error:", "fatal:", " ! "))]
+        result["error"] = "; ".join(errors) or output or str(e)
+    finally:
+        result["latency"] = time.perf_counter() - started
+        REGISTRY.observe("push", result["latency"])
+    return result
+
+
+class PushQueue:
+    """Pushes collected while a fleet run commits, sent together afterwards.
+
+    Committing and pushing in the same worker keeps a worker idle on the
+    network after every commit; queueing the pushes lets the commit stage
+    finish first and then overlaps up to concurrency pushes, which are
+    bound by round trips rather than local CPU or disk.
+    """
+
+    def __init__(self, concurrency: int = 8, remote: str = "origin"):
+        self.concurrency = max(1, concurrency)
+        self.remote = remote
+        self.pending: List[Tuple[str, GitBackend, Optional[RepoLock]]] = []
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "PushQueue":
+        workers = int(config.get("max_workers", 4))
+        return cls(int(config.get("push_concurrency", workers * 2)))
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def add(self, name: str, backend: GitBackend, lock: Optional[RepoLock] = None):
+        """Queue the push of the repository behind backend under name, to be made holding lock."""
+        self.pending.append((name, backend, lock))
+
+    def _push(self, backend: GitBackend, lock: Optional[RepoLock]) -> Dict:
+        if lock is None:
+            return dict(push_repository(backend, self.remote), lock_wait=0.0)
+        try:
+            waited = lock.acquire()
+        except RepoLockTimeout as e:
+            return {"status": "failed", "branch": "", "sha": "", "bytes": 0, "latency": 0.0,
+                    "error": str(e), "lock_wait": e.waited}
+        try:
+            return dict(push_repository(backend, self.remote), lock_wait=waited)
+        finally:
+            lock.release()
+
+    def push_all(self) -> Dict[str, Dict]:
+        """Send every queued push, concurrency at a time; returns push_repository results by name."""
+        pending, self.pending = self.pending, []
+        if not pending:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(pending))) as executor:
+            results = executor.map(lambda item: self._push(item[1], item[2]), pending)
+            pushes = {name: result for (name, _, _), result in zip(pending, results)}
+        REGISTRY.set_gauge("push_bytes_sent", sum(result["bytes"] for result in pushes.values()))
+        return pushes
+
+
+def summarize_pushes(results: List[Dict]) -> Dict:
+    """Counts, bytes and latency of the push results of a fleet run."""
+    statuses = [result.get("push_status") for result in results if result.get("push_status")]
+    latencies = sorted(result["push_time"] for result in results if result.get("push_status") == "pushed")
+    return {
+        "pushed": statuses.count("pushed"),
+        "up_to_date": statuses.count("up-to-date"),
+        "failed": statuses.count("failed"),
+        "bytes": sum(result.get("push_bytes", 0) for result in results),
+        "p50": latencies[len(latencies) // 2] if latencies else 0.0,
+        "max": latencies[-1] if latencies else 0.0,
+    }
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+API Rate Governor
+Token-bucket pacing of GitHub API calls driven by the rate-limit headers
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+from metrics import REGISTRY
+
+
+class RateLimitExceeded(Exception):
+    """Raised when the next request could only be made after more than max_wait seconds."""
+
+    def __init__(self, wait: float, reset_at: float):
+        super().__init__(f"rate limited for another {wait:.0f}s")
+        self.wait = wait
+        self.reset_at = reset_at
+
+
+class RateGovernor:
+    """Schedules the requests of every API client sharing it.
+
+    A token bucket of burst tokens refills at rate requests per second.
+    Once responses report X-RateLimit-Remaining/-Reset the refill rate is
+    lowered to what spreads the remaining budget (less reserve) over the
+    time left until the reset, so a long fleet run slows down gradually
+    instead of running into the primary limit. Remaining is also counted
+    down per request so concurrent callers cannot overspend it between
+    responses.
+
+    A rate-limited answer (429, or 403 with an exhausted budget, a
+    Retry-After header or a secondary-limit message) blocks every caller
+    until Retry-After, the reset time, or an exponential backoff with
+    jitter has passed; the client then retries up to max_retries times.
+    Waits longer than max_wait raise RateLimitExceeded instead of sleeping.
+    """
+
+    def __init__(self, rate: float = 10.0, burst: int = 20, reserve: int = 0,
+                 max_wait: float = 60.0, max_retries: int = 3,
+                 backoff_base: float = 2.0, backoff_cap: float = 120.0):
+        self.rate = max(0.001, float(rate))
+        self.burst = max(1, int(burst))
+        self.reserve = max(0, int(reserve))
+        self.max_wait = max_wait
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self.tokens = float(self.burst)
+        self.updated = time.time()
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+        self.failures = 0
+        self.stats = {"requests": 0, "throttled": 0, "waits": 0, "waited": 0.0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "RateGovernor":
+        return cls(rate=float(config.get('api_rate', 10.0)),
+                   burst=int(config.get('api_burst', 20)),
+                   reserve=int(config.get('api_rate_reserve', 0)),
+                   max_wait=float(config.get('api_max_wait', 60.0)),
+                   max_retries=int(config.get('api_max_retries', 3)))
+
+    def _refill_rate(self, now: float) -> float:
+        """Tokens per second: the configured rate, or less to make the budget last until the reset."""
+        if self.remaining is None or self.reset_at <= now:
+            return self.rate
+        budget = max(0, self.remaining - self.reserve)
+        return max(0.001, min(self.rate, budget / (self.reset_at - now)))
+
+    def reserve_slot(self) -> float:
+        """Take a token for one request and return how long to wait before sending it.
+
+        Raises RateLimitExceeded, taking nothing, when that wait would exceed max_wait.
+        """
+        with self._lock:
+            now = time.time()
+            if self.remaining is not None and self.reset_at <= now:
+                self.remaining = None  # the window rolled over; the next response tells the new budget
+            rate = self._refill_rate(now)
+            tokens = min(self.burst, self.tokens + (now - self.updated) * rate)
+
+            wait = max(0.0, self.blocked_until - now)
+            if self.remaining is not None and self.remaining <= self.reserve:
+                # The window's budget is spent: queue behind the reset at the full rate
+                wait = max(wait, self.reset_at - now + max(0.0, 1 - tokens) / self.rate)
+            elif tokens < 1:
+                wait = max(wait, (1 - tokens) / rate)
+
+            if self.max_wait is not None and wait > self.max_wait:
+                raise RateLimitExceeded(wait, max(self.blocked_until, self.reset_at))
+
+            # Tokens may go negative: later callers queue up behind this reservation
+            self.tokens = tokens - 1
+            self.updated = now
+            if self.remaining is not None:
+                self.remaining -= 1
+            self.stats["requests"] += 1
+            if wait > 0:
+                self.stats["waits"] += 1
+                self.stats["waited"] += wait
+        REGISTRY.observe("api_rate_wait", wait)
+        return wait
+
+    def acquire(self) -> float:
+        """Block until a request may be sent; returns the seconds waited."""
+        wait = self.reserve_slot()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """asyncio counterpart of acquire()."""
+        wait = self.reserve_slot()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff for attempt (0-based) with up to 50% jitter."""
+        delay = min(self.backoff_cap, self.backoff_base * 2 ** attempt)
+        return delay + random.uniform(0, delay / 2)
+
+    def update(self, status: int, headers: Mapping[str, str], body: str = "") -> Optional[float]:
+        """Record a response; returns the delay before a retry when it was rate limited, else None."""
+        now = time.time()
+        remaining = _int_header(headers, "X-RateLimit-Remaining")
+        retry_after = headers.get("Retry-After")
+        with self._lock:
+            limit = _int_header(headers, "X-RateLimit-Limit")
+            reset = _int_header(headers, "X-RateLimit-Reset")
+            if remaining is not None:
+                # Within one window the lowest count is the newest: responses of
+                # concurrent requests arrive out of order, and requests in flight
+                # are already counted down
+                same_window = self.remaining is not None and self.reset_at == reset
+                self.remaining = min(remaining, self.remaining) if same_window else remaining
+            if limit is not None:
+                self.limit = limit
+            if reset is not None:
+                self.reset_at = float(reset)
+
+            limited = status == 429 or (status == 403 and (
+                remaining == 0 or retry_after is not None or "rate limit" in body.lower()))
+            if not limited:
+                self.failures = 0
+                delay = None
+            else:
+                self.stats["throttled"] += 1
+                if retry_after is not None and retry_after.strip().isdigit():
+                    delay = int(retry_after) + random.uniform(0, 1)
+                elif remaining == 0 and reset is not None:
+                    delay = max(0.0, reset - now) + random.uniform(0, 1)
+                else:
+                    delay = self.backoff(self.failures)
+                self.failures += 1
+                self.blocked_until = max(self.blocked_until, now + delay)
+        self.publish()
+        return delay
+
+    def publish(self):
+        """Expose the current budget as metrics gauges."""
+        with self._lock:
+            now = time.time()
+            gauges = {
+                "api_rate_remaining": self.remaining,
+                "api_rate_limit": self.limit,
+                "api_rate_reset_seconds": max(0.0, self.reset_at - now) if self.reset_at else None,
+                "api_rate_waited_seconds": round(self.stats["waited"], 3),
+                "api_rate_throttled": self.stats["throttled"],
+            }
+        for name, value in gauges.items():
+            if value is not None:
+                REGISTRY.set_gauge(name, value)
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Repository Metadata Cache
+On-disk cache of the user's repository list with TTL and incremental refresh
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from github_api import AsyncGitHubAPIClient, GitHubAPIClient
+
+
+class RepoCache:
+    """Cached repository metadata for one GitHub account.
+
+    While the cache is younger than ttl seconds it is used as is. Once it
+    expires only repositories updated since the newest cached updated_at are
+    fetched (the API's `since` filter) and merged in; a full listing is made
+    when there is no cache, the account or token changed, on request, or
+    once the last full listing is full_every TTLs old. Repositories deleted
+    on GitHub or no longer accessible only disappear on a full refresh.
+    """
+
+    FIELDS = ("name", "full_name", "clone_url", "private", "default_branch", "pushed_at", "updated_at")
+
+    def __init__(self, path: str = "configs/repo_cache.json", ttl: int = 3600, full_every: int = 24):
+        self.path = path
+        self.ttl = ttl
+        self.full_every = max(1, full_every)
+        self.data = self._empty()
+
+    @staticmethod
+    def _empty() -> Dict:
+        return {"username": "", "token_hash": "", "fetched_at": 0, "full_at": 0, "repos": {}}
+
+    @staticmethod
+    def _token_hash(token: str) -> str:
+        """Fingerprint the token so a cache is only trusted for the token that filled it."""
+        return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+    def load(self) -> bool:
+        """Load the cache file; returns False when it is missing or unreadable."""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    self.data = dict(self._empty(), **json.load(f))
+                return True
+        except Exception as e:
+            print(f"❌ Error loading repository cache: {e}")
+        self.data = self._empty()
+        return False
+
+    def save(self):
+        """Write the cache atomically."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def matches(self, username: str, token: str) -> bool:
+        """Check if the cache was filled for this account and token."""
+        return (self.data["username"] == username
+                and self.data["token_hash"] == self._token_hash(token))
+
+    def is_fresh(self, username: str, token: str) -> bool:
+        """Check if the cache can be used without asking the API."""
+        return (self.matches(username, token) and bool(self.data["repos"])
+                and time.time() - self.data["fetched_at"] < self.ttl)
+
+    def repositories(self) -> List[Dict]:
+        """Cached repositories ordered by full name."""
+        return sorted(self.data["repos"].values(), key=lambda repo: repo["full_name"].lower())
+
+    def _merge(self, repos_data: List[Dict]):
+        for repo in repos_data:
+            self.data["repos"][repo["full_name"]] = {field: repo.get(field) for field in self.FIELDS}
+
+    def _refresh_request(self, token: str, username: str, force: bool) -> Optional[Tuple[Optional[Dict], str]]:
+        """Decide how to refresh: None when the cache is fresh, else (list params, mode)."""
+        if not force and self.is_fresh(username, token):
+            return None
+
+        if not self.matches(username, token):
+            self.data = self._empty()
+
+        newest = max((repo.get("updated_at") or "" for repo in self.data["repos"].values()), default="")
+        full_due = time.time() - self.data["full_at"] >= self.ttl * self.full_every
+        if not force and newest and not full_due:
+            return {"since": newest, "sort": "updated"}, "incremental"
+        return None, "full"
+
+    def _apply(self, token: str, username: str, mode: str, repos_data: List[Dict]):
+        if mode == "full":
+            self.data["repos"] = {}
+            self.data["full_at"] = time.time()
+        self._merge(repos_data)
+        self.data.update({
+            "username": username,
+            "token_hash": self._token_hash(token),
+            "fetched_at": time.time(),
+        })
+
+    def refresh(self, client: GitHubAPIClient, username: str, force: bool = False) -> str:
+        """Bring the cache up to date and return how: "cache", "incremental" or "full"."""
+        request = self._refresh_request(client.token, username, force)
+        if request is None:
+            return "cache"
+        params, mode = request
+        self._apply(client.token, username, mode, client.list_repositories(params))
+        return mode
+
+    async def refresh_async(self, client: AsyncGitHubAPIClient, username: str, force: bool = False) -> str:
+        """refresh() through the asyncio API client."""
+        request = self._refresh_request(client.token, username, force)
+        if request is None:
+            return "cache"
+        params, mode = request
+        self._apply(client.token, username, mode, await client.list_repositories(params))
+        return mode
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Repository Locks
+Advisory per-repository locks, so overlapping runs only wait for each other on the same clone
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Dict, Optional
+
+from metrics import REGISTRY
+
+# Optional dependency: not available on Windows, where lock files are used instead
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MODES = ("auto", "fcntl", "lockfile", "off")
+LOCK_SUFFIX = ".auto_commit.lock"
+
+
+class RepoLockTimeout(Exception):
+    """Raised when another run held the repository lock for longer than the timeout."""
+
+    def __init__(self, path: str, holder: Dict, waited: float):
+        owner = f"pid {holder.get('pid')} on {holder.get('host')}" if holder else "another run"
+        super().__init__(f"{path} is locked by {owner} (waited {waited:.1f}s)")
+        self.path = path
+        self.holder = holder
+        self.waited = waited
+
+
+def lock_path(repo_path: str) -> str:
+    """Lock file of repo_path: a hidden sibling, so a clone that does not exist yet can be locked too."""
+    # Resolved, so a symlinked or relative path of the same clone shares its lock
+    repo_path = os.path.realpath(repo_path)
+    parent, name = os.path.split(repo_path.rstrip(os.sep))
+    return os.path.join(parent, f".{name}{LOCK_SUFFIX}")
+
+
+class RepoLock:
+    """Exclusive advisory lock on one repository path.
+
+    Every run that clones, commits or pushes a repository holds its lock,
+    so two overlapping runs (cron plus main.py, or two fleet runs) never
+    work in the same clone at once and no longer fail on git's
+    index.lock, while different repositories proceed in parallel.
+
+    With fcntl the lock is a flock() on the lock file, released by the
+    kernel when the holder exits however it exits. Without it (or with
+    mode "lockfile", e.g. for clones on NFS) the lock file itself is the
+    lock; one left behind is broken once its holder's process is gone
+    (holders on this host) or it is older than stale_after seconds
+    (holders on other hosts). Either way the file records the holder's
+    pid, host and start time for the timeout message.
+
+    A lock is waited for up to timeout seconds (0: give up at once) and
+    can be acquired and released repeatedly.
+    """
+
+    POLL_INTERVAL = 0.05
+    MAX_POLL_INTERVAL = 0.5
+
+    def __init__(self, repo_path: str, timeout: float = 600.0, stale_after: float = 3600.0,
+                 mode: str = "auto"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown repository lock mode: {mode}")
+        if mode == "auto":
+            mode = "fcntl" if fcntl else "lockfile"
+        elif mode == "fcntl" and not fcntl:
+            raise ValueError("fcntl locks are not available on this platform")
+        self.path = lock_path(repo_path)
+        self.timeout = max(0.0, timeout)
+        self.stale_after = stale_after
+        self.mode = mode
+        self.waited = 0.0
+        self._fd: Optional[int] = None
+        self._held = False
+
+    @classmethod
+    def from_config(cls, repo_path: str, config: Dict) -> Optional["RepoLock"]:
+        """Lock of repo_path as configured by repo_lock*, or None when locking is off."""
+        mode = config.get('repo_lock', "auto")
+        if mode == "off":
+            return None
+        return cls(repo_path,
+                   timeout=float(config.get('repo_lock_timeout', 600)),
+                   stale_after=float(config.get('repo_lock_stale', 3600)),
+                   mode=mode)
+
+    @property
+    def held(self) -> bool:
+        return self._held
+
+    def usable(self) -> bool:
+        """Whether this run can create (or, for flock, open) the lock file at all."""
+        if self.mode == "fcntl" and os.path.exists(self.path):
+            return os.access(self.path, os.R_OK | os.W_OK)
+        return os.access(os.path.dirname(self.path), os.W_OK | os.X_OK)
+
+    def _read(self, path: Optional[str] = None) -> bytes:
+        try:
+            with open(path or self.path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return b""
+
+    def holder(self) -> Dict:
+        """pid, host and since of the current holder as recorded in the lock file ({} if unknown)."""
+        try:
+            return json.loads(self._read() or b"{}")
+        except ValueError:
+            return {}
+
+    @staticmethod
+    def _record() -> bytes:
+        return json.dumps({"pid": os.getpid(), "host": socket.gethostname(),
+                           "since": time.time()}).encode()
+
+    def _try_flock(self) -> bool:
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        os.ftruncate(self._fd, 0)
+        os.pwrite(self._fd, self._record(), 0)
+        return True
+
+    def _is_stale(self, holder: Dict) -> bool:
+        # A holder on this host is stale exactly when its process is gone,
+        # however long it has been running (e.g. a long backfill)
+        if holder.get('host') == socket.gethostname() and holder.get('pid') and os.name != 'nt':
+            try:
+                os.kill(int(holder['pid']), 0)
+            except ProcessLookupError:
+                return True
+            except (PermissionError, ValueError):
+                pass
+            return False
+        # os.kill(pid, 0) would terminate the process on Windows, and other
+        # hosts' pids mean nothing here: fall back to the lock file's age
+        try:
+            return time.time() - os.path.getmtime(self.path) > self.stale_after
+        except OSError:
+            return False  # released meanwhile; the next attempt will tell
+
+    def _break_stale(self, record: bytes, holder: Dict):
+        """Remove the lock file if it still holds record, without racing other waiters.
+
+        The file is first renamed aside, which only one waiter can do; if
+        what was renamed is not the stale record after all (the lock was
+        taken anew meanwhile), it is linked back in place.
+        """
+        aside = f"{self.path}.{os.getpid()}.{threading.get_ident()}.stale"
+        try:
+            os.rename(self.path, aside)
+        except FileNotFoundError:
+            return  # another waiter broke it first
+        if self._read(aside) == record:
+            logging.getLogger(__name__).warning(
+                f"Breaking stale lock {self.path} of pid {holder.get('pid')} on {holder.get('host')}")
+        else:
+            try:
+                os.link(aside, self.path)
+            except FileExistsError:
+                pass
+        try:
+            os.remove(aside)
+        except FileNotFoundError:
+            pass
+
+    def _try_lockfile(self) -> bool:
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            record = self._read()
+            try:
+                holder = json.loads(record or b"{}")
+            except ValueError:
+                holder = {}
+            if holder and self._is_stale(holder):
+                self._break_stale(record, holder)
+            return False
+        try:
+            os.write(fd, self._record())
+        finally:
+            os.close(fd)
+        return True
+
+    def _try_acquire(self) -> bool:
+        return self._try_flock() if self.mode == "fcntl" else self._try_lockfile()
+
+    def _acquired(self, started: float) -> float:
+        self._held = True
+        self.waited = time.perf_counter() - started
+        REGISTRY.observe("repo_lock_wait", self.waited)
+        return self.waited
+
+    def _timed_out(self, started: float) -> RepoLockTimeout:
+        self.waited = time.perf_counter() - started
+        REGISTRY.observe("repo_lock_wait", self.waited)
+        return RepoLockTimeout(self.path, self.holder(), self.waited)
+
+    def acquire(self) -> float:
+        """Take the lock, waiting up to timeout; returns the seconds waited.
+
+        Raises RepoLockTimeout when it is still held by someone else then.
+        """
+        started = time.perf_counter()
+        interval = self.POLL_INTERVAL
+        try:
+            while not self._try_acquire():
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    raise self._timed_out(started)
+                time.sleep(min(interval, remaining))
+                interval = min(interval * 2, self.MAX_POLL_INTERVAL)
+        except BaseException:
+            self._close()
+            raise
+        return self._acquired(started)
+
+    async def acquire_async(self) -> float:
+        """asyncio counterpart of acquire()."""
+        started = time.perf_counter()
+        interval = self.POLL_INTERVAL
+        try:
+            while not self._try_acquire():
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    raise self._timed_out(started)
+                await asyncio.sleep(min(interval, remaining))
+                interval = min(interval * 2, self.MAX_POLL_INTERVAL)
+        except BaseException:
+            # Cancelled or timed out: do not keep the lock file open
+            self._close()
+            raise
+        return self._acquired(started)
+
+    def release(self):
+        """Give the lock up (a no-op when it is not held)."""
+        if not self._held:
+            return
+        self._held = False
+        if self.mode == "fcntl":
+            # The file stays: removing it could split waiters across two inodes
+            os.ftruncate(self._fd, 0)
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._close()
+        else:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> "RepoLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
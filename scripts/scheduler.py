@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Commit Scheduler
+One long-running process firing the daily commits of many repositories on time
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from repo_lock import RepoLockTimeout
+
+SCHEDULE_STATE_FILE = "auto_commit_schedule.json"
+# A commit made later than this after its planned time is dated at that time
+LATE_TOLERANCE = 60
+# Seconds before a commit whose repository another run holds is tried again
+LOCK_RETRY = 60
+
+
+def plan_is_idle(repository_path: str, now: Optional[float] = None) -> bool:
+    """Check, without touching git, that today's saved plan has nothing due yet.
+
+    Only a plain .git directory is looked at; anything else is not idle so
+    the caller takes the full path.
+    """
+    path = os.path.join(repository_path, '.git', SCHEDULE_STATE_FILE)
+    try:
+        with open(path, 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if state.get('day') != date.today().isoformat():
+        return False
+    now = time.time() if now is None else now
+    return all(due > now for due in state.get('pending', []))
+
+
+class RepoSchedule:
+    """The commit times planned for one repository's current day.
+
+    The plan lives in the repository's git directory so a restarted daemon
+    knows which commits were still due.
+    """
+
+    def __init__(self, auto_commit):
+        self.auto_commit = auto_commit
+        self.path = auto_commit.state_file(SCHEDULE_STATE_FILE)
+        self.day = ""
+        self.pending: List[float] = []
+
+    def load(self) -> bool:
+        """Load the saved plan; returns False when there is none."""
+        try:
+            if self.path and os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    state = json.load(f)
+                self.day = state['day']
+                self.pending = sorted(state['pending'])
+                return True
+        except (OSError, ValueError, KeyError) as e:
+            self.auto_commit.logger.warning(f"Ignoring unreadable schedule {self.path}: {e}")
+        return False
+
+    def save(self):
+        """Write the plan atomically (never in dry-run mode)."""
+        if not self.path or self.auto_commit.config['dry_run']:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'day': self.day, 'pending': self.pending}, f)
+        os.replace(tmp_path, self.path)
+
+    def take_due(self, now: float) -> List[float]:
+        """Remove and return every planned time up to now, saving the rest."""
+        due = [planned for planned in self.pending if planned <= now]
+        if due:
+            self.pending = [planned for planned in self.pending if planned > now]
+            self.save()
+        return due
+
+    def plan(self, day: date, now: float) -> List[float]:
+        """Pick the commit times for day inside the active hours still ahead of now."""
+        config = self.auto_commit.config
+        midnight = datetime.combine(day, datetime.min.time())
+        window_start = max((midnight + timedelta(hours=config['active_hours_start'])).timestamp(), now)
+        window_end = (midnight + timedelta(hours=config['active_hours_end'])).timestamp()
+
+        self.day = day.isoformat()
+        self.pending = []
+        if window_start >= window_end:
+            self.auto_commit.logger.info(f"Skipping {self.day} - active hours already over")
+        elif config['enable_randomization'] and random.random() < 0.3:
+            # Same 30% rest-day chance as should_commit_now
+            self.auto_commit.logger.info(f"Skipping {self.day} - randomized rest day")
+            self.auto_commit.events.emit("skip", reason="rest day")
+        else:
+            min_commits, max_commits = config['daily_commit_range']
+            count = random.randint(min_commits, max_commits)
+            self.pending = sorted(random.uniform(window_start, window_end) for _ in range(count))
+            times = ", ".join(datetime.fromtimestamp(due).strftime("%H:%M") for due in self.pending)
+            self.auto_commit.logger.info(f"Scheduled {count} commits for {self.day}: {times}")
+        self.save()
+        return self.pending
+
+
+class CommitScheduler:
+    """Heap of due commit events for every repository, served by one thread.
+
+    The loop sleeps on an Event until the earliest entry is due, so it costs
+    nothing while idle and stop() wakes it at once. Each repository also has
+    a "plan" entry at the next local midnight that schedules the new day.
+    Events missed while the daemon was down are committed on start-up,
+    dated at the time they were scheduled for.
+    """
+
+    # Re-check the wall clock at least this often (suspend, clock changes)
+    MAX_WAIT = 3600
+
+    def __init__(self, auto_commits: List, logger: Optional[logging.Logger] = None):
+        self.schedules = [RepoSchedule(auto_commit) for auto_commit in auto_commits]
+        self.logger = logger or logging.getLogger(__name__)
+        self.heap = []
+        self._sequence = itertools.count()
+        self._stop = threading.Event()
+        self.stats = {"commits": 0, "recovered": 0, "pushed": 0}
+
+    def _schedule(self, due: float, index: int, kind: str):
+        heapq.heappush(self.heap, (due, next(self._sequence), index, kind))
+
+    def _next_midnight(self, now: float) -> float:
+        tomorrow = datetime.fromtimestamp(now).date() + timedelta(days=1)
+        return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+    def start(self):
+        """Prepare every repository, recover missed commits and fill the heap."""
+        now = time.time()
+        today = date.today().isoformat()
+
+        for index, schedule in enumerate(self.schedules):
+            auto_commit = schedule.auto_commit
+            if not auto_commit.setup_git_repository():
+                self.logger.error(f"Not scheduling {auto_commit.config['repository_path']}")
+                continue
+
+            loaded = schedule.load()
+            missed = schedule.take_due(now)
+            if missed:
+                self._recover(schedule, missed)
+            if not loaded or schedule.day != today:
+                schedule.plan(date.today(), now)
+
+            for due in schedule.pending:
+                self._schedule(due, index, "commit")
+
+            self._schedule(self._next_midnight(now), index, "plan")
+
+    def _recover(self, schedule: RepoSchedule, missed: List[float]):
+        """Commit events that fell due while the daemon was not running."""
+        auto_commit = schedule.auto_commit
+        auto_commit.logger.info(f"Recovering {len(missed)} missed commits")
+        lock = auto_commit.repo_lock()
+        try:
+            if lock:
+                lock.acquire()
+            for due in missed:
+                if auto_commit.create_commit(auto_commit.get_random_commit_message(),
+                                             datetime.fromtimestamp(due), mode="daemon"):
+                    self.stats["commits"] += 1
+                    self.stats["recovered"] += 1
+            if auto_commit.push_changes():
+                self.stats["pushed"] += 1
+        except RepoLockTimeout as e:
+            auto_commit.logger.warning(f"Not recovering missed commits: {e}")
+        finally:
+            if lock:
+                lock.release()
+
+    def _fire(self, due: float, index: int, kind: str):
+        schedule = self.schedules[index]
+        auto_commit = schedule.auto_commit
+        now = time.time()
+
+        if kind == "plan":
+            for commit_due in schedule.plan(datetime.fromtimestamp(now).date(), now):
+                self._schedule(commit_due, index, "commit")
+            self._schedule(self._next_midnight(now), index, "plan")
+            return
+
+        if due not in schedule.pending:
+            return
+
+        # Never block the other repositories' events on a busy one
+        lock = auto_commit.repo_lock()
+        if lock:
+            lock.timeout = 0
+            try:
+                lock.acquire()
+            except RepoLockTimeout as e:
+                auto_commit.logger.info(f"Retrying commit in {LOCK_RETRY}s: {e}")
+                schedule.pending[schedule.pending.index(due)] = now + LOCK_RETRY
+                schedule.save()
+                self._schedule(now + LOCK_RETRY, index, "commit")
+                return
+
+        try:
+            schedule.pending.remove(due)
+            schedule.save()
+
+            commit_date = datetime.fromtimestamp(due) if now - due > LATE_TOLERANCE else None
+            if auto_commit.create_commit(auto_commit.get_random_commit_message(), commit_date,
+                                         mode="daemon"):
+                self.stats["commits"] += 1
+                if auto_commit.push_changes():
+                    self.stats["pushed"] += 1
+        finally:
+            if lock:
+                lock.release()
+
+    def run(self):
+        """Serve events until stop() is called."""
+        self.start()
+        self.logger.info(f"Scheduler running for {len(self.schedules)} repositories")
+
+        while not self._stop.is_set() and self.heap:
+            delay = self.heap[0][0] - time.time()
+            if delay > 0:
+                self._stop.wait(min(delay, self.MAX_WAIT))
+                continue
+            due, _, index, kind = heapq.heappop(self.heap)
+            try:
+                self._fire(due, index, kind)
+            except Exception as e:
+                self.logger.error(f"Scheduled {kind} failed: {e}")
+
+        self.logger.info(
+            f"Scheduler stopped after {self.stats['commits']} commits "
+            f"({self.stats['recovered']} recovered, {self.stats['pushed']} pushes)"
+        )
+
+    def stop(self):
+        """Ask run() to return; safe to call from a signal handler or another thread."""
+        self._stop.set()